@@ -1,12 +1,40 @@
+import argparse
+import datetime
+import itertools
 import json
-from typing import Dict, Any, List, Annotated, TypedDict
-from langgraph.graph import StateGraph, END
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import TYPE_CHECKING, Dict, Any, Callable, Iterable, Iterator, List, Annotated, Optional, Tuple
+from typing import TypedDict
 from operator import add
 
-from src.lead_processor import LeadProcessor
-from src.lead_qualifier import LeadQualifier
+from config import DEFAULT_RUN_OPTIONS, SERVICE_RUN_OPTIONS, LLM_MODEL, RESULTS_QUERY_LIMIT
+from config import SERVICE_HOST, SERVICE_PORT, SERVICE_BATCH_WINDOW_MS, SERVICE_MAX_BATCH_SIZE
+from src.concurrency import AsyncRateLimiter, get_rate_limiter, map_concurrently, run_coroutine
+from src.fault_tolerance import DeadLetterQueue, LeadFailure, RetryPolicy, dead_letter_path_for, failure_record
+from src.llm_cache import LLMCache, get_llm_cache
+from src.lead_processor import LeadFileError, LeadProcessor
 from src.lead_prioritizer import LeadPrioritizer
-from src.approach_recommender import ApproachRecommender
+from src.result_writer import JsonResultWriter, JsonlResultWriter
+from src.results_store import ResultsStoreWriter, get_results_store
+from src.incremental import PreviousRunIndex, lead_fingerprint
+from src.lead_store import LeadRecord, LeadTable
+from src.rule_qualifier import RuleBasedQualifier
+from src.sharding import in_shard, merge_ranked_shards, shard_checkpoint_path, shard_file_name, split_leads
+from src.sharding import write_ranked_shard
+from src.pipeline import StagedPipeline
+from src.instrumentation import METRICS, instrument_node
+from src.run_store import RunProgressStore, get_run_store
+from src.scheduler import DeferredLeadsQueue, QualificationScheduler, deferred_path_for, parse_deadline
+from src.scheduler import scheduling_enabled
+
+# LangChain, LangGraph e NumPy são importados sob demanda, nos nós que os usam, para que
+# execuções curtas (como --stage prioritize-only) não paguem o custo dessas importações.
+if TYPE_CHECKING:
+    from src.approach_recommender import ApproachRecommender
+    from src.lead_qualifier import LeadQualifier
+    from src.ranking_index import RankingIndex
 
 
 class LeadProcessingState(TypedDict):
@@ -15,78 +43,668 @@ class LeadProcessingState(TypedDict):
     qualified_leads: List[Dict[str, Any]]
     prioritized_leads: List[Dict[str, Any]]
     lead_approaches: Dict[str, str]
+    deferred_approaches: List[str]
+    failed_leads: List[Dict[str, Any]]
+    deferred_leads: List[Dict[str, Any]]
+    duplicate_of: Dict[str, str]
     current_lead_index: int
     error: str
+    options: Dict[str, Any]
+    run_stats: Dict[str, Any]
+
+
+def get_option(state: LeadProcessingState, name: str) -> Any:
+    """Obtém uma opção de execução do estado, usando o padrão de config.py quando ausente."""
+    return state.get("options", {}).get(name, DEFAULT_RUN_OPTIONS.get(name))
+
+
+def create_qualifier(state: LeadProcessingState) -> "LeadQualifier":
+    """Cria o qualificador com o cache, o formato de prompt (completo ou compacto) e a cascata das opções."""
+    from src.lead_qualifier import LeadQualifier
+
+    return LeadQualifier(
+        cache=get_cache(state),
+        compact=get_option(state, "compact_prompts"),
+        interactions_budget=get_option(state, "compact_interactions_budget"),
+        cascade=get_option(state, "cascade"),
+        cascade_model=get_option(state, "cascade_model"),
+        cascade_margin=get_option(state, "cascade_margin")
+    )
+
+
+def create_retry_policy(state: LeadProcessingState) -> RetryPolicy:
+    """Cria a política de novas tentativas por lead a partir das opções de execução."""
+    return RetryPolicy(
+        max_retries=get_option(state, "max_retries"),
+        base_delay=get_option(state, "retry_base_delay"),
+        max_delay=get_option(state, "retry_max_delay")
+    )
+
+
+def get_cache(state: LeadProcessingState) -> Optional[LLMCache]:
+    """Retorna o cache de respostas do LLM, se habilitado nas opções de execução."""
+    if not get_option(state, "use_cache"):
+        return None
+    return get_llm_cache(get_option(state, "cache_path"))
+
+
+_previous_results: Dict[str, PreviousRunIndex] = {}
+
+
+def get_previous_results(file_path: Optional[str]) -> PreviousRunIndex:
+    """Carrega (uma única vez por processo) o índice de resultados da execução anterior."""
+    if not file_path:
+        return PreviousRunIndex({})
+    if file_path not in _previous_results:
+        _previous_results[file_path] = PreviousRunIndex.load(file_path)
+    return _previous_results[file_path]
+
+
+def create_scheduler(state: LeadProcessingState) -> Optional[QualificationScheduler]:
+    """Cria o agendador das qualificações se houver orçamento de tokens/custo ou prazo nas opções."""
+    if not scheduling_enabled(state.get("options")):
+        return None
+
+    return QualificationScheduler(
+        token_budget=get_option(state, "token_budget"),
+        cost_budget=get_option(state, "cost_budget"),
+        deadline=parse_deadline(get_option(state, "deadline")),
+        cascade_model=get_option(state, "cascade_model") if get_option(state, "cascade") else None,
+        cascade_margin=get_option(state, "cascade_margin")
+    )
+
+
+def create_rate_limiter(state: LeadProcessingState) -> AsyncRateLimiter:
+    """Retorna o limitador de requisições/tokens por minuto das chamadas assíncronas.
+
+    O limitador é compartilhado no processo (get_rate_limiter): qualificação, abordagens e cada lote
+    do modo em fluxo consomem da mesma janela, e o limite vale para a execução inteira.
+    """
+    return get_rate_limiter(get_option(state, "requests_per_minute"), get_option(state, "tokens_per_minute"))
+
+
+def prepare_lead(processor: LeadProcessor, lead: Dict[str, Any]) -> LeadRecord:
+    """Normaliza um lead cru em um registro compacto, com a impressão digital dos dados BANT."""
+    normalized_lead = processor.normalize_lead_data(lead)
+    return LeadRecord.from_normalized(normalized_lead, lead_fingerprint(normalized_lead))
 
 
 def process_leads(state: LeadProcessingState) -> LeadProcessingState:
     """Processa os leads crus para o formato padronizado."""
     try:
         processor = LeadProcessor()
-        processed_leads = []
+        processed_leads = LeadTable(prepare_lead(processor, lead) for lead in state["leads"])
+
+        return {"processed_leads": processed_leads, "current_lead_index": 0}
 
-        for lead in state["leads"]:
-            normalized_lead = processor.normalize_lead_data(lead)
-            formatted_info = processor.format_lead_for_analysis(normalized_lead)
-            normalized_lead["formatted_info"] = formatted_info
-            processed_leads.append(normalized_lead)
+    except Exception as e:
+        return {"error": f"Erro ao processar leads: {str(e)}"}
 
-        state["processed_leads"] = processed_leads
-        state["current_lead_index"] = 0
-        return state
+
+def deduplicate_leads(state: LeadProcessingState) -> LeadProcessingState:
+    """Agrupa os leads quase duplicados (MinHash-LSH) para que só um por grupo seja qualificado pelo LLM."""
+    try:
+        from src.dedup import NearDuplicateDetector, cluster_members, cluster_stats
+
+        detector = NearDuplicateDetector(threshold=get_option(state, "dedup_threshold"))
+        duplicate_of = detector.cluster(state["processed_leads"])
+        stats = cluster_stats(len(state["processed_leads"]), duplicate_of)
+
+        report_path = get_option(state, "dedup_report")
+        if report_path:
+            with open(report_path, 'w') as file:
+                json.dump({"stats": stats, "clusters": cluster_members(duplicate_of)}, file, indent=2)
+
+        return {"duplicate_of": duplicate_of, "run_stats": {**state.get("run_stats", {}), "dedup": stats}}
 
     except Exception as e:
-        return {**state, "error": f"Erro ao processar leads: {str(e)}"}
+        return {"error": f"Erro ao agrupar leads duplicados: {str(e)}"}
+
+
+def qualify_lead_list(state: LeadProcessingState, qualifier: "LeadQualifier", leads: List[Dict[str, Any]],
+                      on_result: Optional[Callable[[Dict[str, Any], Dict[str, Any]], None]] = None,
+                      on_failure: Optional[Callable[[Dict[str, Any], Exception], None]] = None,
+                      admit: Optional[Callable[[List[Dict[str, Any]]], bool]] = None
+                      ) -> List[Optional[Dict[str, Any]]]:
+    """Qualifica os leads informados no modo configurado (lote, assíncrono ou sequencial).
+
+    on_result é chamado com (lead, qualificação) assim que cada lead é qualificado. Cada lead é
+    isolado dos demais: falhas transitórias são repetidas (RetryPolicy) e, se persistirem, o lead
+    fica como None na lista retornada e é informado a on_failure com o LeadFailure. admit, se
+    informado, é consultado com os leads de cada requisição no momento em que ela seria despachada;
+    os leads recusados (por exemplo, após o prazo do agendador) também ficam como None.
+    """
+    retry_policy = create_retry_policy(state)
+
+    def done(lead: Dict[str, Any], result: Dict[str, Any]) -> Dict[str, Any]:
+        if on_result is not None:
+            on_result(lead, result)
+        return result
+
+    def failed(lead: Dict[str, Any], error: Exception) -> None:
+        if on_failure is not None:
+            on_failure(lead, error)
+        return None
+
+    def qualify_one(lead):
+        if admit is not None and not admit([lead]):
+            return None
+        try:
+            return done(lead, retry_policy.call(
+                lambda: qualifier.qualify_lead(qualifier.lead_info(lead)), "qualification"
+            ))
+        except LeadFailure as e:
+            return failed(lead, e)
+
+    batch_size = get_option(state, "batch_size") or 1
+    async_mode = get_option(state, "async_mode")
+    rate_limiter = create_rate_limiter(state) if async_mode else None
+
+    async def aqualify_one(lead):
+        if admit is not None and not admit([lead]):
+            return None
+        try:
+            return done(lead, await retry_policy.acall(
+                lambda: qualifier.aqualify_lead(qualifier.lead_info(lead), rate_limiter), "qualification"
+            ))
+        except LeadFailure as e:
+            return failed(lead, e)
+
+    def batch_done(batch, results):
+        # Cada lead do lote termina sozinho: com o resultado ou, após as novas tentativas, com a falha
+        return [failed(lead, result) if isinstance(result, LeadFailure) else done(lead, result)
+                for lead, result in zip(batch, results)]
+
+    if batch_size > 1:
+        batches = list(iter_batches(leads, batch_size))
+        if async_mode:
+            async def qualify_batch(batch):
+                if admit is not None and not admit(batch):
+                    return [None] * len(batch)
+                return batch_done(batch, await qualifier.aqualify_leads_batch(batch, rate_limiter, retry_policy))
+
+            batch_results = run_coroutine(map_concurrently(
+                batches, qualify_batch, get_option(state, "max_concurrency")
+            ))
+        else:
+            def qualify_batch(batch):
+                if admit is not None and not admit(batch):
+                    return [None] * len(batch)
+                return batch_done(batch, qualifier.qualify_leads_batch(batch, retry_policy))
+
+            batch_results = [qualify_batch(batch) for batch in batches]
+        return [result for results in batch_results for result in results]
+
+    if async_mode:
+        return run_coroutine(map_concurrently(leads, aqualify_one, get_option(state, "max_concurrency")))
+
+    return [qualify_one(lead) for lead in leads]
+
+
+def prequalify_lead_list(state: LeadProcessingState, leads: List[Dict[str, Any]],
+                         on_result: Optional[Callable[[Dict[str, Any], Dict[str, Any]], None]] = None):
+    """Resolve pelas regras (opção prequalify) os leads de classificação evidente, sem chamar o LLM.
+
+    Retorna os resultados por id dos leads resolvidos e a lista dos que ainda precisam do LLM.
+    """
+    if not get_option(state, "prequalify"):
+        return {}, leads
+
+    decided, pending = RuleBasedQualifier().split_decisive(leads)
+    for lead, result in decided:
+        if on_result is not None:
+            on_result(lead, result)
+    METRICS.record_avoided_calls("qualification", len(decided))
+
+    return {lead["id"]: result for lead, result in decided}, pending
+
+
+def prequalification_stats(evaluated: int, results: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    """Resumo da pré-qualificação por regras: leads avaliados, chamadas evitadas e categorias."""
+    by_tier = {}
+    for result in results:
+        by_tier[result["tier"]] = by_tier.get(result["tier"], 0) + 1
+    avoided = sum(by_tier.values())
+    return {"evaluated": evaluated, "llm_calls_avoided": avoided, "sent_to_llm": evaluated - avoided,
+            "by_tier": by_tier}
+
+
+def load_progress(state: LeadProcessingState, stage: str) -> Dict[str, Any]:
+    """Carrega os resultados por lead já gravados para a execução atual (opção run_id)."""
+    run_id = get_option(state, "run_id")
+    if not run_id:
+        return {}
+    return get_run_store(get_option(state, "checkpoint_path")).load_results(run_id, stage)
+
+
+def progress_recorder(state: LeadProcessingState, stage: str) -> Optional[Callable[[Dict[str, Any], Any], None]]:
+    """Cria o callback que grava cada resultado por lead da execução atual, se houver run_id."""
+    run_id = get_option(state, "run_id")
+    if not run_id:
+        return None
+    store = get_run_store(get_option(state, "checkpoint_path"))
+    return lambda lead, result: store.save_result(run_id, stage, lead["id"], result)
 
 
 def qualify_leads(state: LeadProcessingState) -> LeadProcessingState:
-    """Qualifica os leads processados."""
+    """Qualifica os leads processados.
+
+    Com a opção previous_results, reaproveita a qualificação (e a abordagem) dos leads cujos
+    dados BANT não mudaram desde a execução anterior. Com orçamento ou prazo (QualificationScheduler),
+    os leads vão ao LLM em ordem de prioridade estimada e os que não couberem ficam em deferred_leads.
+    """
     try:
-        qualifier = LeadQualifier()
+        qualifier = create_qualifier(state)
         qualified_leads = []
 
+        previous_results = get_previous_results(get_option(state, "previous_results"))
+        reused = {}
+        lead_approaches = dict(state.get("lead_approaches", {}))
+
+        for lead in state["processed_leads"]:
+            previous = previous_results.lookup(lead)
+            if previous is not None:
+                reused[lead["id"]] = previous["qualification"]
+                if previous.get("recommended_approach"):
+                    lead_approaches[lead["id"]] = previous["recommended_approach"]
+
+        completed = load_progress(state, "qualification")
+        # Duplicatas (opção dedup) não vão ao LLM: recebem o resultado do seu representativo
+        duplicate_of = state.get("duplicate_of") or {}
+        pending = [
+            lead for lead in state["processed_leads"]
+            if lead["id"] not in reused and str(lead["id"]) not in completed and str(lead["id"]) not in duplicate_of
+        ]
+        record_qualification = progress_recorder(state, "qualification")
+        evaluated = len(pending)
+        prequalified, pending = prequalify_lead_list(state, pending, record_qualification)
+        scheduler = create_scheduler(state)
+        if scheduler is not None:
+            pending = scheduler.plan(pending, qualifier)
+        failures = []
+        results_by_id = {}
+        fanned_out = 0
+        new_results = dict(zip((str(lead["id"]) for lead in pending), qualify_lead_list(
+            state, qualifier, pending, record_qualification,
+            on_failure=lambda lead, error: failures.append(failure_record(lead["id"], error)),
+            admit=scheduler.admit if scheduler is not None else None
+        )))
+        deferred_ids = scheduler.deferred_ids() if scheduler is not None else set()
+
         for lead in state["processed_leads"]:
-            qualification_result = qualifier.qualify_lead(lead["formatted_info"])
+            if lead["id"] in reused:
+                qualification_result = reused[lead["id"]]
+            elif lead["id"] in prequalified:
+                qualification_result = prequalified[lead["id"]]
+            elif str(lead["id"]) in completed:
+                qualification_result = completed[str(lead["id"])]
+            elif str(lead["id"]) in duplicate_of:
+                # O representativo é sempre o primeiro lead do grupo, já visto neste laço
+                representative_id = duplicate_of[str(lead["id"])]
+                representative = results_by_id.get(representative_id)
+                if representative is None and representative_id in deferred_ids:
+                    scheduler.defer(lead, "representative_deferred")
+                    continue
+                if representative is None:
+                    failures.append({"id": lead["id"], "stage": "qualification", "attempts": 0,
+                                     "error": f"Representativo {representative_id} sem qualificação"})
+                    continue
+                qualification_result = {**representative, "duplicate_of": representative_id}
+                fanned_out += 1
+                if record_qualification is not None:
+                    record_qualification(lead, qualification_result)
+            else:
+                # Sem resultado: o lead falhou ou foi adiado pelo agendador
+                qualification_result = new_results.get(str(lead["id"]))
+                if qualification_result is None:
+                    continue
+            results_by_id[str(lead["id"])] = qualification_result
             qualified_leads.append({
                 "lead": lead,
                 "qualification": qualification_result
             })
-        state["qualified_leads"] = qualified_leads
+        run_stats = {
+            **state.get("run_stats", {}),
+            "incremental": {"reused": len(reused), "qualified": len(pending)},
+            "resumed": {**state.get("run_stats", {}).get("resumed", {}), "qualification": len(completed)}
+        }
+        if get_option(state, "prequalify"):
+            run_stats["prequalification"] = prequalification_stats(evaluated, prequalified.values())
+        if duplicate_of:
+            METRICS.record_avoided_calls("qualification", fanned_out)
+            run_stats["dedup"] = {**run_stats.get("dedup", {}), "llm_calls_avoided": fanned_out}
+        deferred = []
+        if scheduler is not None:
+            run_stats["scheduler"] = scheduler.stats()
+            deferred = scheduler.deferred
 
-        return state
+        return {"qualified_leads": qualified_leads, "lead_approaches": lead_approaches, "run_stats": run_stats,
+                "failed_leads": state.get("failed_leads", []) + failures,
+                "deferred_leads": state.get("deferred_leads", []) + deferred}
 
     except Exception as e:
-        return {**state, "error": f"Erro ao qualificar leads: {str(e)}"}
+        return {"error": f"Erro ao qualificar leads: {str(e)}"}
 
 
 def prioritize_leads(state: LeadProcessingState) -> LeadProcessingState:
-    """Prioriza os leads qualificados."""
+    """Prioriza os leads qualificados.
+
+    Com a opção prioritize_top_k, apenas os K leads mais prioritários seguem adiante; no modo
+    colunar, só eles são selecionados (seleção parcial) e montados.
+    """
     try:
-        prioritizer = LeadPrioritizer()
-        prioritized_leads = prioritizer.prioritize_leads(state["qualified_leads"])
+        top_k = get_option(state, "prioritize_top_k")
+        if get_option(state, "columnar_prioritization"):
+            from src.columnar_prioritizer import ColumnarPrioritizer
 
-        state["prioritized_leads"] = prioritized_leads
+            prioritized_leads = ColumnarPrioritizer().prioritize_leads(state["qualified_leads"], top_k)
+        else:
+            prioritized_leads = LeadPrioritizer().prioritize_leads(state["qualified_leads"])[:top_k]
 
-        return state
+        return {"prioritized_leads": prioritized_leads}
 
     except Exception as e:
-        return {**state, "error": f"Erro ao priorizar leads: {str(e)}"}
+        return {"error": f"Erro ao priorizar leads: {str(e)}"}
+
+
+def is_lazy_approach_mode(state: LeadProcessingState) -> bool:
+    """Indica se a geração de abordagens está limitada aos leads mais prioritários."""
+    return get_option(state, "approach_top_k") is not None or get_option(state, "approach_min_score") is not None
+
+
+def select_eager_approaches(state: LeadProcessingState, prioritized_leads: List[Dict[str, Any]]):
+    """Separa os leads (já ordenados) que recebem abordagem imediata dos que ficam para geração sob demanda.
+
+    Um lead é imediato se estiver entre os approach_top_k primeiros ou se sua pontuação de prioridade
+    atingir approach_min_score.
+    """
+    if not is_lazy_approach_mode(state):
+        return list(prioritized_leads), []
+
+    top_k = get_option(state, "approach_top_k")
+    min_score = get_option(state, "approach_min_score")
+    eager, deferred = [], []
+
+    for rank, lead_data in enumerate(prioritized_leads):
+        in_top_k = top_k is not None and rank < top_k
+        above_threshold = min_score is not None and lead_data["prioritization"]["priority_score"] >= min_score
+        (eager if in_top_k or above_threshold else deferred).append(lead_data)
+
+    return eager, deferred
+
+
+_approach_lock = threading.Lock()
+
+
+def get_approach(result: Dict[str, Any], lead_id: str, recommender: Optional["ApproachRecommender"] = None) -> str:
+    """Retorna a abordagem de um lead, gerando-a e guardando-a no resultado no primeiro acesso."""
+    with _approach_lock:
+        if lead_id in result["lead_approaches"]:
+            return result["lead_approaches"][lead_id]
+
+    lead_data = next(
+        (lead_data for lead_data in result["prioritized_leads"] if lead_data["lead"]["id"] == lead_id),
+        None
+    )
+    if lead_data is None:
+        raise KeyError(f"Lead não encontrado: {lead_id}")
+
+    if recommender is None:
+        from src.approach_recommender import ApproachRecommender
+
+        recommender = ApproachRecommender(cache=get_cache(result))
+    approach = create_retry_policy(result).call(lambda: recommender.generate_approach(lead_data), "approach")
+
+    with _approach_lock:
+        approach = result["lead_approaches"].setdefault(lead_id, approach)
+        deferred = result.get("deferred_approaches", [])
+        if lead_id in deferred:
+            deferred.remove(lead_id)
+
+    return approach
+
+
+def generate_approach_list(state: LeadProcessingState, recommender: "ApproachRecommender",
+                           leads_data: List[Dict[str, Any]],
+                           on_result: Optional[Callable[[Dict[str, Any], str], None]] = None,
+                           on_failure: Optional[Callable[[Dict[str, Any], Exception], None]] = None
+                           ) -> List[Optional[str]]:
+    """Gera as abordagens dos leads informados no modo configurado (assíncrono ou sequencial).
+
+    on_result é chamado com (lead, abordagem) assim que cada abordagem fica pronta. Leads cuja
+    geração falha mesmo após as novas tentativas ficam como None e são informados a on_failure.
+    """
+    retry_policy = create_retry_policy(state)
+
+    def done(lead_data: Dict[str, Any], approach: str) -> str:
+        if on_result is not None:
+            on_result(lead_data["lead"], approach)
+        return approach
+
+    def failed(lead_data: Dict[str, Any], error: Exception) -> None:
+        if on_failure is not None:
+            on_failure(lead_data["lead"], error)
+        return None
+
+    if get_option(state, "async_mode"):
+        rate_limiter = create_rate_limiter(state)
+
+        async def generate_one(lead_data):
+            try:
+                return done(lead_data, await retry_policy.acall(
+                    lambda: recommender.agenerate_approach(lead_data, rate_limiter), "approach"
+                ))
+            except LeadFailure as e:
+                return failed(lead_data, e)
+
+        return run_coroutine(map_concurrently(leads_data, generate_one, get_option(state, "max_concurrency")))
+
+    def generate_one(lead_data):
+        try:
+            return done(lead_data, retry_policy.call(lambda: recommender.generate_approach(lead_data), "approach"))
+        except LeadFailure as e:
+            return failed(lead_data, e)
+
+    return [generate_one(lead_data) for lead_data in leads_data]
 
 
 def recommend_approaches(state: LeadProcessingState) -> LeadProcessingState:
-    """Recomenda abordagens personalizadas para cada lead."""
+    """Recomenda abordagens personalizadas para cada lead (exceto as já reaproveitadas).
+
+    Com approach_top_k/approach_min_score, apenas os leads mais prioritários recebem a abordagem
+    imediatamente; os demais ficam em deferred_approaches e são gerados sob demanda (get_approach).
+    """
     try:
-        recommender = ApproachRecommender()
-        lead_approaches = {}
+        from src.approach_recommender import ApproachRecommender
 
-        for lead_data in state["prioritized_leads"]:
+        recommender = ApproachRecommender(cache=get_cache(state))
+        lead_approaches = dict(state.get("lead_approaches", {}))
+        completed = load_progress(state, "approach")
+
+        eager, deferred = select_eager_approaches(state, state["prioritized_leads"])
+        for lead_data in eager:
             lead_id = lead_data["lead"]["id"]
-            approach = recommender.generate_approach(lead_data)
-            lead_approaches[lead_id] = approach
+            if lead_id not in lead_approaches and str(lead_id) in completed:
+                lead_approaches[lead_id] = completed[str(lead_id)]
+
+        pending = [lead_data for lead_data in eager if lead_data["lead"]["id"] not in lead_approaches]
+        failures = []
+        approaches = generate_approach_list(
+            state, recommender, pending, progress_recorder(state, "approach"),
+            on_failure=lambda lead, error: failures.append(failure_record(lead["id"], error))
+        )
+
+        for lead_data, approach in zip(pending, approaches):
+            if approach is not None:
+                lead_approaches[lead_data["lead"]["id"]] = approach
+
+        deferred_ids = [
+            lead_data["lead"]["id"] for lead_data in deferred if lead_data["lead"]["id"] not in lead_approaches
+        ]
+
+        return {"lead_approaches": lead_approaches, "deferred_approaches": deferred_ids,
+                "failed_leads": state.get("failed_leads", []) + failures}
+    except Exception as e:
+        return {"error": f"Erro ao recomendar abordagens: {str(e)}"}
+
+
+def pipeline_leads(state: LeadProcessingState,
+                   on_lead_ready: Optional[Callable[[Dict[str, Any]], None]] = None) -> LeadProcessingState:
+    """Processa cada lead de ponta a ponta (normalização, qualificação, pontuação e abordagem) em pipeline.
+
+    Os leads não esperam uns pelos outros entre as etapas; on_lead_ready é chamado assim que
+    cada lead tem sua abordagem pronta. Apenas a ordenação final (rank_leads) espera todos.
+    """
+    try:
+        from src.approach_recommender import ApproachRecommender
+
+        processor = LeadProcessor()
+        qualifier = create_qualifier(state)
+        prioritizer = LeadPrioritizer()
+        recommender = ApproachRecommender(cache=get_cache(state))
+        previous_results = get_previous_results(get_option(state, "previous_results"))
+        reference_date = datetime.datetime.now()
+        workers = get_option(state, "max_concurrency")
+        reused_ids = set()
+        completed_qualifications = load_progress(state, "qualification")
+        completed_approaches = load_progress(state, "approach")
+        record_qualification = progress_recorder(state, "qualification")
+        record_approach = progress_recorder(state, "approach")
+        rule_qualifier = RuleBasedQualifier() if get_option(state, "prequalify") else None
+        prequalified = []
+        retry_policy = create_retry_policy(state)
+        failures = []
+
+        def normalize(item):
+            index, lead = item
+            return {"index": index, "lead": prepare_lead(processor, lead)}
+
+        def qualify(lead_data):
+            previous = previous_results.lookup(lead_data["lead"])
+            if previous is not None:
+                reused_ids.add(lead_data["lead"]["id"])
+                lead_data["qualification"] = previous["qualification"]
+                lead_data["approach"] = previous.get("recommended_approach", "")
+            elif str(lead_data["lead"]["id"]) in completed_qualifications:
+                lead_data["qualification"] = completed_qualifications[str(lead_data["lead"]["id"])]
+                lead_data["approach"] = completed_approaches.get(str(lead_data["lead"]["id"]), "")
+            else:
+                prequalification = rule_qualifier.prequalify(lead_data["lead"]) if rule_qualifier else None
+                if prequalification is not None and rule_qualifier.is_decisive(prequalification):
+                    prequalified.append(prequalification)
+                    METRICS.record_avoided_calls("qualification")
+                    lead_data["qualification"] = prequalification
+                else:
+                    try:
+                        lead_data["qualification"] = retry_policy.call(
+                            lambda: qualifier.qualify_lead(qualifier.lead_info(lead_data["lead"])), "qualification"
+                        )
+                    except LeadFailure as e:
+                        # O lead sai do pipeline sem interromper os demais
+                        failures.append(failure_record(lead_data["lead"]["id"], e))
+                        lead_data["failed"] = True
+                        return lead_data
+                if record_qualification is not None:
+                    record_qualification(lead_data["lead"], lead_data["qualification"])
+            return lead_data
+
+        def score(lead_data):
+            if lead_data.get("failed"):
+                return lead_data
+            lead_data["prioritization"] = prioritizer.prioritize_lead(
+                lead_data["lead"], lead_data["qualification"], reference_date
+            )
+            return lead_data
+
+        min_score = get_option(state, "approach_min_score")
+        lazy = is_lazy_approach_mode(state)
+
+        def recommend(lead_data):
+            # No pipeline a posição final ainda é desconhecida: só o limiar de pontuação decide aqui,
+            # e rank_leads completa as abordagens do top-K.
+            if lead_data.get("failed"):
+                return lead_data
+            eager = not lazy or (min_score is not None and
+                                 lead_data["prioritization"]["priority_score"] >= min_score)
+            if not lead_data.get("approach") and eager:
+                try:
+                    lead_data["approach"] = retry_policy.call(
+                        lambda: recommender.generate_approach(lead_data), "approach"
+                    )
+                except LeadFailure as e:
+                    failures.append(failure_record(lead_data["lead"]["id"], e))
+                    return lead_data
+                if record_approach is not None:
+                    record_approach(lead_data["lead"], lead_data["approach"])
+            return lead_data
+
+        pipeline = StagedPipeline(
+            [
+                ("normalize", normalize, 1),
+                ("qualify", qualify, workers),
+                ("score", score, 1),
+                ("recommend", recommend, workers)
+            ],
+            queue_size=get_option(state, "pipeline_queue_size"),
+            profile_dir=get_option(state, "profile_dir")
+        )
+        def on_result(lead_data):
+            if on_lead_ready is not None and not lead_data.get("failed"):
+                on_lead_ready(lead_data)
+
+        completed = pipeline.run(enumerate(state["leads"]), on_result=on_result)
+        completed = [lead_data for lead_data in completed if not lead_data.get("failed")]
+        completed.sort(key=lambda lead_data: lead_data["index"])
+
+        lead_approaches = {}
+        for lead_data in completed:
+            # O próprio registro do pipeline vira a entrada priorizada {lead, qualification, prioritization}
+            del lead_data["index"]
+            approach = lead_data.pop("approach", "")
+            if approach:
+                lead_approaches[lead_data["lead"]["id"]] = approach
+
+        return {
+            "processed_leads": LeadTable(lead_data["lead"] for lead_data in completed),
+            "qualified_leads": [
+                {"lead": lead_data["lead"], "qualification": lead_data["qualification"]} for lead_data in completed
+            ],
+            "prioritized_leads": completed,
+            "lead_approaches": lead_approaches,
+            "failed_leads": state.get("failed_leads", []) + failures,
+            "run_stats": {
+                **state.get("run_stats", {}),
+                "incremental": {"reused": len(reused_ids), "qualified": len(completed) - len(reused_ids)},
+                **({"prequalification": prequalification_stats(len(completed) - len(reused_ids), prequalified)}
+                   if rule_qualifier else {})
+            }
+        }
 
-        return {**state, "lead_approaches": lead_approaches}
     except Exception as e:
-        return {**state, "error": f"Erro ao recomendar abordagens: {str(e)}"}
+        return {"error": f"Erro no pipeline de leads: {str(e)}"}
+
+
+def rank_leads(state: LeadProcessingState) -> LeadProcessingState:
+    """Ordena os leads do pipeline por prioridade, depois que todos foram concluídos.
+
+    No modo de abordagens sob demanda, completa as abordagens do top-K que o pipeline adiou.
+    Com a opção prioritize_top_k, mantém apenas os K leads mais prioritários.
+    """
+    try:
+        updates = {
+            "prioritized_leads": sorted(
+                state["prioritized_leads"],
+                key=lambda x: x["prioritization"]["priority_score"],
+                reverse=True
+            )[:get_option(state, "prioritize_top_k")]
+        }
+
+        if is_lazy_approach_mode(state):
+            updates.update(recommend_approaches({**state, **updates}))
+        return updates
+
+    except Exception as e:
+        return {"error": f"Erro ao ordenar leads: {str(e)}"}
 
 
 def check_errors(state: LeadProcessingState) -> str:
@@ -99,23 +717,72 @@ def check_errors(state: LeadProcessingState) -> str:
 def handle_error(state: LeadProcessingState) -> LeadProcessingState:
     """Lida com erros no fluxo de trabalho."""
     print(f"Erro detectado: {state['error']}")
-    return {**state}
+    return {}
+
+
+def create_pipelined_workflow_graph(on_lead_ready: Optional[Callable[[Dict[str, Any]], None]] = None):
+    """Cria o grafo em pipeline: cada lead flui sozinho pelas etapas e só a ordenação final espera todos."""
+
+    from langgraph.graph import StateGraph, END
+
+    workflow = StateGraph(LeadProcessingState)
+
+    workflow.add_node(
+        "pipeline_leads",
+        instrument_node("pipeline_leads", lambda state: pipeline_leads(state, on_lead_ready))
+    )
+    workflow.add_node("rank_leads", instrument_node("rank_leads", rank_leads))
+    workflow.add_node("handle_error", instrument_node("handle_error", handle_error))
+
+    workflow.set_entry_point("pipeline_leads")
+
+    workflow.add_conditional_edges(
+        "pipeline_leads",
+        check_errors,
+        {
+            "handle_error": "handle_error",
+            "continue": "rank_leads"
+        }
+    )
+
+    workflow.add_conditional_edges(
+        "rank_leads",
+        check_errors,
+        {
+            "handle_error": "handle_error",
+            "continue": END
+        }
+    )
+
+    workflow.add_edge("handle_error", END)
 
+    return workflow.compile()
+
+
+def create_workflow_graph(dedup: bool = False):
+    """Cria o grafo de fluxo de trabalho para processamento de leads.
 
-def create_workflow_graph():
-    """Cria o grafo de fluxo de trabalho para processamento de leads."""
+    Com dedup, o nó deduplicate_leads é inserido entre process_leads e qualify_leads.
+    """
+
+    from langgraph.graph import StateGraph, END
 
     workflow = StateGraph(LeadProcessingState)
+    after_processing = "deduplicate_leads" if dedup else "qualify_leads"
 
-    workflow.add_node("process_leads", process_leads)
-    workflow.add_node("qualify_leads", qualify_leads)
-    workflow.add_node("prioritize_leads", prioritize_leads)
-    workflow.add_node("recommend_approaches", recommend_approaches)
-    workflow.add_node("handle_error", handle_error)
+    workflow.add_node("process_leads", instrument_node("process_leads", process_leads))
+    if dedup:
+        workflow.add_node("deduplicate_leads", instrument_node("deduplicate_leads", deduplicate_leads))
+    workflow.add_node("qualify_leads", instrument_node("qualify_leads", qualify_leads))
+    workflow.add_node("prioritize_leads", instrument_node("prioritize_leads", prioritize_leads))
+    workflow.add_node("recommend_approaches", instrument_node("recommend_approaches", recommend_approaches))
+    workflow.add_node("handle_error", instrument_node("handle_error", handle_error))
 
     workflow.set_entry_point("process_leads")
 
-    workflow.add_edge("process_leads", "qualify_leads")
+    workflow.add_edge("process_leads", after_processing)
+    if dedup:
+        workflow.add_edge("deduplicate_leads", "qualify_leads")
     workflow.add_edge("qualify_leads", "prioritize_leads")
     workflow.add_edge("prioritize_leads", "recommend_approaches")
     workflow.add_edge("recommend_approaches", END)
@@ -125,10 +792,20 @@ def create_workflow_graph():
         check_errors,
         {
             "handle_error": "handle_error",
-            "continue": "qualify_leads"
+            "continue": after_processing
         }
     )
 
+    if dedup:
+        workflow.add_conditional_edges(
+            "deduplicate_leads",
+            check_errors,
+            {
+                "handle_error": "handle_error",
+                "continue": "qualify_leads"
+            }
+        )
+
     workflow.add_conditional_edges(
         "qualify_leads",
         check_errors,
@@ -161,57 +838,794 @@ def create_workflow_graph():
     return workflow.compile()
 
 
-def run_lead_qualification_system(leads_data: List[Dict[str, Any]]):
-    """Executa o sistema de qualificação de leads."""
-
-    workflow = create_workflow_graph()
-
-    initial_state = {
+def build_initial_state(leads_data: List[Dict[str, Any]], options: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Monta o estado inicial do fluxo de trabalho."""
+    return {
         "leads": leads_data,
         "processed_leads": [],
         "qualified_leads": [],
         "prioritized_leads": [],
         "lead_approaches": {},
+        "deferred_approaches": [],
+        "failed_leads": [],
+        "deferred_leads": [],
+        "duplicate_of": {},
         "current_lead_index": -1,
-        "error": ""
+        "error": "",
+        "options": {**DEFAULT_RUN_OPTIONS, **(options or {})},
+        "run_stats": {}
     }
 
-    result = workflow.invoke(initial_state)
 
+def create_graph_for_options(options: Dict[str, Any],
+                             on_lead_ready: Optional[Callable[[Dict[str, Any]], None]] = None):
+    """Cria o grafo adequado ao modo de execução (em etapas ou em pipeline)."""
+    if options["pipelined"] and scheduling_enabled(options):
+        raise ValueError("O modo em pipeline não aceita orçamento de tokens/custo nem prazo")
+    if options["pipelined"] and options.get("dedup"):
+        raise ValueError("O modo em pipeline não aceita a detecção de leads quase duplicados (dedup)")
+    if options["pipelined"]:
+        return create_pipelined_workflow_graph(on_lead_ready)
+    return create_workflow_graph(dedup=options.get("dedup", False))
+
+
+def start_tracked_run(options: Optional[Dict[str, Any]]) -> Optional[RunProgressStore]:
+    """Registra no RunProgressStore o início (ou a retomada) de uma execução com run_id.
+
+    Deve ser chamado uma vez por execução, e não por lote ou shard, para que as tentativas
+    contem as execuções. Retorna o armazenamento usado, ou None sem run_id.
+    """
+    run_options = {**DEFAULT_RUN_OPTIONS, **(options or {})}
+    if not run_options.get("run_id"):
+        return None
+
+    store = get_run_store(run_options["checkpoint_path"])
+    store.start_run(run_options["run_id"], run_options.get("input_file"), run_options)
+    return store
+
+
+def finish_tracked_run(store: Optional[RunProgressStore], options: Dict[str, Any], failed: bool):
+    """Marca o status final da execução registrada por start_tracked_run."""
+    if store is not None:
+        store.finish_run(options["run_id"], "failed" if failed else "completed")
+
+
+def run_lead_qualification_system(leads_data: List[Dict[str, Any]], options: Optional[Dict[str, Any]] = None,
+                                  on_lead_ready: Optional[Callable[[Dict[str, Any]], None]] = None,
+                                  track_run: bool = True):
+    """Executa o sistema de qualificação de leads.
+
+    As opções de execução (ex.: async_mode, max_concurrency) sobrescrevem DEFAULT_RUN_OPTIONS.
+    Com a opção pipelined, on_lead_ready recebe cada lead assim que sua abordagem fica pronta.
+    Com track_run=False, o início e o fim da execução com run_id ficam a cargo de quem chama
+    (ex.: uma execução em lotes ou em shards).
+    """
+    initial_state = build_initial_state(leads_data, options)
+    run_options = initial_state["options"]
+    workflow = create_graph_for_options(run_options, on_lead_ready)
+
+    # Execução com checkpoint: cada resultado por lead é gravado no RunProgressStore assim que fica
+    # pronto, de modo que uma retomada refaz o grafo processando só os leads que faltam. O estado do
+    # grafo em si não é persistido: ele é reconstruído a partir da entrada e desse progresso.
+    store = start_tracked_run(run_options) if track_run else None
+    try:
+        result = workflow.invoke(initial_state)
+    except BaseException:
+        finish_tracked_run(store, run_options, failed=True)
+        raise
+
+    finish_tracked_run(store, run_options, failed=bool(result.get("error", "")))
     return result
 
 
-def save_results_to_file(result: Dict[str, Any], output_file: str):
-    """Salva os resultados em um arquivo JSON."""
-    output_data = {
-        "prioritized_leads": []
+def format_result_record(lead_data: Dict[str, Any], approach: str) -> Dict[str, Any]:
+    """Monta o registro de saída de um lead priorizado."""
+    return {
+        "id": lead_data["lead"]["id"],
+        "name": lead_data["lead"]["name"],
+        "company": lead_data["lead"]["company"],
+        "qualification": lead_data["qualification"],
+        "prioritization": lead_data["prioritization"],
+        "recommended_approach": approach,
+        "fingerprint": lead_data["lead"].get("fingerprint", "")
     }
 
+
+def iter_result_records(result: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    """Gera os registros de saída dos leads priorizados, um por vez."""
     for lead_data in result["prioritized_leads"]:
-        lead_id = lead_data["lead"]["id"]
-        approach = result["lead_approaches"].get(lead_id, "")
+        approach = result["lead_approaches"].get(lead_data["lead"]["id"], "")
+        yield format_result_record(lead_data, approach)
+
+
+def save_results_to_file(result: Dict[str, Any], output_file: str):
+    """Salva os resultados em um arquivo JSON."""
+    with JsonResultWriter(output_file) as writer:
+        for record in iter_result_records(result):
+            writer.write(record)
+
+    print(f"Resultados salvos em {output_file}")
+
+
+def create_results_writer(options: Optional[Dict[str, Any]]) -> Optional[ResultsStoreWriter]:
+    """Cria o writer do banco de resultados indexado, se a opção results_db estiver definida."""
+    options = options or {}
+    if not options.get("results_db"):
+        return None
+    run_id = options.get("run_id") or options.get("results_run_id") or RunProgressStore.new_run_id()
+    return ResultsStoreWriter(get_results_store(options["results_db"]), run_id)
+
+
+def write_lead_result(writer: Optional[ResultsStoreWriter], lead_data: Dict[str, Any], record: Dict[str, Any]):
+    """Acrescenta o registro de um lead ao banco de resultados, com a indústria usada nos filtros."""
+    if writer is not None:
+        writer.write(record, lead_data["lead"].get("industry", ""))
+
+
+def save_results_to_store(result: Dict[str, Any], options: Optional[Dict[str, Any]]):
+    """Grava os resultados da execução no banco de resultados indexado (opção results_db)."""
+    writer = create_results_writer(options)
+    if writer is None:
+        return
+
+    with writer:
+        for lead_data in result["prioritized_leads"]:
+            approach = result["lead_approaches"].get(lead_data["lead"]["id"], "")
+            write_lead_result(writer, lead_data, format_result_record(lead_data, approach))
+
+    print(f"Resultados gravados no banco {options['results_db']} (execução {writer.run_id}, {writer.count} leads)")
+
+
+def create_dead_letter_queue(options: Optional[Dict[str, Any]], output_file: str) -> DeadLetterQueue:
+    """Cria a fila de mensagens mortas da execução (opção dead_letter_path ou <saída>.dead_letter.jsonl)."""
+    return DeadLetterQueue((options or {}).get("dead_letter_path") or dead_letter_path_for(output_file))
+
+
+def reprocess_output_path(queue_path: str) -> str:
+    """Saída sugerida para reprocessar um arquivo de leads, sem sobrescrever os resultados principais."""
+    base, _ = os.path.splitext(queue_path)
+    return base + ".reprocessados.json"
+
+
+def flush_dead_letter_queue(dead_letter: DeadLetterQueue):
+    """Grava a fila de mensagens mortas e informa como reprocessar os leads que falharam."""
+    count = dead_letter.flush()
+    if count:
+        print(f"Leads com falha: {count}, gravados em {dead_letter.path} (reprocesse apenas eles com "
+              f"--input {dead_letter.path} --output {reprocess_output_path(dead_letter.path)})")
+
+
+def create_deferred_queue(options: Optional[Dict[str, Any]], output_file: str) -> Optional[DeferredLeadsQueue]:
+    """Cria o arquivo de leads adiados pelo agendador (opção deferred_path ou <saída>.deferred.jsonl)."""
+    if not scheduling_enabled(options):
+        return None
+    return DeferredLeadsQueue(options.get("deferred_path") or deferred_path_for(output_file))
+
+
+def flush_deferred_queue(deferred: Optional[DeferredLeadsQueue]):
+    """Grava os leads adiados e informa como processá-los na próxima execução."""
+    if deferred is None:
+        return
+    count = deferred.flush()
+    if count:
+        print(f"Leads adiados para a próxima execução: {count}, gravados em {deferred.path} (processe-os "
+              f"com --input {deferred.path} --output {reprocess_output_path(deferred.path)})")
+
+
+def remaining_budget_options(options: Dict[str, Any], scheduler_stats: Dict[str, Any]) -> Dict[str, Any]:
+    """Desconta de token_budget e cost_budget o que um lote já consumiu (modo em lotes)."""
+    options = dict(options)
+    if options.get("token_budget") is not None:
+        options["token_budget"] = max(0, options["token_budget"] - scheduler_stats.get("estimated_tokens", 0))
+    if options.get("cost_budget") is not None:
+        options["cost_budget"] = max(0.0, options["cost_budget"] - scheduler_stats.get("estimated_cost", 0.0))
+    return options
+
+
+def run_streaming_qualification(input_file: str, output_file: str, batch_size: int,
+                                options: Optional[Dict[str, Any]] = None) -> int:
+    """Processa um arquivo de leads em lotes, gravando cada lead priorizado em JSONL assim que fica pronto.
+
+    A ordenação por prioridade é feita dentro de cada lote; no modo em pipeline, cada lead é
+    gravado assim que sua abordagem fica pronta, na ordem de conclusão.
+    """
+    lead_processor = LeadProcessor()
+    total = 0
+
+    # Carrega os resultados anteriores antes de abrir a saída, que pode ser o mesmo arquivo
+    get_previous_results((options or {}).get("previous_results"))
+
+    pipelined = {**DEFAULT_RUN_OPTIONS, **(options or {})}["pipelined"]
+    dead_letter = create_dead_letter_queue(options, output_file)
+    deferred = create_deferred_queue(options, output_file)
+    store_writer = create_results_writer(options)
+
+    run_store = start_tracked_run(options)
+    batch_errors, completed = 0, False
+
+    with JsonlResultWriter(output_file) as writer:
+        def write_lead(lead_data: Dict[str, Any]):
+            record = format_result_record(lead_data, lead_data.get("approach", ""))
+            writer.write(record)
+            write_lead_result(store_writer, lead_data, record)
+
+        try:
+            for batch in iter_batches(lead_processor.iter_leads_from_file(input_file), batch_size):
+                result = run_lead_qualification_system(batch, options, write_lead if pipelined else None,
+                                                       track_run=False)
+
+                if result.get("error", ""):
+                    print(f"Erro durante a execução do lote: {result['error']}")
+                    batch_errors += 1
+                    continue
+
+                dead_letter.add_failures(batch, result.get("failed_leads", []))
+                if deferred is not None:
+                    deferred.add_failures(batch, result.get("deferred_leads", []))
+                    # O orçamento vale para o arquivo inteiro: cada lote usa o que sobrou dos anteriores
+                    options = remaining_budget_options(options, result["run_stats"].get("scheduler", {}))
+                if not pipelined:
+                    for lead_data in result["prioritized_leads"]:
+                        write_lead(
+                            {**lead_data, "approach": result["lead_approaches"].get(lead_data["lead"]["id"], "")})
+                total += len(batch)
+            completed = batch_errors == 0
+        finally:
+            finish_tracked_run(run_store, options, failed=not completed)
+
+    if store_writer is not None:
+        store_writer.close()
+    print(f"Resultados salvos em {output_file}")
+    flush_dead_letter_queue(dead_letter)
+    flush_deferred_queue(deferred)
+    return total
+
+
+def run_prioritize_only(input_file: str, previous_results: str,
+                        options: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Reordena resultados existentes sem chamar o LLM (nem importar LangChain/LangGraph).
+
+    Cada lead da entrada é associado, pelo id, ao resultado anterior cujos dados BANT não mudaram;
+    só a priorização, que depende de last_interaction e interactions, é recalculada. Leads sem
+    resultado anterior válido ficam de fora e são contados em run_stats["prioritize_only"].
+    """
+    lead_processor = LeadProcessor()
+    previous = get_previous_results(previous_results)
+    state = build_initial_state([], options)
+    state["processed_leads"] = LeadTable()
+    missing = 0
+
+    for lead in lead_processor.iter_leads_from_file(input_file):
+        processed_lead = prepare_lead(lead_processor, lead)
+        record = previous.lookup(processed_lead)
+        if record is None:
+            missing += 1
+            continue
+
+        state["processed_leads"].append(processed_lead)
+        state["qualified_leads"].append({"lead": processed_lead, "qualification": record["qualification"]})
+        state["lead_approaches"][processed_lead["id"]] = record.get("recommended_approach", "")
+
+    state["run_stats"] = {"prioritize_only": {"reused": len(state["qualified_leads"]), "missing": missing}}
+    return {**state, **instrument_node("prioritize_leads", prioritize_leads)(state)}
+
+
+def run_shard(input_file: str, output_file: str, shard_index: int = 0, shard_count: int = 1,
+              options: Optional[Dict[str, Any]] = None, track_run: bool = True) -> int:
+    """Executa o grafo para um shard da entrada e grava seus leads, ordenados por prioridade, em JSONL.
+
+    Com shard_count > 1, apenas os leads do shard shard_index (pelo id) são processados, o que
+    permite distribuir a mesma entrada entre várias máquinas. Retorna o número de leads gravados,
+    ou -1 em caso de erro.
+    """
+    lead_processor = LeadProcessor()
+    leads_data = list(in_shard(lead_processor.iter_leads_from_file(input_file), shard_index, shard_count))
+
+    result = run_lead_qualification_system(leads_data, options, track_run=track_run)
+    if result.get("error", ""):
+        print(f"Erro no shard {shard_index}: {result['error']}")
+        return -1
 
-        output_data["prioritized_leads"].append({
-            "id": lead_id,
-            "name": lead_data["lead"]["name"],
-            "company": lead_data["lead"]["company"],
-            "qualification": lead_data["qualification"],
-            "prioritization": lead_data["prioritization"],
-            "recommended_approach": approach
-        })
+    # Cada shard grava sua própria fila de mensagens mortas ao lado da saída
+    dead_letter = DeadLetterQueue(dead_letter_path_for(output_file))
+    dead_letter.add_failures(leads_data, result.get("failed_leads", []))
+    dead_letter.flush()
+    if scheduling_enabled(options):
+        deferred = DeferredLeadsQueue(deferred_path_for(output_file))
+        deferred.add_failures(leads_data, result.get("deferred_leads", []))
+        deferred.flush()
 
-    with open(output_file, 'w') as file:
-        json.dump(output_data, file, indent=2)
+    # Os shards gravam no mesmo banco de resultados; o SQLite serializa as transações entre processos
+    save_results_to_store(result, options)
+    return write_ranked_shard(iter_result_records(result), output_file)
 
+
+def run_shard_process(input_file: str, output_file: str,
+                      options: Optional[Dict[str, Any]]) -> Tuple[int, Dict[str, Any]]:
+    """Executa um shard em um processo do pool e retorna o número de leads gravados e suas métricas.
+
+    O início e o fim da execução com run_id são registrados pelo processo principal.
+    """
+    # Um processo criado por fork herda as métricas já coletadas pelo processo principal
+    METRICS.reset()
+    count = run_shard(input_file, output_file, options=options, track_run=False)
+    return count, METRICS.snapshot()
+
+
+def remove_shard_queues(shard_files: List[str]):
+    """Remove os arquivos de falhas e de leads adiados gravados ao lado de cada shard."""
+    for shard_file in shard_files:
+        for path in (dead_letter_path_for(shard_file), deferred_path_for(shard_file)):
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def run_sharded_qualification(input_file: str, output_file: str, shard_count: int,
+                              workers: Optional[int] = None, options: Optional[Dict[str, Any]] = None) -> int:
+    """Divide a entrada em shards, processa cada um em um processo separado e intercala os resultados.
+
+    Cada shard roda o grafo de forma independente e grava um JSONL ordenado; o resultado final é
+    produzido por um k-way merge em fluxo, sem carregar os shards inteiros em memória. Orçamentos
+    de tokens e de custo e os limites por minuto são divididos igualmente entre os shards. A execução com run_id é
+    registrada uma única vez, aqui, e as métricas dos shards são agregadas em METRICS.
+    """
+    # O número de shards fica com a execução, para que uma retomada use os mesmos checkpoints por shard
+    options = {**(options or {}), "shards": shard_count}
+    run_options = {**DEFAULT_RUN_OPTIONS, **options}
+    shard_options = dict(options)
+    if scheduling_enabled(options):
+        for name in ("token_budget", "cost_budget"):
+            if shard_options.get(name) is not None:
+                shard_options[name] = shard_options[name] / shard_count
+    # Cada processo tem o seu limitador de taxa: os limites por minuto também são divididos
+    for name in ("requests_per_minute", "tokens_per_minute"):
+        if run_options[name]:
+            shard_options[name] = max(1, run_options[name] // shard_count)
+    # Cada shard grava o progresso em um banco próprio, evitando escritas concorrentes no mesmo arquivo
+    options_per_shard = [
+        {**shard_options, "checkpoint_path": shard_checkpoint_path(run_options["checkpoint_path"], index, shard_count)}
+        for index in range(shard_count)
+    ]
+    shard_dir = run_options["shard_dir"] or DEFAULT_RUN_OPTIONS["shard_dir"]
+    input_files = split_leads(LeadProcessor().iter_leads_from_file(input_file), shard_dir, shard_count)
+    shard_files = [
+        os.path.join(shard_dir, shard_file_name(index, shard_count)) for index in range(shard_count)
+    ]
+
+    # As filas intermediárias dos shards pertencem a esta execução: as de uma execução anterior são descartadas
+    remove_shard_queues(shard_files)
+    run_store = start_tracked_run(options)
+    try:
+        with ProcessPoolExecutor(max_workers=workers or shard_count) as executor:
+            shard_results = list(executor.map(run_shard_process, input_files, shard_files, options_per_shard))
+    except BaseException:
+        finish_tracked_run(run_store, options, failed=True)
+        raise
+
+    for _, snapshot in shard_results:
+        METRICS.merge(snapshot)
+    failed = [index for index, (count, _) in enumerate(shard_results) if count < 0]
+    finish_tracked_run(run_store, options, failed=bool(failed))
+    if failed:
+        print(f"Shards com erro: {failed}; a saída final não foi gerada.")
+        return -1
+
+    # O top-K global está contido na união dos top-K de cada shard
+    total = merge_ranked_shards(shard_files, output_file, (options or {}).get("prioritize_top_k"))
     print(f"Resultados salvos em {output_file}")
 
+    dead_letter = create_dead_letter_queue(options, output_file)
+    for shard_file in shard_files:
+        dead_letter.extend_from_file(dead_letter_path_for(shard_file))
+    flush_dead_letter_queue(dead_letter)
+
+    deferred = create_deferred_queue(options, output_file)
+    if deferred is not None:
+        for shard_file in shard_files:
+            deferred.extend_from_file(deferred_path_for(shard_file))
+        flush_deferred_queue(deferred)
+    remove_shard_queues(shard_files)
+    return total
+
+
+def create_service_batch_runner(options: Optional[Dict[str, Any]] = None,
+                                ranking: Optional["RankingIndex"] = None) -> Callable[[List[Dict[str, Any]]], List[Dict[str, Any]]]:
+    """Prepara o serviço residente: compila o grafo e cria os clientes do LLM uma única vez.
+
+    Retorna a função que processa um micro-lote em uma única execução do grafo e devolve, na ordem
+    recebida, o registro de resultado de cada lead (ou {"id", "error", "stage"} se ele falhou).
+    Com ranking, os leads priorizados também entram na fila de prioridade online.
+    """
+    from src.approach_recommender import ApproachRecommender
+    from src.lead_qualifier import LeadQualifier
+    from src.llm_clients import get_chat_model
+
+    # Checkpoints e resultados anteriores pertencem a execuções em arquivo, não ao serviço
+    service_options = {**SERVICE_RUN_OPTIONS, **(options or {}), "run_id": None, "previous_results": None}
+    run_options = {**DEFAULT_RUN_OPTIONS, **service_options}
+    workflow = create_graph_for_options(run_options)
+    for temperature in (LeadQualifier().temperature, ApproachRecommender().temperature):
+        get_chat_model(LLM_MODEL, temperature)
+    if run_options["cascade"]:
+        get_chat_model(run_options["cascade_model"], LeadQualifier().temperature)
+
+    request_ids = itertools.count(1)
+
+    def run_batch(leads: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        # Leads sem id recebem um id próprio, usado para associar cada resultado à sua requisição
+        leads = [lead if lead.get("id") not in (None, "") else {**lead, "id": f"request-{next(request_ids)}"}
+                 for lead in leads]
+        result = workflow.invoke(build_initial_state(leads, service_options))
+        if result.get("error", ""):
+            raise RuntimeError(result["error"])
+
+        if ranking is not None:
+            for lead_data in result["prioritized_leads"]:
+                ranking.upsert(lead_data)
+
+        records = {str(record["id"]): record for record in iter_result_records(result)}
+        failures = {str(failure["id"]): failure for failure in result.get("failed_leads", [])}
+        return [
+            records.get(str(lead["id"])) or {"id": lead["id"], "error": "Lead não processado", "stage": "unknown",
+                                             **failures.get(str(lead["id"]), {})}
+            for lead in leads
+        ]
+
+    return run_batch
+
+
+def run_service(options: Optional[Dict[str, Any]] = None, host: str = SERVICE_HOST, port: int = SERVICE_PORT,
+                window_ms: Optional[float] = None, max_batch_size: Optional[int] = None):
+    """Executa o serviço HTTP residente de qualificação até ser interrompido (Ctrl+C)."""
+    from src.ranking_index import RankingIndex
+    from src.service import MicroBatcher, QualificationServer
+
+    batcher_options = {}
+    if window_ms is not None:
+        batcher_options["window_seconds"] = window_ms / 1000
+    if max_batch_size is not None:
+        batcher_options["max_batch_size"] = max_batch_size
+
+    ranking = RankingIndex()
+    batcher = MicroBatcher(create_service_batch_runner(options, ranking), **batcher_options)
+    server = QualificationServer((host, port), batcher, ranking=ranking)
+    print(f"Serviço de qualificação em http://{host}:{server.server_address[1]} "
+          f"(POST /qualify, POST /interaction, GET /queue, GET /health, GET /metrics)")
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("Encerrando o serviço...")
+    finally:
+        server.server_close()
+        batcher.close()
+
+
+def iter_batches(items: Iterable[Dict[str, Any]], batch_size: int) -> Iterator[List[Dict[str, Any]]]:
+    """Agrupa um iterável em listas de até batch_size elementos."""
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """Lê os argumentos de linha de comando."""
+    parser = argparse.ArgumentParser(description="Sistema de Qualificação e Priorização de Leads")
+    parser.add_argument("--input", default="data/sample_leads.json",
+                        help="Arquivo de leads (array JSON ou JSONL)")
+    parser.add_argument("--output", default="resultados_leads.json",
+                        help="Arquivo de saída dos resultados")
+    parser.add_argument("--serve", action="store_true",
+                        help="Executa o serviço HTTP residente de qualificação em vez de processar --input")
+    parser.add_argument("--host", default=SERVICE_HOST, help="Endereço do serviço (--serve)")
+    parser.add_argument("--port", type=int, default=SERVICE_PORT, help="Porta do serviço (--serve)")
+    parser.add_argument("--batch-window-ms", type=float, default=SERVICE_BATCH_WINDOW_MS,
+                        help="Janela de agrupamento dos leads recebidos em um micro-lote (--serve)")
+    parser.add_argument("--max-batch-size", type=int, default=SERVICE_MAX_BATCH_SIZE,
+                        help="Tamanho máximo de um micro-lote (--serve)")
+    parser.add_argument("--stage", choices=["full", "prioritize-only"], default="full",
+                        help="prioritize-only reordena os resultados de --previous-results sem chamar o LLM")
+    parser.add_argument("--shards", type=int, default=0,
+                        help="Divide a entrada em N shards processados em paralelo, um processo por shard")
+    parser.add_argument("--workers", type=int, help="Número máximo de processos no modo --shards")
+    parser.add_argument("--shard-index", type=int,
+                        help="Processa só este shard (0 a --shard-count - 1), gravando JSONL ordenado em --output")
+    parser.add_argument("--shard-count", type=int, default=1, help="Total de shards (execução distribuída)")
+    parser.add_argument("--merge-shards", nargs="+", metavar="SHARD",
+                        help="Intercala arquivos de shard já ordenados no formato de resultados_leads.json")
+    parser.add_argument("--stream-batch-size", type=int, default=0,
+                        help="Processa o arquivo em lotes deste tamanho, gravando JSONL incrementalmente")
+    parser.add_argument("--previous-results",
+                        help="Resultados de uma execução anterior; só leads novos ou alterados vão ao LLM")
+    parser.add_argument("--async", dest="async_mode", action="store_true",
+                        help="Chama o LLM de forma assíncrona e concorrente (qualificação e abordagens)")
+    parser.add_argument("--max-concurrency", type=int, help="Máximo de chamadas simultâneas no modo --async")
+    parser.add_argument("--requests-per-minute", type=int,
+                        help="Limite de requisições por minuto ao LLM no modo --async (dividido entre os shards)")
+    parser.add_argument("--tokens-per-minute", type=int,
+                        help="Limite de tokens por minuto ao LLM no modo --async (dividido entre os shards)")
+    parser.add_argument("--batch-size", type=int,
+                        help="Leads qualificados por requisição ao LLM (prompt em lote); 1 desativa o lote")
+    parser.add_argument("--pipelined", action="store_true",
+                        help="Processa cada lead de ponta a ponta em pipeline, sem barreiras entre as etapas")
+    parser.add_argument("--columnar", action="store_true",
+                        help="Prioriza os leads com o motor vetorizado (NumPy), com a mesma ordenação")
+    parser.add_argument("--top-k", type=int,
+                        help="Mantém apenas os K leads mais prioritários na saída (seleção parcial no modo --columnar)")
+    parser.add_argument("--approach-top-k", type=int,
+                        help="Gera abordagens imediatamente apenas para os K leads mais prioritários")
+    parser.add_argument("--approach-min-score", type=float,
+                        help="Gera abordagens imediatamente apenas para leads com priority_score acima do limiar")
+    parser.add_argument("--metrics-report", help="Grava o relatório de desempenho da execução (JSON)")
+    parser.add_argument("--prometheus-textfile", help="Grava as métricas no formato textfile do Prometheus")
+    parser.add_argument("--profile-dir", help="Perfila cada nó com cProfile, gravando <nó>.prof neste diretório")
+    parser.add_argument("--prequalify", action="store_true",
+                        help="Qualifica por regras locais os leads de classificação evidente, sem chamar o LLM")
+    parser.add_argument("--max-retries", type=int,
+                        help="Novas tentativas por lead em falhas transitórias (429, 5xx, timeout)")
+    parser.add_argument("--dead-letter",
+                        help="Arquivo JSONL dos leads que falharam (padrão: <saída>.dead_letter.jsonl)")
+    parser.add_argument("--dedup", action="store_true",
+                        help="Qualifica um lead por grupo de quase duplicados e replica o resultado aos demais "
+                             "(com --shards ou --stream-batch-size, dentro de cada shard ou lote)")
+    parser.add_argument("--dedup-threshold", type=float,
+                        help="Similaridade de Jaccard mínima para considerar dois leads duplicados (0 a 1)")
+    parser.add_argument("--dedup-report", help="Grava os grupos de duplicados e suas estatísticas (JSON)")
+    parser.add_argument("--results-db",
+                        help="Grava também os resultados no banco SQLite indexado (upsert por id do lead)")
+    parser.add_argument("--query-results", action="store_true",
+                        help="Consulta o banco --results-db em vez de processar --input")
+    parser.add_argument("--tier", help="Filtro da consulta: categoria do lead (hot, warm, ...)")
+    parser.add_argument("--priority-level", help="Filtro da consulta: nível de prioridade")
+    parser.add_argument("--industry", help="Filtro da consulta: indústria do lead")
+    parser.add_argument("--query-run-id", help="Filtro da consulta: execução que gravou o resultado")
+    parser.add_argument("--min-score", type=float, help="Filtro da consulta: priority_score mínimo")
+    parser.add_argument("--limit", type=int, default=RESULTS_QUERY_LIMIT,
+                        help="Quantidade máxima de leads da consulta (0 exporta todos para --output)")
+    parser.add_argument("--cascade", action="store_true",
+                        help="Qualifica primeiro com um modelo mais barato e escala ao modelo principal só os "
+                             "leads perto dos limiares de categoria")
+    parser.add_argument("--cascade-model", help="Modelo mais barato da cascata")
+    parser.add_argument("--cascade-margin", type=float,
+                        help="Distância máxima a um limiar de categoria para escalar o lead ao modelo principal")
+    parser.add_argument("--token-budget", type=int,
+                        help="Orçamento de tokens (estimados) para as qualificações; os leads de maior "
+                             "prioridade estimada vão primeiro e os demais são adiados")
+    parser.add_argument("--cost-budget", type=float, help="Orçamento de custo (US$ estimados) para as qualificações")
+    parser.add_argument("--deadline",
+                        help="Prazo (HH:MM ou data ISO) após o qual nenhum lead novo é enviado ao LLM")
+    parser.add_argument("--deferred",
+                        help="Arquivo JSONL dos leads adiados pelo orçamento/prazo (padrão: <saída>.deferred.jsonl)")
+    parser.add_argument("--compact-prompts", action="store_true",
+                        help="Usa prompts de qualificação compactos com resposta em modo JSON (menos tokens)")
+    parser.add_argument("--compact-interactions-budget", type=int,
+                        help="Caracteres do histórico de interações mantidos no modo compacto")
+    parser.add_argument("--checkpoint", action="store_true",
+                        help="Grava checkpoints duráveis da execução, permitindo retomá-la com --resume")
+    parser.add_argument("--run-id", help="Identificador da execução com checkpoint (implica --checkpoint)")
+    parser.add_argument("--resume", metavar="RUN_ID",
+                        help="Retoma uma execução com checkpoint, processando apenas os leads restantes")
+    parser.add_argument("--checkpoint-path",
+                        help="Banco SQLite do progresso das execuções com checkpoint (padrão: CHECKPOINT_PATH)")
+    args = parser.parse_args(argv)
+
+    # No modo em lotes, cada lote é ordenado separadamente e não há um top-K do arquivo inteiro
+    if args.top_k is not None and args.stream_batch_size > 0:
+        parser.error("--top-k não pode ser usado com --stream-batch-size")
+
+    # O pipeline (também usado pelo serviço) não tem uma etapa em que todos os leads pendentes
+    # sejam conhecidos para ordená-los pela prioridade estimada
+    if (args.pipelined or args.serve) and (args.token_budget is not None or args.cost_budget is not None
+                                           or args.deadline):
+        parser.error("--token-budget, --cost-budget e --deadline não podem ser usados com --pipelined ou --serve")
+    # Os grupos de duplicados só são conhecidos com todos os leads normalizados, o que o pipeline não espera
+    if (args.pipelined or args.serve) and (args.dedup or args.dedup_threshold is not None or args.dedup_report):
+        parser.error("--dedup não pode ser usado com --pipelined ou --serve")
+    return args
+
+
+def build_run_options(args: argparse.Namespace) -> Dict[str, Any]:
+    """Converte os argumentos de linha de comando em opções de execução."""
+    options = {}
+    if args.async_mode:
+        options["async_mode"] = True
+    if args.max_concurrency is not None:
+        options["max_concurrency"] = args.max_concurrency
+    if args.requests_per_minute is not None:
+        options["requests_per_minute"] = args.requests_per_minute
+    if args.tokens_per_minute is not None:
+        options["tokens_per_minute"] = args.tokens_per_minute
+    if args.batch_size is not None:
+        options["batch_size"] = args.batch_size
+    if args.previous_results:
+        options["previous_results"] = args.previous_results
+    if args.pipelined:
+        options["pipelined"] = True
+    if args.columnar:
+        options["columnar_prioritization"] = True
+    if args.top_k is not None:
+        options["prioritize_top_k"] = args.top_k
+    if args.approach_top_k is not None:
+        options["approach_top_k"] = args.approach_top_k
+    if args.approach_min_score is not None:
+        options["approach_min_score"] = args.approach_min_score
+    if args.profile_dir:
+        options["profile_dir"] = args.profile_dir
+    if args.prequalify:
+        options["prequalify"] = True
+    if args.max_retries is not None:
+        options["max_retries"] = args.max_retries
+    if args.dead_letter:
+        options["dead_letter_path"] = args.dead_letter
+    if args.dedup or args.dedup_threshold is not None or args.dedup_report:
+        options["dedup"] = True
+    if args.dedup_threshold is not None:
+        options["dedup_threshold"] = args.dedup_threshold
+    if args.dedup_report:
+        options["dedup_report"] = args.dedup_report
+    if args.results_db:
+        options["results_db"] = args.results_db
+        # Mesmo id de execução em todos os lotes e shards
+        options["results_run_id"] = args.run_id or RunProgressStore.new_run_id()
+    if args.cascade or args.cascade_model or args.cascade_margin is not None:
+        options["cascade"] = True
+    if args.cascade_model:
+        options["cascade_model"] = args.cascade_model
+    if args.cascade_margin is not None:
+        options["cascade_margin"] = args.cascade_margin
+    if args.token_budget is not None:
+        options["token_budget"] = args.token_budget
+    if args.cost_budget is not None:
+        options["cost_budget"] = args.cost_budget
+    if args.deadline:
+        # Resolvido na hora da chamada, para que uma retomada respeite o mesmo prazo
+        options["deadline"] = parse_deadline(args.deadline).isoformat(timespec="seconds")
+    if args.deferred:
+        options["deferred_path"] = args.deferred
+    if args.compact_prompts:
+        options["compact_prompts"] = True
+    if args.compact_interactions_budget is not None:
+        options["compact_interactions_budget"] = args.compact_interactions_budget
+    if args.checkpoint or args.run_id:
+        options["run_id"] = args.run_id or RunProgressStore.new_run_id()
+        options["input_file"] = args.input
+    if args.checkpoint_path:
+        options["checkpoint_path"] = args.checkpoint_path
+    return options
+
+
+def resume_options(args: argparse.Namespace) -> Optional[Dict[str, Any]]:
+    """Recupera as opções e o arquivo de entrada da execução a ser retomada (em --checkpoint-path)."""
+    checkpoint_path = args.checkpoint_path or DEFAULT_RUN_OPTIONS["checkpoint_path"]
+    run = get_run_store(checkpoint_path).get_run(args.resume)
+    if run is None:
+        print(f"Execução não encontrada em {checkpoint_path}: {args.resume}")
+        return None
+
+    args.input = run["input_file"] or args.input
+    print(f"Retomando a execução {args.resume} (status anterior: {run['status']}, "
+          f"tentativas: {run['attempts']})")
+    # O progresso continua no banco gravado com a execução
+    return {**run["options"], "run_id": args.resume,
+            "checkpoint_path": run["options"].get("checkpoint_path") or checkpoint_path}
 
-def main():
+
+def write_metrics(args: argparse.Namespace):
+    """Grava o relatório de desempenho e as métricas do Prometheus, se solicitados."""
+    if args.metrics_report:
+        METRICS.write_json_report(args.metrics_report)
+        print(f"Relatório de desempenho salvo em {args.metrics_report}")
+    if args.prometheus_textfile:
+        METRICS.write_prometheus_textfile(args.prometheus_textfile)
+
+
+def query_results(args: argparse.Namespace):
+    """Consulta o banco de resultados indexado; com --limit 0, exporta a consulta para --output."""
+    store = get_results_store(args.results_db)
+    filters = {"tier": args.tier, "priority_level": args.priority_level, "industry": args.industry,
+               "run_id": args.query_run_id}
+
+    if args.limit <= 0:
+        total = store.export_json(args.output, args.min_score, **filters)
+        print(f"Leads exportados: {total}")
+        print(f"Resultados salvos em {args.output}")
+        return
+
+    records = store.query(args.limit, 0, args.min_score, **filters)
+    print(f"Leads encontrados: {store.count(args.min_score, **filters)} (exibindo {len(records)})")
+    for i, record in enumerate(records, 1):
+        prioritization = record["prioritization"]
+        print(f"{i}. {record['name']} ({record['company']}) - {record['qualification'].get('tier', '')}, "
+              f"Prioridade {prioritization['priority_level']} (Score: {prioritization['priority_score']})")
+
+
+def main(argv: Optional[List[str]] = None):
     """Função principal para executar o sistema."""
+    args = parse_args(argv)
     print("Iniciando Sistema de Qualificação e Priorização de Leads...")
 
+    if args.resume:
+        options = resume_options(args)
+        if options is None:
+            return
+    else:
+        options = build_run_options(args)
+
+    if args.query_results:
+        if not args.results_db:
+            print("A consulta requer --results-db.")
+            return
+        query_results(args)
+        return
+
+    if args.serve:
+        run_service(options, args.host, args.port, args.batch_window_ms, args.max_batch_size)
+        return
+
+    if options.get("run_id"):
+        print(f"Execução com checkpoint: {options['run_id']} (retome com --resume {options['run_id']})")
+
+    if args.stage == "prioritize-only":
+        if not args.previous_results:
+            print("O estágio prioritize-only requer --previous-results.")
+            return
+
+        result = run_prioritize_only(args.input, args.previous_results, options)
+        write_metrics(args)
+        if result.get("error", ""):
+            print(f"Erro durante a execução: {result['error']}")
+            return
+
+        stats = result["run_stats"]["prioritize_only"]
+        print(f"Leads reordenados: {stats['reused']} (sem resultado anterior válido: {stats['missing']})")
+        save_results_to_file(result, args.output)
+        save_results_to_store(result, options)
+        return
+
+    if args.merge_shards:
+        total = merge_ranked_shards(args.merge_shards, args.output)
+        print(f"Leads intercalados: {total}")
+        print(f"Resultados salvos em {args.output}")
+        return
+
+    if args.shard_index is not None:
+        total = run_shard(args.input, args.output, args.shard_index, args.shard_count, options)
+        if total >= 0:
+            print(f"Shard {args.shard_index}/{args.shard_count}: {total} leads salvos em {args.output}")
+        write_metrics(args)
+        return
+
+    # Uma execução em shards é retomada com o mesmo número de shards
+    shard_count = args.shards if args.shards > 1 else options.get("shards", DEFAULT_RUN_OPTIONS["shards"])
+    if shard_count > 1:
+        total = run_sharded_qualification(args.input, args.output, shard_count, args.workers, options)
+        if total >= 0:
+            print(f"Leads processados: {total}")
+        write_metrics(args)
+        return
+
+    if args.stream_batch_size > 0:
+        try:
+            total = run_streaming_qualification(args.input, args.output, args.stream_batch_size, options)
+        except LeadFileError as e:
+            # A execução fica registrada como falha: com checkpoint, pode ser retomada após corrigir a entrada
+            print(f"Erro ao carregar leads: {e}")
+            return
+        print(f"Leads processados: {total}")
+        write_metrics(args)
+        return
+
     lead_processor = LeadProcessor()
-    leads_data = lead_processor.load_leads_from_file("data/sample_leads.json")
+    try:
+        leads_data = list(lead_processor.iter_leads_from_file(args.input))
+    except LeadFileError as e:
+        print(f"Erro ao carregar leads: {e}")
+        return
 
     if not leads_data:
         print("Nenhum lead encontrado. Verifique o arquivo de dados.")
@@ -219,7 +1633,8 @@ def main():
 
     print(f"Carregados {len(leads_data)} leads para processamento.")
 
-    result = run_lead_qualification_system(leads_data)
+    result = run_lead_qualification_system(leads_data, options)
+    write_metrics(args)
 
     if result.get("error", ""):
         print(f"Erro durante a execução: {result['error']}")
@@ -229,6 +1644,51 @@ def main():
     print(f"Leads processados: {len(result['processed_leads'])}")
     print(f"Leads qualificados e priorizados: {len(result['prioritized_leads'])}")
 
+    dead_letter = create_dead_letter_queue(options, args.output)
+    dead_letter.add_failures(leads_data, result.get("failed_leads", []))
+    flush_dead_letter_queue(dead_letter)
+
+    deferred = create_deferred_queue(options, args.output)
+    if deferred is not None:
+        deferred.add_failures(leads_data, result.get("deferred_leads", []))
+        flush_deferred_queue(deferred)
+
+    if result.get("deferred_approaches"):
+        print(f"Abordagens adiadas para geração sob demanda: {len(result['deferred_approaches'])}")
+
+    resumed_stats = result.get("run_stats", {}).get("resumed", {})
+    if resumed_stats.get("qualification"):
+        print(f"Qualificações recuperadas do checkpoint: {resumed_stats['qualification']}")
+
+    rule_stats = result.get("run_stats", {}).get("prequalification")
+    if rule_stats:
+        print(f"Pré-qualificação por regras: {rule_stats['llm_calls_avoided']} chamadas ao LLM "
+              f"evitadas de {rule_stats['evaluated']} leads avaliados (por categoria: {rule_stats['by_tier']})")
+
+    dedup_stats = result.get("run_stats", {}).get("dedup")
+    if dedup_stats:
+        print(f"Leads quase duplicados: {dedup_stats['duplicates']} em {dedup_stats['clusters_with_duplicates']} "
+              f"grupos (maior grupo: {dedup_stats['largest_cluster']}; chamadas ao LLM evitadas: "
+              f"{dedup_stats.get('llm_calls_avoided', 0)})")
+
+    scheduler_stats = result.get("run_stats", {}).get("scheduler")
+    if scheduler_stats:
+        print(f"Agendamento por orçamento/prazo: {scheduler_stats['dispatched']} leads enviados ao LLM em ordem de "
+              f"prioridade estimada, {scheduler_stats['deferred']} adiados ({scheduler_stats['deferred_by_reason']}); "
+              f"tokens estimados: {scheduler_stats['estimated_tokens']}, custo estimado: "
+              f"US$ {scheduler_stats['estimated_cost']}")
+
+    cascade_stats = METRICS.to_report()["llm"].get("qualification_cascade", {})
+    if cascade_stats.get("screened"):
+        print(f"Cascata de modelos: {cascade_stats['escalations']} de {cascade_stats['screened']} leads escalados "
+              f"ao modelo principal (taxa de escalonamento {cascade_stats['escalation_rate']:.1%}; "
+              f"respostas inválidas: {cascade_stats.get('escalations_parse_failure', 0)})")
+
+    incremental_stats = result.get("run_stats", {}).get("incremental")
+    if incremental_stats and options.get("previous_results"):
+        print(f"Qualificações reaproveitadas: {incremental_stats['reused']} "
+              f"(enviados ao LLM: {incremental_stats['qualified']})")
+
     print("\nTop 3 leads priorizados:")
     for i, lead_data in enumerate(result["prioritized_leads"][:3], 1):
         lead = lead_data["lead"]
@@ -236,7 +1696,15 @@ def main():
         score = lead_data["prioritization"]["priority_score"]
         print(f"{i}. {lead['name']} ({lead['company']}) - Prioridade {priority} (Score: {score})")
 
-    save_results_to_file(result, "resultados_leads.json")
+    save_results_to_file(result, args.output)
+    save_results_to_store(result, options)
+
+    # O cache da própria execução (cache_path e use_cache podem vir de uma execução retomada)
+    cache = get_cache(result)
+    if cache is not None:
+        cache_stats = cache.stats()
+        print(f"Cache do LLM: {cache_stats['hits']} acertos, {cache_stats['misses']} falhas "
+              f"(taxa de acerto {cache_stats['hit_rate']})")
 
 
 if __name__ == "__main__":
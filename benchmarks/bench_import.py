@@ -0,0 +1,85 @@
+"""Benchmark do tempo de importação (inicialização a frio) do sistema.
+
+Cada cenário é medido em um processo novo. O benchmark falha (código de saída 1) se `import app`
+carregar LangChain/LangGraph ou se a mediana ultrapassar --max-app-ms.
+
+Uso (a partir da raiz do projeto):
+    python -m benchmarks.bench_import --repeat 5 --max-app-ms 300
+"""
+import argparse
+import json
+import subprocess
+import sys
+from typing import Dict, Any, List, Optional
+
+from src.instrumentation import percentile
+
+HEAVY_MODULES = ("langchain", "langchain_core", "langchain_openai", "langgraph", "dotenv", "numpy")
+
+SCENARIOS = {
+    "app": "import app",
+    "prioritize_only": "import app, src.lead_prioritizer, src.incremental",
+    "llm_stack": "import app, src.lead_qualifier, src.approach_recommender, langgraph.graph",
+}
+
+_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+exec({statement!r})
+elapsed = time.perf_counter() - start
+heavy = sorted(name for name in {heavy!r} if name in sys.modules)
+print(json.dumps({{"seconds": elapsed, "heavy_modules": heavy}}))
+"""
+
+
+def measure(statement: str, repeat: int) -> Dict[str, Any]:
+    """Executa a importação em `repeat` processos novos e retorna os tempos e os módulos pesados carregados."""
+    timings: List[float] = []
+    heavy_modules: List[str] = []
+
+    for _ in range(repeat):
+        output = subprocess.run(
+            [sys.executable, "-c", _PROBE.format(statement=statement, heavy=HEAVY_MODULES)],
+            check=True, capture_output=True, text=True
+        ).stdout
+        sample = json.loads(output.strip().splitlines()[-1])
+        timings.append(sample["seconds"])
+        heavy_modules = sample["heavy_modules"]
+
+    return {
+        "median_ms": round(percentile(timings, 0.5) * 1000, 1),
+        "max_ms": round(max(timings) * 1000, 1),
+        "heavy_modules": heavy_modules
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark do tempo de importação do sistema de qualificação")
+    parser.add_argument("--repeat", type=int, default=5, help="Processos medidos por cenário")
+    parser.add_argument("--max-app-ms", type=float, help="Limite da mediana de `import app` (ms)")
+    parser.add_argument("--json", help="Grava o relatório neste arquivo JSON")
+    args = parser.parse_args(argv)
+
+    report = {name: measure(statement, args.repeat) for name, statement in SCENARIOS.items()}
+
+    for name, data in report.items():
+        heavy = ", ".join(data["heavy_modules"]) or "nenhum"
+        print(f"{name}: mediana {data['median_ms']} ms, máx {data['max_ms']} ms (módulos pesados: {heavy})")
+
+    if args.json:
+        with open(args.json, 'w') as file:
+            json.dump(report, file, indent=2)
+
+    failures = []
+    if report["app"]["heavy_modules"]:
+        failures.append(f"`import app` carregou módulos pesados: {', '.join(report['app']['heavy_modules'])}")
+    if args.max_app_ms is not None and report["app"]["median_ms"] > args.max_app_ms:
+        failures.append(f"`import app` levou {report['app']['median_ms']} ms (limite {args.max_app_ms} ms)")
+
+    for failure in failures:
+        print(f"Regressão: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
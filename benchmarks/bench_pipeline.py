@@ -0,0 +1,114 @@
+"""Benchmark offline do sistema de qualificação, com o modelo simulado (FakeChatModel).
+
+Uso (a partir da raiz do projeto):
+    python -m benchmarks.bench_pipeline --sizes 10 100 1000 --latency 0.05 --jitter 0.02
+"""
+import argparse
+import json
+import time
+import tracemalloc
+from typing import Dict, Any
+
+from benchmarks.fake_llm import use_fake_llm
+from benchmarks.synthetic_leads import generate_leads
+from src.instrumentation import percentile
+
+
+def run_benchmark(size: int, options: Dict[str, Any], latency: float, jitter: float, error_rate: float,
+                  trace_memory: bool = True) -> Dict[str, Any]:
+    """Executa o fluxo completo para `size` leads sintéticos e mede tempos e memória."""
+    import app
+
+    leads = list(generate_leads(size))
+    run_options = {"use_cache": False, **options}
+
+    with use_fake_llm(latency, jitter, error_rate) as fake_model:
+        initial_state = app.build_initial_state(leads, run_options)
+        workflow = app.create_graph_for_options(initial_state["options"])
+
+        if trace_memory:
+            tracemalloc.start()
+
+        node_times = {}
+        start = time.perf_counter()
+        last = start
+        final_state = initial_state
+        for step in workflow.stream(initial_state):
+            now = time.perf_counter()
+            for node_name, node_state in step.items():
+                node_times[node_name] = node_times.get(node_name, 0.0) + (now - last)
+                if isinstance(node_state, dict):
+                    final_state = {**final_state, **node_state}
+            last = now
+        elapsed = time.perf_counter() - start
+
+        peak_memory = 0
+        if trace_memory:
+            _, peak_memory = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+        llm_calls = {
+            stage: {
+                "calls": len(latencies),
+                "p50_ms": round(percentile(latencies, 0.5) * 1000, 2),
+                "p99_ms": round(percentile(latencies, 0.99) * 1000, 2)
+            }
+            for stage, latencies in fake_model.calls.items()
+        }
+
+    return {
+        "leads": size,
+        "options": options,
+        "error": final_state.get("error", ""),
+        "total_seconds": round(elapsed, 3),
+        "throughput_leads_per_second": round(size / elapsed, 1) if elapsed else 0.0,
+        "node_seconds": {name: round(seconds, 3) for name, seconds in node_times.items()},
+        "llm_calls": llm_calls,
+        "peak_memory_mb": round(peak_memory / (1024 * 1024), 1)
+    }
+
+
+def print_report(report: Dict[str, Any]):
+    """Imprime um resumo legível de uma execução do benchmark."""
+    print(f"\n== {report['leads']} leads ({report['total_seconds']}s, "
+          f"{report['throughput_leads_per_second']} leads/s, pico {report['peak_memory_mb']} MB)")
+    if report["error"]:
+        print(f"   erro: {report['error']}")
+    for node_name, seconds in report["node_seconds"].items():
+        print(f"   nó {node_name}: {seconds}s")
+    for stage, stats in report["llm_calls"].items():
+        print(f"   LLM {stage}: {stats['calls']} chamadas, p50 {stats['p50_ms']} ms, p99 {stats['p99_ms']} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark offline do sistema de qualificação de leads")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000, 10000])
+    parser.add_argument("--latency", type=float, default=0.0, help="Latência simulada por chamada (s)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Variação máxima da latência (s)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fração de chamadas que falham")
+    parser.add_argument("--async-mode", action="store_true")
+    parser.add_argument("--pipelined", action="store_true")
+    parser.add_argument("--batch-size", type=int, default=1)
+    parser.add_argument("--max-concurrency", type=int)
+    parser.add_argument("--no-memory", action="store_true", help="Desativa o tracemalloc (mais rápido)")
+    parser.add_argument("--json", help="Grava os relatórios neste arquivo JSON")
+    args = parser.parse_args()
+
+    options = {"async_mode": args.async_mode, "pipelined": args.pipelined, "batch_size": args.batch_size,
+               "requests_per_minute": None, "tokens_per_minute": None}
+    if args.max_concurrency:
+        options["max_concurrency"] = args.max_concurrency
+
+    reports = []
+    for size in args.sizes:
+        report = run_benchmark(size, options, args.latency, args.jitter, args.error_rate, not args.no_memory)
+        print_report(report)
+        reports.append(report)
+
+    if args.json:
+        with open(args.json, 'w') as file:
+            json.dump(reports, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""Relatório de tokens de entrada por chamada de qualificação: prompt completo x compacto.
+
+Conta os tokens com o tiktoken (codificação do LLM_MODEL) quando ele e a codificação estão disponíveis;
+caso contrário (inclusive sem rede para baixar a codificação), usa a mesma estimativa do limitador de
+taxa (estimate_tokens). Nenhuma chamada ao LLM é feita.
+
+Uso (a partir da raiz do projeto):
+    python -m benchmarks.bench_prompt_tokens --input data/sample_leads.json
+    python -m benchmarks.bench_prompt_tokens --synthetic 1000 --interactions-budget 160
+"""
+import argparse
+import json
+import sys
+from typing import Dict, Any, Callable, List, Optional, Tuple
+
+from config import LLM_MODEL, TOKENS_PER_MINUTE, ESTIMATED_COMPLETION_TOKENS, COMPACT_INTERACTIONS_CHAR_BUDGET
+from benchmarks.synthetic_leads import generate_leads
+from src.concurrency import estimate_tokens
+from src.instrumentation import percentile
+from src.lead_processor import LeadProcessor
+from src.lead_qualifier import LeadQualifier
+from src.lead_store import LeadRecord
+
+
+ESTIMATE_METHOD = "estimativa (4 caracteres por token)"
+
+
+def token_counter() -> Tuple[Callable[[str], int], str]:
+    """Retorna a função de contagem de tokens e o nome do método usado."""
+    try:
+        import tiktoken
+    except ImportError:
+        return estimate_tokens, ESTIMATE_METHOD
+
+    try:
+        try:
+            encoding = tiktoken.encoding_for_model(LLM_MODEL)
+        except KeyError:
+            encoding = tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        # Na primeira vez, o tiktoken baixa a codificação; sem rede (ou sem cache local), usa a estimativa
+        print(f"Codificação do tiktoken indisponível ({type(e).__name__}); usando a estimativa de tokens")
+        return estimate_tokens, ESTIMATE_METHOD
+    return lambda text: len(encoding.encode(text)), f"tiktoken ({encoding.name})"
+
+
+def summarize(counts: List[int]) -> Dict[str, Any]:
+    """Estatísticas dos tokens de entrada e a vazão máxima sob o limite de TPM."""
+    mean = sum(counts) / len(counts)
+    return {
+        "mean": round(mean, 1),
+        "p50": percentile(counts, 0.5),
+        "p95": percentile(counts, 0.95),
+        "max": max(counts),
+        "total": sum(counts),
+        "leads_per_minute_at_tpm": int(TOKENS_PER_MINUTE // (mean + ESTIMATED_COMPLETION_TOKENS))
+    }
+
+
+def compare_modes(leads: List[Dict[str, Any]], interactions_budget: int,
+                  count_tokens: Callable[[str], int]) -> Dict[str, Any]:
+    """Conta os tokens do prompt de qualificação de cada lead nos modos completo e compacto."""
+    processor = LeadProcessor()
+    records = [LeadRecord.from_normalized(processor.normalize_lead_data(lead)) for lead in leads]
+
+    report = {}
+    for mode, qualifier in (("full", LeadQualifier()),
+                            ("compact", LeadQualifier(compact=True, interactions_budget=interactions_budget))):
+        counts = [count_tokens(qualifier.build_prompt(qualifier.lead_info(record))) for record in records]
+        report[mode] = summarize(counts)
+
+    report["reduction_pct"] = round(100 * (1 - report["compact"]["total"] / report["full"]["total"]), 1)
+    return report
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Compara os tokens dos prompts de qualificação completo e compacto")
+    parser.add_argument("--input", help="Arquivo de leads (JSON ou JSONL)")
+    parser.add_argument("--synthetic", type=int, default=1000, help="Quantidade de leads sintéticos (sem --input)")
+    parser.add_argument("--interactions-budget", type=int, default=COMPACT_INTERACTIONS_CHAR_BUDGET,
+                        help="Caracteres do histórico de interações no modo compacto")
+    parser.add_argument("--json", help="Grava o relatório neste arquivo JSON")
+    args = parser.parse_args(argv)
+
+    if args.input:
+        leads = list(LeadProcessor().iter_leads_from_file(args.input))
+    else:
+        leads = list(generate_leads(args.synthetic))
+    if not leads:
+        print("Nenhum lead para analisar.")
+        return 1
+
+    count_tokens, method = token_counter()
+    report = compare_modes(leads, args.interactions_budget, count_tokens)
+    report["leads"] = len(leads)
+    report["token_counter"] = method
+
+    print(f"Tokens de entrada por prompt de qualificação ({len(leads)} leads, contagem: {method})")
+    for mode in ("full", "compact"):
+        data = report[mode]
+        print(f"{mode}: média {data['mean']}, p50 {data['p50']}, p95 {data['p95']}, máx {data['max']}, "
+              f"total {data['total']} (até {data['leads_per_minute_at_tpm']} leads/min com {TOKENS_PER_MINUTE} TPM)")
+    print(f"Redução de tokens de entrada: {report['reduction_pct']}%")
+
+    if args.json:
+        with open(args.json, 'w') as file:
+            json.dump(report, file, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,144 @@
+import asyncio
+import contextlib
+import copy
+import json
+import random
+import re
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, Any, List, Optional
+
+LEAD_ID_PATTERN = re.compile(r"Lead id: (\S+)")
+
+
+class FakeLLMError(Exception):
+    """Erro simulado (equivalente a um 5xx/timeout da API)."""
+
+    status_code = 503
+
+
+class FakeResponse:
+    """Resposta no formato mínimo usado pelo sistema (atributo content)."""
+
+    def __init__(self, content: str):
+        self.content = content
+
+
+class FakeChatModel:
+    """Modelo local que substitui o ChatOpenAI nos benchmarks.
+
+    Responde JSON BANT válido para prompts de qualificação (inclusive em lote) e texto de
+    abordagem para prompts de recomendação, com latência, variação e taxa de erro configuráveis.
+    """
+
+    latency = 0.0
+    jitter = 0.0
+    error_rate = 0.0
+    seed = 42
+
+    calls: Dict[str, List[float]] = defaultdict(list)
+    _lock = threading.Lock()
+
+    def __init__(self, **kwargs):
+        self.model = kwargs.get("model", "fake")
+        self.temperature = kwargs.get("temperature", 0.0)
+        self._random = random.Random(self.seed)
+        self.json_mode = False
+
+    @classmethod
+    def configure(cls, latency: float = 0.0, jitter: float = 0.0, error_rate: float = 0.0, seed: int = 42):
+        """Define o comportamento simulado e zera as latências registradas."""
+        cls.latency = latency
+        cls.jitter = jitter
+        cls.error_rate = error_rate
+        cls.seed = seed
+        cls.calls = defaultdict(list)
+
+    @staticmethod
+    def stage_for(prompt: str) -> str:
+        """Identifica a etapa do fluxo a partir do conteúdo do prompt."""
+        if "abordagem" in prompt:
+            return "approach"
+        if LEAD_ID_PATTERN.search(prompt):
+            return "qualification_batch"
+        return "qualification"
+
+    def _delay(self) -> float:
+        return max(0.0, self.latency + self._random.uniform(-self.jitter, self.jitter))
+
+    def _scores(self) -> Dict[str, Any]:
+        return {
+            "budget": round(self._random.random(), 2),
+            "authority": round(self._random.random(), 2),
+            "need": round(self._random.random(), 2),
+            "timeline": round(self._random.random(), 2),
+            "reasoning": "Avaliação simulada para benchmark."
+        }
+
+    def _answer(self, prompt: str, stage: str) -> FakeResponse:
+        if self._random.random() < self.error_rate:
+            raise FakeLLMError("Erro simulado do modelo")
+
+        if stage == "approach":
+            return FakeResponse(
+                "1. Assunto: Proposta personalizada\n2. Pontos principais: ROI e prazos\n"
+                "3. Objeções: orçamento - apresentar plano em fases\n4. Próximos passos: agendar demonstração"
+            )
+        if stage == "qualification_batch":
+            items = [{"id": lead_id, **self._scores()} for lead_id in LEAD_ID_PATTERN.findall(prompt)]
+            return FakeResponse(json.dumps(items))
+        if self.json_mode:
+            return FakeResponse(json.dumps(self._scores()))
+        return FakeResponse("```json\n" + json.dumps(self._scores()) + "\n```")
+
+    def bind(self, **kwargs) -> "FakeChatModel":
+        """Equivalente a ChatOpenAI.bind; response_format json_object ativa respostas em JSON puro."""
+        bound = copy.copy(self)
+        bound.json_mode = kwargs.get("response_format", {}).get("type") == "json_object"
+        return bound
+
+    def _record(self, stage: str, elapsed: float):
+        with self._lock:
+            self.calls[stage].append(elapsed)
+
+    def invoke(self, prompt: Any, *args, **kwargs) -> FakeResponse:
+        prompt = str(prompt)
+        stage = self.stage_for(prompt)
+        start = time.perf_counter()
+        delay = self._delay()
+        if delay:
+            time.sleep(delay)
+        try:
+            return self._answer(prompt, stage)
+        finally:
+            self._record(stage, time.perf_counter() - start)
+
+    async def ainvoke(self, prompt: Any, *args, **kwargs) -> FakeResponse:
+        prompt = str(prompt)
+        stage = self.stage_for(prompt)
+        start = time.perf_counter()
+        delay = self._delay()
+        if delay:
+            await asyncio.sleep(delay)
+        try:
+            return self._answer(prompt, stage)
+        finally:
+            self._record(stage, time.perf_counter() - start)
+
+
+@contextlib.contextmanager
+def use_fake_llm(latency: float = 0.0, jitter: float = 0.0, error_rate: float = 0.0, seed: Optional[int] = 42):
+    """Substitui o ChatOpenAI do registro de clientes compartilhados pelo FakeChatModel."""
+    import src.llm_clients
+
+    FakeChatModel.configure(latency, jitter, error_rate, seed)
+    original = src.llm_clients.ChatOpenAI
+
+    src.llm_clients.reset_chat_models()
+    src.llm_clients.ChatOpenAI = FakeChatModel
+    try:
+        yield FakeChatModel
+    finally:
+        src.llm_clients.ChatOpenAI = original
+        src.llm_clients.reset_chat_models()
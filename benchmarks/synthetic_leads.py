@@ -0,0 +1,95 @@
+import argparse
+import datetime
+import json
+import random
+from typing import Dict, Any, Iterator
+
+FIRST_NAMES = ["Carlos", "Ana", "Roberto", "Juliana", "Marcos", "Fernanda", "Paulo", "Beatriz", "Rafael", "Camila"]
+LAST_NAMES = ["Silva", "Ferreira", "Mendes", "Souza", "Oliveira", "Costa", "Pereira", "Almeida", "Lima", "Rocha"]
+POSITIONS = [
+    ("CEO", True), ("Diretor de Tecnologia", True), ("Diretor Financeiro", True),
+    ("Gerente de Marketing", False), ("Coordenador de TI", False), ("Analista de Compras", False)
+]
+SOURCES = ["LinkedIn", "Webinar", "Indicação", "Site", "Evento", "Email marketing"]
+COMPANY_SIZES = [
+    "Pequeno porte (20-50 funcionários)",
+    "Médio porte (100-500 funcionários)",
+    "Grande porte (mais de 1000 funcionários)"
+]
+INDUSTRIES = ["Tecnologia da Informação", "Varejo", "Construção Civil", "Saúde", "Educação", "Logística"]
+BUDGETS = [
+    "Disponibilizou R$ {value}.000 para projetos de automação no próximo trimestre",
+    "Orçamento de R$ {value}.000 aprovado para digitalização de processos",
+    "Mencionou restrições orçamentárias até o próximo ano fiscal",
+    ""
+]
+NEEDS = [
+    "Busca automatizar processos internos e reduzir custos operacionais em {value}%",
+    "Interesse em melhorar a experiência do cliente e aumentar taxas de conversão",
+    "Precisa digitalizar processos de gestão de projetos e equipes em campo",
+    ""
+]
+TIMELINES = [
+    "Implementação desejada nos próximos {value} meses",
+    "Quer implementar em 1-2 meses",
+    "Sem prazo definido, possivelmente no próximo ano",
+    ""
+]
+INTERACTIONS = ["Email enviado em {date}", "Resposta recebida em {date}", "Chamada telefônica em {date}",
+                "Participou do webinar em {date}", "Reunião de demonstração em {date}"]
+
+
+def generate_lead(index: int, rng: random.Random, reference_date: datetime.date) -> Dict[str, Any]:
+    """Gera um lead sintético no formato de data/sample_leads.json."""
+    first_name = rng.choice(FIRST_NAMES)
+    last_name = rng.choice(LAST_NAMES)
+    company = f"Empresa {index % 5000:04d}"
+    position, is_decision_maker = rng.choice(POSITIONS)
+    last_interaction = reference_date - datetime.timedelta(days=rng.randint(0, 60))
+    interactions = [
+        rng.choice(INTERACTIONS).format(date=(last_interaction - datetime.timedelta(days=days)).isoformat())
+        for days in range(rng.randint(0, 6))
+    ]
+
+    return {
+        "id": f"lead-{index:07d}",
+        "name": f"{first_name} {last_name}",
+        "company": company,
+        "position": position,
+        "email": f"{first_name.lower()}.{last_name.lower()}{index}@empresa{index % 5000}.com.br",
+        "phone": f"+55 11 9{rng.randint(1000, 9999)}-{rng.randint(1000, 9999)}",
+        "source": rng.choice(SOURCES),
+        "last_interaction": last_interaction.isoformat(),
+        "interactions": interactions,
+        "company_size": rng.choice(COMPANY_SIZES),
+        "industry": rng.choice(INDUSTRIES),
+        "budget_info": rng.choice(BUDGETS).format(value=rng.randint(50, 500)),
+        "is_decision_maker": is_decision_maker,
+        "needs": rng.choice(NEEDS).format(value=rng.randint(10, 40)),
+        "timeline": rng.choice(TIMELINES).format(value=rng.randint(1, 12)),
+        "notes": "Lead sintético gerado para benchmark"
+    }
+
+
+def generate_leads(count: int, seed: int = 42,
+                   reference_date: datetime.date = datetime.date(2025, 5, 1)) -> Iterator[Dict[str, Any]]:
+    """Gera leads sintéticos sob demanda, de forma determinística para a mesma semente."""
+    rng = random.Random(seed)
+    for index in range(count):
+        yield generate_lead(index, rng, reference_date)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gera um arquivo JSONL de leads sintéticos")
+    parser.add_argument("count", type=int)
+    parser.add_argument("output")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    with open(args.output, 'w') as file:
+        for lead in generate_leads(args.count, args.seed):
+            file.write(json.dumps(lead) + "\n")
+
+
+if __name__ == "__main__":
+    main()
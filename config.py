@@ -1,12 +1,132 @@
 import os
-from dotenv import load_dotenv
-
-# Carrega variáveis de ambiente do arquivo .env
-load_dotenv()
 
 # Configurações do modelo de linguagem
 LLM_MODEL = "gpt-4o"
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+
+# Cascata de modelos na qualificação: o modelo mais barato avalia todos os leads e só os que ficam a
+# menos de CASCADE_TIER_MARGIN de um limiar de LEAD_TIERS (ou cuja resposta é inválida) vão ao LLM_MODEL
+CASCADE_LLM_MODEL = "gpt-4o-mini"
+CASCADE_TIER_MARGIN = 0.05
+
+# Execução assíncrona das chamadas ao LLM
+MAX_CONCURRENCY = 8
+REQUESTS_PER_MINUTE = 500
+TOKENS_PER_MINUTE = 30000
+ESTIMATED_COMPLETION_TOKENS = 400
+
+# Preços (US$ por milhão de tokens de entrada e de saída) usados para estimar o custo no orçamento do agendador
+LLM_PRICES_PER_MILLION_TOKENS = {
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4o-mini": (0.15, 0.60)
+}
+
+# Tamanho das filas entre as etapas do modo em pipeline
+PIPELINE_QUEUE_SIZE = 100
+
+# Quantidade de leads por requisição no modo de qualificação em lote (1 desativa o lote)
+QUALIFICATION_BATCH_SIZE = 1
+
+# Cache persistente das respostas do LLM
+CACHE_PATH = ".cache/llm_cache.sqlite3"
+CACHE_TTL_SECONDS = 7 * 24 * 60 * 60
+CACHE_MAX_ENTRIES = 100000
+
+# Novas tentativas por lead em falhas transitórias (429, 5xx, timeout) e respostas inválidas,
+# com espera exponencial: RETRY_BASE_DELAY_SECONDS * 2^tentativa, limitada a RETRY_MAX_DELAY_SECONDS
+MAX_LEAD_RETRIES = 3
+RETRY_BASE_DELAY_SECONDS = 1.0
+RETRY_MAX_DELAY_SECONDS = 30.0
+
+# Pré-qualificação por regras: leads com confiança mínima e pontuação a pelo menos esta margem
+# de todos os limiares de LEAD_TIERS dispensam a chamada ao LLM
+PREQUALIFIER_MIN_CONFIDENCE = 0.75
+PREQUALIFIER_TIER_MARGIN = 0.05
+
+# Detecção de leads quase duplicados (MinHash-LSH): um representativo por grupo é qualificado
+# e o resultado é replicado para os demais membros
+DEDUP_SIMILARITY_THRESHOLD = 0.8
+DEDUP_NUM_PERM = 64
+DEDUP_SHINGLE_SIZE = 5
+DEDUP_MAX_BUCKET_CANDIDATES = 4
+DEDUP_FIELDS = ("email", "company", "needs", "budget_info")
+
+# Serviço HTTP residente (--serve): leads que chegam dentro da janela formam um único lote
+SERVICE_HOST = "127.0.0.1"
+SERVICE_PORT = 8080
+SERVICE_BATCH_WINDOW_MS = 25
+SERVICE_MAX_BATCH_SIZE = 32
+SERVICE_REQUEST_TIMEOUT_SECONDS = 120
+
+# Diretório dos arquivos intermediários do modo em shards
+SHARD_DIR = ".cache/shards"
+
+# Faixas de recência da priorização: limite superior (em dias desde a última interação) de cada
+# faixa e a pontuação correspondente; acima do último limite vale a última pontuação
+RECENCY_BUCKET_LIMITS = (1, 7, 14, 30)
+RECENCY_BUCKET_SCORES = (1.0, 0.8, 0.6, 0.4, 0.2)
+
+# Checkpoints duráveis das execuções (progresso por lead, usado na retomada)
+CHECKPOINT_PATH = ".cache/runs.sqlite3"
+
+# Banco de resultados indexado (--results-db): leads gravados por upsert em lotes transacionais
+RESULTS_STORE_BATCH_SIZE = 2000
+RESULTS_QUERY_LIMIT = 50
+
+# Modo de prompt compacto: orçamento (em caracteres) do histórico de interações enviado ao LLM;
+# as interações mais recentes são mantidas e as anteriores apenas contadas
+COMPACT_INTERACTIONS_CHAR_BUDGET = 240
+
+# Versões dos templates (incrementar ao alterar um template invalida o cache)
+LEAD_ANALYSIS_TEMPLATE_VERSION = "1"
+LEAD_COMPACT_ANALYSIS_TEMPLATE_VERSION = "1"
+LEAD_BATCH_ANALYSIS_TEMPLATE_VERSION = "1"
+APPROACH_RECOMMENDATION_TEMPLATE_VERSION = "1"
+
+# Opções padrão de execução do fluxo de trabalho
+DEFAULT_RUN_OPTIONS = {
+    "async_mode": False,
+    "use_cache": True,
+    "cache_path": CACHE_PATH,
+    "max_concurrency": MAX_CONCURRENCY,
+    "batch_size": QUALIFICATION_BATCH_SIZE,
+    "columnar_prioritization": False,
+    "prioritize_top_k": None,
+    "pipelined": False,
+    "pipeline_queue_size": PIPELINE_QUEUE_SIZE,
+    "approach_top_k": None,
+    "approach_min_score": None,
+    "profile_dir": None,
+    "run_id": None,
+    "checkpoint_path": CHECKPOINT_PATH,
+    "shard_dir": SHARD_DIR,
+    "shards": 1,
+    "prequalify": False,
+    "max_retries": MAX_LEAD_RETRIES,
+    "retry_base_delay": RETRY_BASE_DELAY_SECONDS,
+    "retry_max_delay": RETRY_MAX_DELAY_SECONDS,
+    "dead_letter_path": None,
+    "dedup": False,
+    "dedup_threshold": DEDUP_SIMILARITY_THRESHOLD,
+    "dedup_report": None,
+    "results_db": None,
+    "token_budget": None,
+    "cost_budget": None,
+    "deadline": None,
+    "deferred_path": None,
+    "cascade": False,
+    "cascade_model": CASCADE_LLM_MODEL,
+    "cascade_margin": CASCADE_TIER_MARGIN,
+    "compact_prompts": False,
+    "compact_interactions_budget": COMPACT_INTERACTIONS_CHAR_BUDGET,
+    "requests_per_minute": REQUESTS_PER_MINUTE,
+    "tokens_per_minute": TOKENS_PER_MINUTE
+}
+
+# Opções do serviço residente que sobrescrevem DEFAULT_RUN_OPTIONS: no modo em pipeline, os
+# leads de um lote seguem em paralelo pelos clientes síncronos compartilhados (pool sempre aquecido)
+SERVICE_RUN_OPTIONS = {
+    "pipelined": True
+}
 
 # Critérios de qualificação
 QUALIFICATION_CRITERIA = {
@@ -48,6 +168,28 @@ Avalie cada critério em uma escala de 0 a 1:
 - Timeline (Prazo): O lead tem um prazo definido para implementação ou compra?
 """
 
+# Template compacto para análise de lead (a resposta é um objeto JSON, via modo JSON do modelo)
+LEAD_COMPACT_ANALYSIS_TEMPLATE = """Avalie o lead pelos critérios BANT, de 0 a 1: budget (orçamento disponível), authority (poder de decisão), need (necessidade que resolvemos), timeline (prazo definido).
+Lead:
+{lead_info}
+Responda em JSON: {{"budget": n, "authority": n, "need": n, "timeline": n, "reasoning": "justificativa breve"}}"""
+
+# Template para análise de vários leads em uma única requisição
+LEAD_BATCH_ANALYSIS_TEMPLATE = """
+Analise as informações de cada um dos leads abaixo e avalie os critérios BANT (Budget, Authority, Need, Timeline).
+Leads:
+{leads_info}
+
+Avalie cada critério em uma escala de 0 a 1, para cada lead:
+- Budget (Orçamento): O lead tem orçamento disponível para nossa solução?
+- Authority (Autoridade): O contato tem poder de decisão ou influência no processo de compra?
+- Need (Necessidade): O lead tem uma necessidade clara que nosso produto/serviço pode resolver?
+- Timeline (Prazo): O lead tem um prazo definido para implementação ou compra?
+
+Responda somente com um array JSON contendo um objeto por lead, identificado pelo id informado:
+[{{"id": "<id do lead>", "budget": <0 a 1>, "authority": <0 a 1>, "need": <0 a 1>, "timeline": <0 a 1>, "reasoning": "<raciocínio detalhado para cada pontuação>"}}]
+"""
+
 # Template para recomendação de abordagem
 APPROACH_RECOMMENDATION_TEMPLATE = """
 Com base nas informações e na qualificação deste lead, sugira uma abordagem personalizada para o time de vendas.
@@ -67,4 +209,16 @@ Forneça:
 2. Pontos principais a serem abordados na primeira interação
 3. Objeções potenciais e como responder a elas
 4. Próximos passos recomendados
-"""
\ No newline at end of file
+"""
+
+
+# A chave da API (OPENAI_API_KEY) é lida do ambiente/.env apenas quando acessada, para que
+# importar config não carregue o python-dotenv nem leia o .env em execuções sem LLM.
+def __getattr__(name: str):
+    """Carrega as variáveis de ambiente do arquivo .env sob demanda, no primeiro acesso à chave da API."""
+    if name == "OPENAI_API_KEY":
+        from dotenv import load_dotenv
+
+        load_dotenv()
+        return os.getenv("OPENAI_API_KEY")
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,28 +1,50 @@
-from typing import Dict, Any
-from langchain_openai import ChatOpenAI
+from typing import Dict, Any, Optional
 from langchain.prompts import ChatPromptTemplate
 
-from config import OPENAI_API_KEY, LLM_MODEL, APPROACH_RECOMMENDATION_TEMPLATE
+from config import LLM_MODEL, APPROACH_RECOMMENDATION_TEMPLATE
+from config import ESTIMATED_COMPLETION_TOKENS, APPROACH_RECOMMENDATION_TEMPLATE_VERSION
+from src.concurrency import AsyncRateLimiter, estimate_tokens
+from src.llm_cache import LLMCache
+from src.instrumentation import timed_acquire, timed_ainvoke, timed_invoke
+from src.llm_clients import get_chat_model
+
+# Template compilado uma única vez, na importação
+APPROACH_PROMPT = ChatPromptTemplate.from_template(APPROACH_RECOMMENDATION_TEMPLATE)
 
 
 class ApproachRecommender:
     """Classe para recomendar abordagens personalizadas para cada lead."""
 
-    def __init__(self):
-        self.llm = ChatOpenAI(
-            api_key=OPENAI_API_KEY,
-            model=LLM_MODEL,
-            temperature=0.7
-        )
+    def __init__(self, cache: Optional[LLMCache] = None):
+        self.temperature = 0.7
+        self.cache = cache
 
-    def generate_approach(self, lead_data: Dict[str, Any]) -> str:
-        """Gera uma recomendação de abordagem personalizada para o lead."""
+    @property
+    def llm(self) -> Any:
+        """Cliente de chat compartilhado (pool de conexões reutilizado entre nós e execuções)."""
+        return get_chat_model(LLM_MODEL, self.temperature)
+
+    def cache_key(self, prompt: str) -> str:
+        """Gera a chave de cache para o prompt de recomendação."""
+        return LLMCache.make_key(prompt, LLM_MODEL, self.temperature, APPROACH_RECOMMENDATION_TEMPLATE_VERSION)
+
+    def get_cached_response(self, prompt: str) -> Optional[str]:
+        """Busca no cache a abordagem para o prompt, se o cache estiver habilitado."""
+        if self.cache is None:
+            return None
+        return self.cache.get(self.cache_key(prompt))
+
+    def store_response(self, prompt: str, content: str):
+        """Armazena a abordagem gerada no cache, se habilitado."""
+        if self.cache is not None and content:
+            self.cache.set(self.cache_key(prompt), content)
+
+    def build_prompt(self, lead_data: Dict[str, Any]) -> str:
+        """Monta o prompt de recomendação de abordagem para o lead."""
         lead = lead_data["lead"]
         qualification = lead_data["qualification"]
 
-        prompt_template = ChatPromptTemplate.from_template(APPROACH_RECOMMENDATION_TEMPLATE)
-
-        prompt = prompt_template.format(
+        return APPROACH_PROMPT.format(
             lead_info=lead.get("formatted_info", ""),
             budget_score=qualification["budget_score"],
             authority_score=qualification["authority_score"],
@@ -32,5 +54,29 @@ class ApproachRecommender:
             tier=qualification["tier"]
         )
 
-        response = self.llm.invoke(prompt)
-        return response.content
\ No newline at end of file
+    def generate_approach(self, lead_data: Dict[str, Any]) -> str:
+        """Gera uma recomendação de abordagem personalizada para o lead."""
+        prompt = self.build_prompt(lead_data)
+
+        cached = self.get_cached_response(prompt)
+        if cached is not None:
+            return cached
+
+        response = timed_invoke(self.llm, prompt, "approach")
+        self.store_response(prompt, response.content)
+        return response.content
+
+    async def agenerate_approach(self, lead_data: Dict[str, Any],
+                                 rate_limiter: Optional[AsyncRateLimiter] = None) -> str:
+        """Versão assíncrona de generate_approach, respeitando o limitador de taxa."""
+        prompt = self.build_prompt(lead_data)
+
+        cached = self.get_cached_response(prompt)
+        if cached is not None:
+            return cached
+
+        queue_wait = await timed_acquire(rate_limiter, estimate_tokens(prompt) + ESTIMATED_COMPLETION_TOKENS)
+
+        response = await timed_ainvoke(self.llm, prompt, "approach", queue_wait)
+        self.store_response(prompt, response.content)
+        return response.content
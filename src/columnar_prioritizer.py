@@ -0,0 +1,220 @@
+import datetime
+import gc
+from typing import Dict, Any, List, Optional
+
+import numpy as np
+
+from config import RECENCY_BUCKET_LIMITS, RECENCY_BUCKET_SCORES
+from src.lead_prioritizer import LeadPrioritizer
+
+DATE_FORMAT = "%Y-%m-%d"
+INVALID_DATE = np.iinfo(np.int64).min
+
+
+class LeadColumns:
+    """Representação colunar (NumPy) dos campos usados na priorização de leads."""
+
+    def __init__(self, overall_scores: np.ndarray, interaction_ordinals: np.ndarray,
+                 interaction_counts: np.ndarray):
+        self.overall_scores = overall_scores
+        self.interaction_ordinals = interaction_ordinals
+        self.interaction_counts = interaction_counts
+
+    def __len__(self) -> int:
+        return len(self.overall_scores)
+
+    @classmethod
+    def from_qualified_leads(cls, leads_with_qualification: List[Dict[str, Any]]) -> "LeadColumns":
+        """Converte a lista de leads qualificados em colunas."""
+        ordinal_cache = {}
+
+        def to_ordinal(value: Any) -> int:
+            try:
+                return ordinal_cache[value]
+            except KeyError:
+                pass
+            except TypeError:
+                return INVALID_DATE
+
+            try:
+                ordinal = datetime.datetime.strptime(value, DATE_FORMAT).toordinal() if value else INVALID_DATE
+            except Exception:
+                ordinal = INVALID_DATE
+            ordinal_cache[value] = ordinal
+            return ordinal
+
+        overall_scores = np.fromiter(
+            (lead_data["qualification"]["overall_score"] for lead_data in leads_with_qualification),
+            dtype=np.float64, count=len(leads_with_qualification)
+        )
+        interaction_ordinals = np.fromiter(
+            (to_ordinal(lead_data["lead"].get("last_interaction", "")) for lead_data in leads_with_qualification),
+            dtype=np.int64, count=len(leads_with_qualification)
+        )
+        interaction_counts = np.fromiter(
+            (len(interactions) if interactions else 0
+             for interactions in (lead_data["lead"].get("interactions", []) for lead_data in leads_with_qualification)),
+            dtype=np.int64, count=len(leads_with_qualification)
+        )
+
+        return cls(overall_scores, interaction_ordinals, interaction_counts)
+
+
+class LeadRanking:
+    """Resultado vetorizado da priorização: as pontuações de todos os leads e a ordem selecionada.
+
+    order contém os índices (na lista de entrada) dos leads selecionados, do mais para o menos
+    prioritário; nenhum registro por lead é montado até que materialize seja chamado.
+    """
+
+    def __init__(self, order: np.ndarray, priority_scores: np.ndarray, recency_scores: np.ndarray,
+                 engagement_scores: np.ndarray, score_ids: np.ndarray, unique_scores: np.ndarray):
+        self.order = order
+        self.priority_scores = priority_scores
+        self.recency_scores = recency_scores
+        self.engagement_scores = engagement_scores
+        # Índice de cada lead em unique_scores (poucas pontuações distintas por execução)
+        self.score_ids = score_ids
+        self.unique_scores = unique_scores
+
+    def __len__(self) -> int:
+        return len(self.order)
+
+
+class ColumnarPrioritizer:
+    """Motor vetorizado de priorização, equivalente ao LeadPrioritizer escalar.
+
+    As pontuações são calculadas em lote contra uma data de referência fixa e os
+    top-K leads são selecionados por seleção parcial, sem ordenar a lista inteira.
+    """
+
+    def __init__(self, prioritizer: Optional[LeadPrioritizer] = None):
+        self.prioritizer = prioritizer or LeadPrioritizer()
+
+    def recency_scores(self, columns: LeadColumns, reference_date: datetime.datetime) -> np.ndarray:
+        """Calcula as pontuações de recência de todos os leads (faixas de RECENCY_BUCKET_LIMITS)."""
+        valid = columns.interaction_ordinals != INVALID_DATE
+        days_since = reference_date.toordinal() - np.where(valid, columns.interaction_ordinals, 0)
+
+        # Faixa de cada lead: a primeira cujo limite é >= days_since (a última se passar de todos)
+        buckets = np.searchsorted(np.asarray(RECENCY_BUCKET_LIMITS), days_since, side="left")
+        scores = np.asarray(RECENCY_BUCKET_SCORES, dtype=np.float64)[buckets]
+        return np.where(valid, scores, 0.0)
+
+    def engagement_scores(self, columns: LeadColumns) -> np.ndarray:
+        """Calcula as pontuações de engajamento de todos os leads."""
+        counts = columns.interaction_counts
+        return np.select(
+            [counts >= 5, counts >= 3, counts >= 2, counts >= 1],
+            [1.0, 0.8, 0.6, 0.4],
+            default=0.0
+        )
+
+    def priority_scores(self, columns: LeadColumns, recency_scores: np.ndarray,
+                        engagement_scores: np.ndarray) -> np.ndarray:
+        """Calcula a pontuação de prioridade ponderada (mesma ordem de operações do caminho escalar)."""
+        factors = self.prioritizer.prioritization_factors
+        return (
+                columns.overall_scores * factors["overall_score"] +
+                recency_scores * factors["recency"] +
+                engagement_scores * factors["engagement"]
+        )
+
+    def ranking_order(self, score_ids: np.ndarray, unique_scores: np.ndarray,
+                      top_k: Optional[int] = None) -> np.ndarray:
+        """Retorna os índices dos leads ordenados por prioridade (desempate pela ordem de entrada).
+
+        A ordenação usa a pontuação arredondada a duas casas, como no caminho escalar.
+        """
+        count = len(score_ids)
+        if count == 0:
+            return np.empty(0, dtype=np.int64)
+
+        unique_cents = np.fromiter((round(round(float(score), 2) * 100) for score in unique_scores),
+                                   dtype=np.int64, count=len(unique_scores))
+        cents = unique_cents[score_ids]
+
+        indices = np.arange(count, dtype=np.int64)
+        ranking_keys = cents * count + (count - 1 - indices)
+
+        if top_k is not None and top_k < count:
+            candidates = np.argpartition(-ranking_keys, max(top_k, 1) - 1)[:top_k]
+            return candidates[np.argsort(-ranking_keys[candidates])]
+
+        return np.argsort(-ranking_keys)
+
+    def rank(self, leads_with_qualification: List[Dict[str, Any]], top_k: Optional[int] = None,
+             reference_date: Optional[datetime.datetime] = None) -> LeadRanking:
+        """Calcula as pontuações e a ordem dos leads (ou só dos top_k primeiros), sem montar registros."""
+        reference_date = reference_date or datetime.datetime.now()
+        columns = LeadColumns.from_qualified_leads(leads_with_qualification)
+
+        recency_scores = self.recency_scores(columns, reference_date)
+        engagement_scores = self.engagement_scores(columns)
+        priority_scores = self.priority_scores(columns, recency_scores, engagement_scores)
+        unique_scores, score_ids = np.unique(priority_scores, return_inverse=True)
+        score_ids = score_ids.reshape(-1)
+
+        order = self.ranking_order(score_ids, unique_scores, top_k)
+        return LeadRanking(order, priority_scores, recency_scores, engagement_scores, score_ids, unique_scores)
+
+    def materialize(self, leads_with_qualification: List[Dict[str, Any]],
+                    ranking: LeadRanking) -> List[Dict[str, Any]]:
+        """Monta os registros priorizados ({lead, qualification, prioritization}) dos leads selecionados.
+
+        O arredondamento e o nível de prioridade são calculados uma vez por pontuação distinta, e o
+        coletor de ciclos fica pausado durante a montagem (os registros não formam ciclos, e milhões
+        de dicionários novos disparariam varreduras completas repetidas).
+        """
+        unique_scores = ranking.unique_scores.tolist()
+        rounded_scores = [round(score, 2) for score in unique_scores]
+        levels = [self.prioritizer.priority_level(score) for score in unique_scores]
+        rounded_factors = {}
+
+        def round_factor(value: float) -> float:
+            try:
+                return rounded_factors[value]
+            except KeyError:
+                rounded_factors[value] = round(value, 2)
+                return rounded_factors[value]
+
+        order = ranking.order.tolist()
+        score_ids = ranking.score_ids[ranking.order].tolist()
+        recency_scores = ranking.recency_scores[ranking.order].tolist()
+        engagement_scores = ranking.engagement_scores[ranking.order].tolist()
+
+        prioritized_leads = []
+        gc_was_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            for index, score_id, recency_score, engagement_score in zip(order, score_ids, recency_scores,
+                                                                        engagement_scores):
+                lead_data = leads_with_qualification[index]
+                qualification = lead_data["qualification"]
+                prioritized_leads.append({
+                    "lead": lead_data["lead"],
+                    "qualification": qualification,
+                    "prioritization": {
+                        "priority_score": rounded_scores[score_id],
+                        "priority_level": levels[score_id],
+                        "factors": {
+                            "qualification_score": qualification["overall_score"],
+                            "recency_score": round_factor(recency_score),
+                            "engagement_score": round_factor(engagement_score)
+                        }
+                    }
+                })
+        finally:
+            if gc_was_enabled:
+                gc.enable()
+
+        return prioritized_leads
+
+    def prioritize_leads(self, leads_with_qualification: List[Dict[str, Any]], top_k: Optional[int] = None,
+                         reference_date: Optional[datetime.datetime] = None) -> List[Dict[str, Any]]:
+        """Prioriza os leads em lote, retornando o mesmo formato de LeadPrioritizer.prioritize_leads.
+
+        Com top_k, apenas os top_k primeiros são retornados (e montados).
+        """
+        ranking = self.rank(leads_with_qualification, top_k, reference_date)
+        return self.materialize(leads_with_qualification, ranking)
@@ -0,0 +1,115 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from collections import deque
+from typing import Awaitable, Callable, Dict, List, Optional, Sequence, Tuple, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+def estimate_tokens(text: str) -> int:
+    """Estima a quantidade de tokens de um texto (aproximadamente 4 caracteres por token)."""
+    return max(1, len(text) // 4)
+
+
+class AsyncRateLimiter:
+    """Limitador assíncrono de requisições e tokens por minuto em janela deslizante.
+
+    O estado é protegido por um threading.Lock, e não por um asyncio.Lock, para que a mesma janela
+    valha entre event loops diferentes (cada etapa ou lote roda o seu) e entre threads.
+    """
+
+    def __init__(self, requests_per_minute: Optional[int] = None, tokens_per_minute: Optional[int] = None,
+                 period: float = 60.0):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.period = period
+        self._events = deque()
+        self._tokens_in_window = 0
+        self._lock = threading.Lock()
+
+    def _prune(self, now: float):
+        """Remove da janela os eventos mais antigos que o período configurado."""
+        while self._events and now - self._events[0][0] >= self.period:
+            _, tokens = self._events.popleft()
+            self._tokens_in_window -= tokens
+
+    def _wait_time(self, now: float, tokens: int) -> float:
+        """Calcula quanto tempo é preciso aguardar para liberar a próxima requisição."""
+        wait = 0.0
+
+        if self.requests_per_minute and len(self._events) >= self.requests_per_minute:
+            oldest = self._events[len(self._events) - self.requests_per_minute][0]
+            wait = max(wait, oldest + self.period - now)
+
+        if self.tokens_per_minute and self._events and self._tokens_in_window + tokens > self.tokens_per_minute:
+            released = 0
+            excess = self._tokens_in_window + tokens - self.tokens_per_minute
+            for timestamp, event_tokens in self._events:
+                released += event_tokens
+                if released >= excess:
+                    wait = max(wait, timestamp + self.period - now)
+                    break
+
+        return wait
+
+    async def acquire(self, tokens: int = 0):
+        """Aguarda até que a requisição caiba nos limites de requisições e tokens."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._prune(now)
+                wait = self._wait_time(now, tokens)
+                if wait <= 0:
+                    self._events.append((now, tokens))
+                    self._tokens_in_window += tokens
+                    return
+            await asyncio.sleep(wait)
+
+
+_rate_limiters: Dict[Tuple[Optional[int], Optional[int]], AsyncRateLimiter] = {}
+_rate_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(requests_per_minute: Optional[int] = None,
+                     tokens_per_minute: Optional[int] = None) -> AsyncRateLimiter:
+    """Retorna o limitador compartilhado no processo para os limites informados.
+
+    Todas as etapas, lotes e execuções com os mesmos limites consomem da mesma janela.
+    """
+    key = (requests_per_minute, tokens_per_minute)
+    with _rate_limiters_lock:
+        if key not in _rate_limiters:
+            _rate_limiters[key] = AsyncRateLimiter(requests_per_minute, tokens_per_minute)
+        return _rate_limiters[key]
+
+
+def run_coroutine(coroutine: Awaitable[T]) -> T:
+    """Executa a corrotina até o fim a partir de código síncrono.
+
+    Se já houver um event loop em execução nesta thread (por exemplo, quando o grafo é chamado de
+    dentro de uma aplicação assíncrona), a corrotina roda em uma thread própria com um novo loop,
+    pois asyncio.run não pode ser aninhado.
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coroutine)
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(asyncio.run, coroutine).result()
+
+
+async def map_concurrently(items: Sequence[T], worker: Callable[[T], Awaitable[R]],
+                           max_concurrency: int) -> List[R]:
+    """Executa o worker para cada item com concorrência limitada, preservando a ordem de entrada."""
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+    async def run(item: T) -> R:
+        async with semaphore:
+            return await worker(item)
+
+    return list(await asyncio.gather(*(run(item) for item in items)))
+
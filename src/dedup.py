@@ -0,0 +1,183 @@
+import re
+import unicodedata
+import zlib
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+
+from config import DEDUP_SIMILARITY_THRESHOLD, DEDUP_NUM_PERM, DEDUP_SHINGLE_SIZE, DEDUP_MAX_BUCKET_CANDIDATES
+from config import DEDUP_FIELDS
+
+_SEED = 1
+
+# Leads por bloco no cálculo vetorizado das assinaturas
+SIGNATURE_CHUNK_SIZE = 64
+
+NON_ALPHANUMERIC_PATTERN = re.compile(r"[^a-z0-9@.]+")
+
+
+def normalize_text(text: Any) -> str:
+    """Minúsculas, sem acentos e com pontuação e espaços repetidos reduzidos a um espaço."""
+    text = unicodedata.normalize("NFKD", str(text or "").lower()).encode("ascii", "ignore").decode("ascii")
+    return NON_ALPHANUMERIC_PATTERN.sub(" ", text).strip()
+
+
+def lsh_bands(num_perm: int, threshold: float) -> Tuple[int, int]:
+    """Escolhe (bandas, linhas por banda) cujo limiar da curva S, (1/b)^(1/r), fica logo abaixo do limiar.
+
+    Um limiar de LSH um pouco menor favorece a revocação; os candidatos são confirmados depois
+    pela similaridade estimada das assinaturas.
+    """
+    target = max(0.05, threshold - 0.1)
+    options = [(bands, num_perm // bands) for bands in range(1, num_perm + 1) if num_perm % bands == 0]
+    return min(options, key=lambda option: abs((1 / option[0]) ** (1 / option[1]) - target))
+
+
+class NearDuplicateDetector:
+    """Agrupa leads quase duplicados com shingles de caracteres, MinHash e LSH por bandas.
+
+    Cada lead é comparado apenas com os representativos que caem nos mesmos buckets (no máximo
+    DEDUP_MAX_BUCKET_CANDIDATES por bucket), o que mantém o custo linear no número de leads.
+    O primeiro lead de cada grupo é o representativo; os seguintes são associados a ele quando a
+    similaridade de Jaccard estimada atinge o limiar e os contatos são compatíveis.
+    """
+
+    def __init__(self, threshold: float = DEDUP_SIMILARITY_THRESHOLD, num_perm: int = DEDUP_NUM_PERM,
+                 shingle_size: int = DEDUP_SHINGLE_SIZE, max_bucket_candidates: int = DEDUP_MAX_BUCKET_CANDIDATES,
+                 fields: Tuple[str, ...] = DEDUP_FIELDS):
+        import numpy as np
+
+        self.np = np
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self.max_bucket_candidates = max_bucket_candidates
+        self.fields = fields
+        self.bands, self.rows = lsh_bands(num_perm, threshold)
+
+        # Permutações aproximadas por hashing multiply-shift: h(x) = (a*x + b) >> 32 em 64 bits,
+        # com a ímpar; evita a divisão inteira (módulo de um primo), bem mais lenta no NumPy
+        rng = np.random.RandomState(_SEED)
+        self._a = rng.randint(0, 1 << 62, size=num_perm, dtype=np.int64).astype(np.uint64) * np.uint64(2) + np.uint64(1)
+        self._b = rng.randint(0, 1 << 62, size=num_perm, dtype=np.int64).astype(np.uint64) * np.uint64(4)
+
+    def shingles(self, lead: Dict[str, Any]) -> List[int]:
+        """Hashes (CRC32) dos shingles de caracteres dos campos normalizados, distintos por campo."""
+        hashes = set()
+        size = self.shingle_size
+        crc32 = zlib.crc32
+        for index, field in enumerate(self.fields):
+            # O texto normalizado é ASCII; o índice do campo entra como valor inicial do CRC32
+            data = normalize_text(lead.get(field, "")).encode("ascii")
+            if not data:
+                continue
+            if len(data) <= size:
+                hashes.add(crc32(data, index))
+                continue
+            hashes.update({crc32(data[start:start + size], index) for start in range(len(data) - size + 1)})
+        return list(hashes)
+
+    def signature(self, lead: Dict[str, Any]) -> Optional[Any]:
+        """Assinatura MinHash (uint32) do lead, ou None se os campos usados estiverem vazios."""
+        return self.signatures([lead])[0]
+
+    def signatures(self, leads: List[Dict[str, Any]]) -> List[Optional[Any]]:
+        """Assinaturas MinHash de vários leads, calculadas em uma única operação vetorizada."""
+        np = self.np
+        shingle_lists = [self.shingles(lead) for lead in leads]
+        lengths = np.fromiter((len(hashes) for hashes in shingle_lists), dtype=np.int64, count=len(leads))
+        non_empty = lengths > 0
+        if not non_empty.any():
+            return [None] * len(leads)
+
+        values = np.fromiter((value for hashes in shingle_lists for value in hashes), dtype=np.uint64)
+        permuted = ((values[:, None] * self._a + self._b) >> np.uint64(32)).astype(np.uint32)
+        offsets = np.concatenate(([0], np.cumsum(lengths[non_empty])[:-1]))
+        minimums = np.minimum.reduceat(permuted, offsets, axis=0)
+
+        result: List[Optional[Any]] = [None] * len(leads)
+        for row, index in enumerate(np.flatnonzero(non_empty)):
+            result[index] = minimums[row]
+        return result
+
+    def similarity(self, first: Any, second: Any) -> float:
+        """Similaridade de Jaccard estimada por duas assinaturas MinHash."""
+        return int(self.np.count_nonzero(first == second)) / self.num_perm
+
+    @staticmethod
+    def compatible(lead: Dict[str, Any], representative: Dict[str, Any]) -> bool:
+        """Evita agrupar pessoas ou empresas diferentes cujos textos são parecidos (ex.: templates).
+
+        Exige o mesmo indicador de tomador de decisão e o mesmo email; sem email em comum, exige
+        o mesmo nome e a mesma empresa.
+        """
+        if bool(lead.get("decision_maker")) != bool(representative.get("decision_maker")):
+            return False
+        email = normalize_text(lead.get("email"))
+        if email and email == normalize_text(representative.get("email")):
+            return True
+        return normalize_text(lead.get("name")) == normalize_text(representative.get("name")) and \
+            normalize_text(lead.get("company")) == normalize_text(representative.get("company"))
+
+    def cluster(self, leads: Iterable[Dict[str, Any]]) -> Dict[str, str]:
+        """Retorna o id do representativo de cada lead duplicado (leads únicos ficam de fora)."""
+        buckets: List[Dict[bytes, List[Tuple[Dict[str, Any], Any]]]] = [{} for _ in range(self.bands)]
+        duplicate_of = {}
+        rows = self.rows
+
+        for lead, signature in self._iter_signatures(leads):
+            if signature is None:
+                continue
+
+            keys = [signature[band * rows:(band + 1) * rows].tobytes() for band in range(self.bands)]
+            representative = None
+            for band, key in enumerate(keys):
+                for candidate, candidate_signature in buckets[band].get(key, ()):
+                    if self.similarity(signature, candidate_signature) >= self.threshold and \
+                            self.compatible(lead, candidate):
+                        representative = candidate
+                        break
+                if representative is not None:
+                    break
+
+            if representative is not None:
+                duplicate_of[str(lead["id"])] = str(representative["id"])
+                continue
+
+            for band, key in enumerate(keys):
+                bucket = buckets[band].setdefault(key, [])
+                if len(bucket) < self.max_bucket_candidates:
+                    bucket.append((lead, signature))
+
+        return duplicate_of
+
+    def _iter_signatures(self, leads: Iterable[Dict[str, Any]]) -> Iterable[Tuple[Dict[str, Any], Optional[Any]]]:
+        """Percorre os leads com suas assinaturas, calculadas em blocos de SIGNATURE_CHUNK_SIZE."""
+        chunk = []
+        for lead in leads:
+            chunk.append(lead)
+            if len(chunk) >= SIGNATURE_CHUNK_SIZE:
+                yield from zip(chunk, self.signatures(chunk))
+                chunk = []
+        if chunk:
+            yield from zip(chunk, self.signatures(chunk))
+
+
+def cluster_stats(total_leads: int, duplicate_of: Dict[str, str]) -> Dict[str, Any]:
+    """Resumo dos grupos: leads, grupos, duplicatas e tamanho do maior grupo."""
+    sizes: Dict[str, int] = {}
+    for representative in duplicate_of.values():
+        sizes[representative] = sizes.get(representative, 1) + 1
+    return {
+        "leads": total_leads,
+        "clusters": total_leads - len(duplicate_of),
+        "duplicates": len(duplicate_of),
+        "clusters_with_duplicates": len(sizes),
+        "largest_cluster": max(sizes.values(), default=1 if total_leads else 0)
+    }
+
+
+def cluster_members(duplicate_of: Dict[str, str]) -> Dict[str, List[str]]:
+    """Inverte o mapeamento: ids dos membros de cada representativo."""
+    members: Dict[str, List[str]] = {}
+    for lead_id, representative in duplicate_of.items():
+        members.setdefault(representative, []).append(lead_id)
+    return members
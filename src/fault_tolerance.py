@@ -0,0 +1,188 @@
+import asyncio
+import datetime
+import json
+import os
+import random
+import threading
+import time
+from typing import Dict, Any, Awaitable, Callable, Iterable, List, TypeVar
+
+from config import MAX_LEAD_RETRIES, RETRY_BASE_DELAY_SECONDS, RETRY_MAX_DELAY_SECONDS
+from src.instrumentation import METRICS
+
+T = TypeVar("T")
+
+# Status HTTP e exceções (do cliente openai/httpx) tratados como falhas transitórias
+TRANSIENT_STATUS_CODES = frozenset({408, 409, 429, 500, 502, 503, 504})
+TRANSIENT_ERROR_NAMES = frozenset({
+    "APITimeoutError", "APIConnectionError", "RateLimitError", "InternalServerError",
+    "TimeoutException", "ConnectTimeout", "ReadTimeout", "RemoteProtocolError"
+})
+
+DEAD_LETTER_SUFFIX = ".dead_letter.jsonl"
+
+
+class ResponseParseError(ValueError):
+    """Resposta do LLM que não pôde ser convertida no resultado esperado."""
+
+
+class LeadFailure(Exception):
+    """Falha definitiva de um lead em uma etapa, depois de esgotadas as novas tentativas."""
+
+    def __init__(self, stage: str, error: Exception, attempts: int):
+        super().__init__(f"{type(error).__name__}: {error}")
+        self.stage = stage
+        self.error = error
+        self.attempts = attempts
+
+
+def is_retryable(error: Exception) -> bool:
+    """Indica se vale a pena tentar novamente (limite de taxa, 5xx, timeout ou resposta inválida)."""
+    if isinstance(error, (ResponseParseError, TimeoutError, ConnectionError, asyncio.TimeoutError)):
+        return True
+    status_code = getattr(error, "status_code", None)
+    if status_code is None:
+        status_code = getattr(getattr(error, "response", None), "status_code", None)
+    if status_code in TRANSIENT_STATUS_CODES:
+        return True
+    return any(cls.__name__ in TRANSIENT_ERROR_NAMES for cls in type(error).__mro__)
+
+
+class RetryPolicy:
+    """Novas tentativas limitadas, com espera exponencial e jitter, para a chamada de um único lead."""
+
+    def __init__(self, max_retries: int = MAX_LEAD_RETRIES, base_delay: float = RETRY_BASE_DELAY_SECONDS,
+                 max_delay: float = RETRY_MAX_DELAY_SECONDS):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def delay(self, retry: int) -> float:
+        """Espera antes da nova tentativa de número retry (0, 1, ...): base * 2^retry, com jitter."""
+        return min(self.max_delay, self.base_delay * (2 ** retry)) * random.uniform(0.5, 1.0)
+
+    def should_retry(self, error: Exception, retry: int) -> bool:
+        """Indica se o erro permite mais uma tentativa."""
+        return retry < self.max_retries and is_retryable(error)
+
+    def call(self, function: Callable[[], T], stage: str) -> T:
+        """Executa a função, repetindo-a em falhas transitórias; lança LeadFailure ao desistir."""
+        retry = 0
+        while True:
+            try:
+                return function()
+            except Exception as e:
+                if not self.should_retry(e, retry):
+                    METRICS.record_failed_leads(stage)
+                    raise LeadFailure(stage, e, retry + 1) from e
+                METRICS.record_retry(stage)
+                time.sleep(self.delay(retry))
+                retry += 1
+
+    async def acall(self, function: Callable[[], Awaitable[T]], stage: str) -> T:
+        """Versão assíncrona de call."""
+        retry = 0
+        while True:
+            try:
+                return await function()
+            except Exception as e:
+                if not self.should_retry(e, retry):
+                    METRICS.record_failed_leads(stage)
+                    raise LeadFailure(stage, e, retry + 1) from e
+                METRICS.record_retry(stage)
+                await asyncio.sleep(self.delay(retry))
+                retry += 1
+
+
+def failure_record(lead_id: Any, failure: Exception) -> Dict[str, Any]:
+    """Registro serializável da falha de um lead, guardado no estado (failed_leads)."""
+    if isinstance(failure, LeadFailure):
+        return {"id": lead_id, "stage": failure.stage, "error": str(failure), "attempts": failure.attempts}
+    return {"id": lead_id, "stage": "unknown", "error": f"{type(failure).__name__}: {failure}", "attempts": 1}
+
+
+def dead_letter_path_for(output_file: str) -> str:
+    """Caminho padrão da fila de mensagens mortas associada a um arquivo de saída."""
+    base, _ = os.path.splitext(output_file)
+    return base + DEAD_LETTER_SUFFIX
+
+
+class DeadLetterQueue:
+    """Fila de mensagens mortas: leads que falharam definitivamente, gravados em JSONL.
+
+    Cada linha é o lead original (no formato de entrada) acrescido da chave "_dead_letter" com a
+    etapa, o erro e as tentativas; o arquivo pode ser usado diretamente como --input de uma nova
+    execução, que reprocessa apenas esses leads.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.entries: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    def add(self, lead: Dict[str, Any], failure: Dict[str, Any]):
+        """Adiciona um lead (formato de entrada) com o registro da sua falha."""
+        entry = {key: value for key, value in lead.items() if key != "_dead_letter"}
+        entry["_dead_letter"] = {**failure, "failed_at": datetime.datetime.now().isoformat(timespec="seconds")}
+        with self._lock:
+            self.entries.append(entry)
+
+    def add_failures(self, leads: Iterable[Dict[str, Any]], failures: List[Dict[str, Any]]):
+        """Adiciona as falhas de uma execução (failed_leads), associando-as aos leads de entrada pelo id."""
+        if not failures:
+            return
+        by_id = {str(failure["id"]): failure for failure in failures}
+        for lead in leads:
+            failure = by_id.pop(str(lead.get("id", "")), None)
+            if failure is not None:
+                self.add(lead, failure)
+
+    def extend_from_file(self, path: str):
+        """Acrescenta as entradas de outro arquivo de mensagens mortas (ex.: de um shard)."""
+        if not os.path.exists(path):
+            return
+        with open(path, 'r') as file:
+            entries = [json.loads(line) for line in file if line.strip()]
+        with self._lock:
+            self.entries.extend(entries)
+
+    def flush(self) -> int:
+        """Acrescenta ao arquivo as falhas desta execução e retorna quantas foram gravadas.
+
+        O arquivo sempre acumula: as entradas de execuções anteriores ainda não reprocessadas são
+        mantidas, e um lead que falha de novo tem a sua entrada substituída pela mais recente. Sem
+        falhas nesta execução, o arquivo não é alterado.
+        """
+        with self._lock:
+            entries = list(self.entries)
+
+        if not entries:
+            return 0
+
+        merged = {}
+        if os.path.exists(self.path):
+            with open(self.path, 'r') as file:
+                for position, line in enumerate(file):
+                    if line.strip():
+                        entry = json.loads(line)
+                        merged[self._entry_key(entry, position)] = entry
+        for position, entry in enumerate(entries):
+            key = self._entry_key(entry, ("new", position))
+            merged.pop(key, None)
+            merged[key] = entry
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temporary_path = self.path + ".tmp"
+        with open(temporary_path, 'w') as file:
+            for entry in merged.values():
+                file.write(json.dumps(entry) + "\n")
+        os.replace(temporary_path, self.path)
+        return len(entries)
+
+    @staticmethod
+    def _entry_key(entry: Dict[str, Any], position: Any) -> Any:
+        """Chave de uma entrada no arquivo: o id do lead ou, sem id, a sua posição."""
+        lead_id = entry.get("id")
+        return ("id", str(lead_id)) if lead_id not in (None, "") else ("position", position)
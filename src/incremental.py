@@ -0,0 +1,82 @@
+import hashlib
+import json
+import os
+from typing import Dict, Any, Optional
+
+# Campos normalizados que influenciam a qualificação BANT. last_interaction e interactions também
+# vão ao prompt, mas só como contexto: uma mudança apenas neles reaproveita a qualificação anterior
+# e recalcula a priorização, que depende deles; por isso ficam fora da impressão digital.
+BANT_FINGERPRINT_FIELDS = (
+    "name",
+    "company",
+    "position",
+    "company_size",
+    "industry",
+    "source",
+    "budget_info",
+    "decision_maker",
+    "needs",
+    "timeline",
+    "additional_notes"
+)
+
+
+def lead_fingerprint(normalized_lead: Dict[str, Any]) -> str:
+    """Calcula a impressão digital dos campos relevantes para a qualificação BANT do lead."""
+    payload = json.dumps(
+        {field: normalized_lead.get(field) for field in BANT_FINGERPRINT_FIELDS},
+        sort_keys=True,
+        ensure_ascii=False,
+        default=str
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class PreviousRunIndex:
+    """Índice dos resultados de uma execução anterior, por id do lead."""
+
+    def __init__(self, entries: Dict[str, Dict[str, Any]]):
+        self.entries = entries
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    @classmethod
+    def load(cls, file_path: str) -> "PreviousRunIndex":
+        """Carrega os resultados anteriores (formato de resultados_leads.json ou JSONL)."""
+        entries = {}
+
+        if not file_path or not os.path.exists(file_path):
+            return cls(entries)
+
+        try:
+            with open(file_path, 'r') as file:
+                if file_path.endswith(".jsonl"):
+                    records = (json.loads(line) for line in file if line.strip())
+                    for record in records:
+                        cls._add_record(entries, record)
+                else:
+                    for record in json.load(file).get("prioritized_leads", []):
+                        cls._add_record(entries, record)
+        except Exception as e:
+            print(f"Erro ao carregar resultados anteriores: {e}")
+
+        return cls(entries)
+
+    @staticmethod
+    def _add_record(entries: Dict[str, Dict[str, Any]], record: Dict[str, Any]):
+        """Registra um resultado anterior que possua impressão digital."""
+        if record.get("fingerprint") and record.get("qualification"):
+            entries[str(record["id"])] = record
+
+    def lookup(self, lead: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Retorna o resultado anterior do lead se seus dados BANT não mudaram."""
+        record = self.entries.get(str(lead.get("id", "")))
+        if record is None:
+            return None
+
+        fingerprint = lead.get("fingerprint") or lead_fingerprint(lead)
+        if record["fingerprint"] != fingerprint:
+            return None
+
+        return record
@@ -0,0 +1,295 @@
+import cProfile
+import functools
+import json
+import os
+import pstats
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, Any, Callable, List, Optional, Tuple
+
+from src.concurrency import estimate_tokens
+
+METRIC_PREFIX = "leadq"
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    """Percentil simples (vizinho mais próximo) de uma lista de valores."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(fraction * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+def token_usage(response: Any, prompt: str) -> Tuple[int, int]:
+    """Obtém os tokens de prompt e de resposta informados pela API, ou uma estimativa."""
+    metadata = getattr(response, "response_metadata", None) or {}
+    usage = metadata.get("token_usage") or getattr(response, "usage_metadata", None) or {}
+
+    prompt_tokens = usage.get("prompt_tokens", usage.get("input_tokens"))
+    completion_tokens = usage.get("completion_tokens", usage.get("output_tokens"))
+
+    if prompt_tokens is None:
+        prompt_tokens = estimate_tokens(prompt)
+    if completion_tokens is None:
+        completion_tokens = estimate_tokens(str(getattr(response, "content", "")))
+
+    return prompt_tokens, completion_tokens
+
+
+class RunMetrics:
+    """Coletor de métricas de desempenho dos nós do grafo e das chamadas ao LLM."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Descarta todas as métricas coletadas."""
+        with self._lock:
+            self.node_runs = defaultdict(int)
+            self.node_seconds = defaultdict(float)
+            self.llm_latencies = defaultdict(list)
+            self.llm_counters = defaultdict(lambda: defaultdict(float))
+
+    def record_node(self, node: str, seconds: float):
+        """Registra uma execução de nó do grafo."""
+        with self._lock:
+            self.node_runs[node] += 1
+            self.node_seconds[node] += seconds
+
+    def record_llm_call(self, stage: str, wall_seconds: float, prompt_tokens: int = 0, completion_tokens: int = 0,
+                        queue_wait_seconds: float = 0.0, retries: int = 0):
+        """Registra uma chamada ao LLM."""
+        with self._lock:
+            self.llm_latencies[stage].append(wall_seconds)
+            counters = self.llm_counters[stage]
+            counters["calls"] += 1
+            counters["wall_seconds"] += wall_seconds
+            counters["queue_wait_seconds"] += queue_wait_seconds
+            counters["prompt_tokens"] += prompt_tokens
+            counters["completion_tokens"] += completion_tokens
+            counters["retries"] += retries
+
+    def record_llm_error(self, stage: str, wall_seconds: float, queue_wait_seconds: float = 0.0):
+        """Registra uma chamada ao LLM que terminou em exceção (incluída nas latências)."""
+        with self._lock:
+            self.llm_latencies[stage].append(wall_seconds)
+            counters = self.llm_counters[stage]
+            counters["calls"] += 1
+            counters["errors"] += 1
+            counters["wall_seconds"] += wall_seconds
+            counters["queue_wait_seconds"] += queue_wait_seconds
+
+    def record_retry(self, stage: str):
+        """Registra uma nova tentativa de chamada ao LLM."""
+        with self._lock:
+            self.llm_counters[stage]["retries"] += 1
+
+    def record_parse_failure(self, stage: str, count: int = 1):
+        """Registra respostas (ou itens de uma resposta em lote) do LLM que não puderam ser analisados."""
+        with self._lock:
+            self.llm_counters[stage]["parse_failures"] += count
+
+    def record_failed_leads(self, stage: str, count: int = 1):
+        """Registra leads que falharam mesmo após as novas tentativas (enviados à fila de mensagens mortas)."""
+        with self._lock:
+            self.llm_counters[stage]["failed_leads"] += count
+
+    def record_avoided_calls(self, stage: str, count: int = 1):
+        """Registra chamadas ao LLM dispensadas (por exemplo, pela pré-qualificação por regras)."""
+        with self._lock:
+            self.llm_counters[stage]["avoided_calls"] += count
+
+    def record_cascade(self, stage: str, escalated: bool, parse_failure: bool = False):
+        """Registra um lead avaliado pelo modelo mais barato da cascata e se ele foi escalado."""
+        with self._lock:
+            counters = self.llm_counters[stage]
+            counters["screened"] += 1
+            counters["escalations"] += int(escalated)
+            counters["escalations_parse_failure"] += int(escalated and parse_failure)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Dados brutos coletados, serializáveis, para agregação em outro processo (ex.: shards)."""
+        with self._lock:
+            return {
+                "node_runs": dict(self.node_runs),
+                "node_seconds": dict(self.node_seconds),
+                "llm_latencies": {stage: list(values) for stage, values in self.llm_latencies.items()},
+                "llm_counters": {stage: dict(counters) for stage, counters in self.llm_counters.items()}
+            }
+
+    def merge(self, snapshot: Dict[str, Any]):
+        """Soma às métricas deste coletor as de um snapshot (latências incluídas, para os percentis)."""
+        with self._lock:
+            for node, runs in snapshot["node_runs"].items():
+                self.node_runs[node] += runs
+            for node, seconds in snapshot["node_seconds"].items():
+                self.node_seconds[node] += seconds
+            for stage, values in snapshot["llm_latencies"].items():
+                self.llm_latencies[stage].extend(values)
+            for stage, counters in snapshot["llm_counters"].items():
+                for name, value in counters.items():
+                    self.llm_counters[stage][name] += value
+
+    def to_report(self) -> Dict[str, Any]:
+        """Gera o relatório da execução em formato serializável."""
+        with self._lock:
+            nodes = {
+                node: {"runs": self.node_runs[node], "wall_seconds": round(self.node_seconds[node], 4)}
+                for node in self.node_runs
+            }
+            llm = {}
+            for stage, counters in self.llm_counters.items():
+                latencies = self.llm_latencies.get(stage, [])
+                llm[stage] = {
+                    **{name: int(value) if float(value).is_integer() else round(value, 4)
+                       for name, value in counters.items()},
+                    "p50_seconds": round(percentile(latencies, 0.5), 4),
+                    "p99_seconds": round(percentile(latencies, 0.99), 4)
+                }
+                if counters.get("screened"):
+                    llm[stage]["escalation_rate"] = round(counters["escalations"] / counters["screened"], 4)
+
+        return {"generated_at": time.strftime("%Y-%m-%dT%H:%M:%S"), "nodes": nodes, "llm": llm}
+
+    def write_json_report(self, file_path: str):
+        """Grava o relatório da execução em JSON."""
+        with open(file_path, 'w') as file:
+            json.dump(self.to_report(), file, indent=2)
+
+    def prometheus_text(self) -> str:
+        """Métricas no formato de exposição de texto do Prometheus."""
+        report = self.to_report()
+        lines = []
+
+        def metric(name: str, metric_type: str, help_text: str, samples: List[Tuple[Dict[str, str], float]]):
+            full_name = f"{METRIC_PREFIX}_{name}"
+            lines.append(f"# HELP {full_name} {help_text}")
+            lines.append(f"# TYPE {full_name} {metric_type}")
+            for labels, value in samples:
+                label_text = ",".join(f'{key}="{label}"' for key, label in labels.items())
+                lines.append(f"{full_name}{{{label_text}}} {value}")
+
+        metric("node_runs_total", "counter", "Execuções de cada nó do grafo",
+               [({"node": node}, data["runs"]) for node, data in report["nodes"].items()])
+        metric("node_seconds_total", "counter", "Tempo total de execução de cada nó",
+               [({"node": node}, data["wall_seconds"]) for node, data in report["nodes"].items()])
+
+        counters = [
+            ("calls", "llm_calls_total", "Chamadas ao LLM"),
+            ("wall_seconds", "llm_call_seconds_total", "Tempo total das chamadas ao LLM"),
+            ("queue_wait_seconds", "llm_queue_wait_seconds_total", "Tempo de espera no limitador de taxa"),
+            ("prompt_tokens", "llm_prompt_tokens_total", "Tokens de prompt enviados"),
+            ("completion_tokens", "llm_completion_tokens_total", "Tokens de resposta recebidos"),
+            ("errors", "llm_errors_total", "Chamadas ao LLM que terminaram em erro"),
+            ("retries", "llm_retries_total", "Novas tentativas de chamadas ao LLM"),
+            ("parse_failures", "llm_parse_failures_total", "Respostas do LLM que não puderam ser analisadas"),
+            ("avoided_calls", "llm_avoided_calls_total", "Chamadas ao LLM dispensadas"),
+            ("failed_leads", "llm_failed_leads_total", "Leads que falharam após as novas tentativas"),
+            ("screened", "llm_cascade_screened_total", "Leads avaliados pelo modelo mais barato da cascata"),
+            ("escalations", "llm_cascade_escalations_total", "Leads escalados ao modelo principal na cascata")
+        ]
+        for key, name, help_text in counters:
+            metric(name, "counter", help_text,
+                   [({"stage": stage}, data.get(key, 0)) for stage, data in report["llm"].items()])
+
+        metric("llm_call_seconds", "gauge", "Latência das chamadas ao LLM por quantil",
+               [({"stage": stage, "quantile": quantile}, data[f"p{quantile[2:]}_seconds"])
+                for stage, data in report["llm"].items() for quantile in ("0.50", "0.99")])
+
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus_textfile(self, file_path: str):
+        """Grava as métricas no formato textfile do Prometheus (node_exporter), de forma atômica."""
+        temporary_path = f"{file_path}.tmp"
+        with open(temporary_path, 'w') as file:
+            file.write(self.prometheus_text())
+        os.replace(temporary_path, file_path)
+
+
+METRICS = RunMetrics()
+
+
+_profile_stats: Dict[str, pstats.Stats] = {}
+_profile_lock = threading.Lock()
+
+
+def save_profile(profile_dir: str, name: str, profiler: cProfile.Profile):
+    """Soma o perfil ao acumulado do processo para <profile_dir>/<name>.prof e grava o arquivo.
+
+    Execuções repetidas (um nó chamado a cada lote, as threads de uma etapa do pipeline) resultam
+    em um único perfil cumulativo, em vez de cada uma sobrescrever a anterior.
+    """
+    path = os.path.join(profile_dir, f"{name}.prof")
+    with _profile_lock:
+        stats = _profile_stats.get(path)
+        if stats is None:
+            stats = _profile_stats[path] = pstats.Stats(profiler)
+        else:
+            stats.add(profiler)
+        os.makedirs(profile_dir, exist_ok=True)
+        stats.dump_stats(path)
+
+
+def instrument_node(name: str, node: Callable[[Dict[str, Any]], Dict[str, Any]]) -> Callable:
+    """Envolve um nó do grafo medindo seu tempo de execução.
+
+    Se a opção profile_dir estiver definida no estado, o nó também é perfilado com cProfile e o
+    perfil acumulado de todas as suas execuções é gravado em <profile_dir>/<nome do nó>.prof.
+    """
+
+    @functools.wraps(node)
+    def wrapper(state: Dict[str, Any]) -> Dict[str, Any]:
+        profile_dir = (state.get("options") or {}).get("profile_dir")
+        profiler = cProfile.Profile() if profile_dir else None
+
+        start = time.perf_counter()
+        if profiler is not None:
+            profiler.enable()
+        try:
+            return node(state)
+        finally:
+            if profiler is not None:
+                profiler.disable()
+                save_profile(profile_dir, name, profiler)
+            METRICS.record_node(name, time.perf_counter() - start)
+
+    return wrapper
+
+
+def timed_invoke(llm: Any, prompt: str, stage: str) -> Any:
+    """Chama llm.invoke registrando tempo e tokens da chamada (ou o erro, se ela falhar)."""
+    start = time.perf_counter()
+    try:
+        response = llm.invoke(prompt)
+    except Exception:
+        METRICS.record_llm_error(stage, time.perf_counter() - start)
+        raise
+    prompt_tokens, completion_tokens = token_usage(response, prompt)
+    METRICS.record_llm_call(stage, time.perf_counter() - start, prompt_tokens, completion_tokens)
+    return response
+
+
+async def timed_ainvoke(llm: Any, prompt: str, stage: str, queue_wait_seconds: float = 0.0) -> Any:
+    """Chama llm.ainvoke registrando tempo, espera na fila e tokens da chamada (ou o erro, se ela falhar)."""
+    start = time.perf_counter()
+    try:
+        response = await llm.ainvoke(prompt)
+    except Exception:
+        METRICS.record_llm_error(stage, time.perf_counter() - start, queue_wait_seconds)
+        raise
+    prompt_tokens, completion_tokens = token_usage(response, prompt)
+    METRICS.record_llm_call(stage, time.perf_counter() - start, prompt_tokens, completion_tokens,
+                            queue_wait_seconds)
+    return response
+
+
+async def timed_acquire(rate_limiter: Optional[Any], tokens: int) -> float:
+    """Aguarda o limitador de taxa (se houver) e retorna o tempo de espera."""
+    if rate_limiter is None:
+        return 0.0
+    start = time.perf_counter()
+    await rate_limiter.acquire(tokens)
+    return time.perf_counter() - start
@@ -1,6 +1,8 @@
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 import datetime
 
+from config import RECENCY_BUCKET_LIMITS, RECENCY_BUCKET_SCORES
+
 
 class LeadPrioritizer:
     """Classe para priorizar leads com base na pontuação e outros fatores."""
@@ -12,29 +14,38 @@ class LeadPrioritizer:
             "engagement": 0.2
         }
 
-    def calculate_recency_score(self, last_interaction: str) -> float:
-        """Calcula uma pontuação baseada na recência da última interação."""
+    def calculate_recency_score(self, last_interaction: str,
+                                reference_date: Optional[datetime.datetime] = None) -> float:
+        """Calcula uma pontuação baseada na recência da última interação.
+
+        A recência é medida em relação a reference_date (por padrão, o momento atual).
+        """
         try:
             if not last_interaction:
                 return 0.0
 
             last_date = datetime.datetime.strptime(last_interaction, "%Y-%m-%d")
-            today = datetime.datetime.now()
+            today = reference_date or datetime.datetime.now()
             days_since = (today - last_date).days
 
-            if days_since <= 1:
-                return 1.0
-            elif days_since <= 7:
-                return 0.8
-            elif days_since <= 14:
-                return 0.6
-            elif days_since <= 30:
-                return 0.4
-            else:
-                return 0.2
+            return self.recency_bucket(days_since)
         except Exception:
             return 0.0
 
+    def recency_bucket(self, days_since: int) -> float:
+        """Converte a quantidade de dias desde a última interação na pontuação de recência."""
+        for limit, score in zip(RECENCY_BUCKET_LIMITS, RECENCY_BUCKET_SCORES):
+            if days_since <= limit:
+                return score
+        return RECENCY_BUCKET_SCORES[-1]
+
+    def recency_rollover_days(self, days_since: int) -> Optional[int]:
+        """Dias desde a última interação em que a recência muda de faixa, ou None se não muda mais."""
+        for limit in RECENCY_BUCKET_LIMITS:
+            if days_since <= limit:
+                return limit + 1
+        return None
+
     def calculate_engagement_score(self, interactions: List[str]) -> float:
         """Calcula uma pontuação baseada no nível de engajamento."""
         if not interactions:
@@ -53,9 +64,10 @@ class LeadPrioritizer:
         else:
             return 0.0
 
-    def prioritize_lead(self, lead: Dict[str, Any], qualification_result: Dict[str, Any]) -> Dict[str, Any]:
+    def prioritize_lead(self, lead: Dict[str, Any], qualification_result: Dict[str, Any],
+                        reference_date: Optional[datetime.datetime] = None) -> Dict[str, Any]:
         """Prioriza um lead com base em múltiplos fatores."""
-        recency_score = self.calculate_recency_score(lead.get("last_interaction", ""))
+        recency_score = self.calculate_recency_score(lead.get("last_interaction", ""), reference_date)
 
         engagement_score = self.calculate_engagement_score(lead.get("interactions", []))
 
@@ -65,11 +77,7 @@ class LeadPrioritizer:
                 engagement_score * self.prioritization_factors["engagement"]
         )
 
-        priority_level = "baixa"
-        if priority_score >= 0.8:
-            priority_level = "alta"
-        elif priority_score >= 0.5:
-            priority_level = "média"
+        priority_level = self.priority_level(priority_score)
 
         # Criar resultado de priorização
         prioritization_result = {
@@ -84,15 +92,25 @@ class LeadPrioritizer:
 
         return prioritization_result
 
-    def prioritize_leads(self, leads_with_qualification: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    def priority_level(self, priority_score: float) -> str:
+        """Define o nível de prioridade a partir da pontuação de prioridade."""
+        if priority_score >= 0.8:
+            return "alta"
+        elif priority_score >= 0.5:
+            return "média"
+        return "baixa"
+
+    def prioritize_leads(self, leads_with_qualification: List[Dict[str, Any]],
+                         reference_date: Optional[datetime.datetime] = None) -> List[Dict[str, Any]]:
         """Prioriza uma lista de leads e os ordena por prioridade."""
         prioritized_leads = []
+        reference_date = reference_date or datetime.datetime.now()
 
         for lead_data in leads_with_qualification:
             lead = lead_data["lead"]
             qualification = lead_data["qualification"]
 
-            prioritization = self.prioritize_lead(lead, qualification)
+            prioritization = self.prioritize_lead(lead, qualification, reference_date)
 
             prioritized_lead = {
                 "lead": lead,
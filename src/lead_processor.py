@@ -1,5 +1,30 @@
+import itertools
 import json
-from typing import Dict, Any, List
+from typing import Dict, Any, Iterator, List
+
+STREAM_CHUNK_SIZE = 1 << 16
+
+# Valores tratados como ausentes no formato compacto
+EMPTY_FIELD_VALUES = ("", "unknown")
+
+# Rótulos curtos do formato compacto, na ordem em que aparecem no prompt
+COMPACT_FIELDS = (
+    ("name", "Nome"),
+    ("company", "Empresa"),
+    ("position", "Cargo"),
+    ("company_size", "Porte"),
+    ("industry", "Indústria"),
+    ("source", "Fonte"),
+    ("last_interaction", "Última interação"),
+    ("budget_info", "Orçamento"),
+    ("needs", "Necessidades"),
+    ("timeline", "Prazo"),
+    ("additional_notes", "Notas"),
+)
+
+
+class LeadFileError(ValueError):
+    """Arquivo de leads inexistente, ilegível ou com JSON inválido."""
 
 
 class LeadProcessor:
@@ -18,6 +43,85 @@ class LeadProcessor:
             print(f"Erro ao carregar leads: {e}")
             return []
 
+    def iter_leads_from_file(self, file_path: str, chunk_size: int = STREAM_CHUNK_SIZE) -> Iterator[Dict[str, Any]]:
+        """Lê leads de um arquivo JSON (array) ou JSONL sob demanda, com uso de memória constante.
+
+        Um trecho inválido no meio do arquivo lança LeadFileError com a linha (JSONL) ou a posição
+        (array) do erro, em vez de encerrar a leitura em silêncio com apenas parte dos leads.
+        """
+        try:
+            file = open(file_path, 'r')
+        except OSError as e:
+            raise LeadFileError(f"Não foi possível abrir {file_path}: {e}") from e
+
+        with file:
+            first_char = ""
+            while not first_char:
+                chunk = file.read(1)
+                if not chunk:
+                    return
+                first_char = chunk.strip()
+
+            if first_char == "[":
+                yield from self._iter_json_array(file, chunk_size)
+            else:
+                yield from self._iter_json_lines(first_char, file)
+
+    def _iter_json_lines(self, first_char: str, file) -> Iterator[Dict[str, Any]]:
+        """Lê um lead por linha de um arquivo JSONL."""
+        lines = itertools.chain([first_char + file.readline()], file)
+
+        for line_number, line in enumerate(lines, start=1):
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError as e:
+                raise LeadFileError(f"JSON inválido na linha {line_number}: {e.msg}") from e
+
+    def _iter_json_array(self, file, chunk_size: int) -> Iterator[Dict[str, Any]]:
+        """Decodifica incrementalmente os elementos de um array JSON, bloco a bloco."""
+        decoder = json.JSONDecoder()
+        buffer = ""
+        position = 0
+        # Caracteres já descartados do início do arquivo (após o "["), para localizar erros
+        offset = 1
+        index = 0
+        eof = False
+
+        while True:
+            while position < len(buffer) and buffer[position] in " \t\r\n,":
+                position += 1
+
+            if position >= len(buffer):
+                if eof:
+                    raise LeadFileError("Array JSON não finalizado")
+                offset += len(buffer)
+                buffer = file.read(chunk_size)
+                position = 0
+                eof = not buffer
+                continue
+
+            if buffer[position] == "]":
+                return
+
+            try:
+                lead, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError as e:
+                if eof:
+                    raise LeadFileError(f"JSON inválido no lead {index + 1} do array "
+                                     f"(caractere {offset + e.pos}): {e.msg}") from e
+                more = file.read(chunk_size)
+                eof = not more
+                offset += position
+                buffer = buffer[position:] + more
+                position = 0
+                continue
+
+            yield lead
+            index += 1
+            position = end
+
     def normalize_lead_data(self, lead: Dict[str, Any]) -> Dict[str, Any]:
         """Normaliza os dados do lead para um formato consistente."""
         normalized_lead = {
@@ -57,4 +161,38 @@ class LeadProcessor:
             Prazo: {lead['timeline']}
             Notas adicionais: {lead['additional_notes']}
             """
-        return lead_info.strip()
\ No newline at end of file
+        return lead_info.strip()
+
+    def format_interactions_compact(self, interactions: List[str], char_budget: int) -> str:
+        """Resume o histórico de interações mantendo as mais recentes (ao final) dentro do orçamento."""
+        kept = []
+        used = 0
+        for interaction in reversed(interactions):
+            interaction = " ".join(str(interaction).split())
+            cost = len(interaction) + (2 if kept else 0)
+            if used + cost > char_budget:
+                break
+            kept.append(interaction)
+            used += cost
+
+        kept.reverse()
+        omitted = len(interactions) - len(kept)
+        if omitted:
+            kept.insert(0, f"+{omitted} anteriores")
+        return "; ".join(kept)
+
+    def format_lead_compact(self, lead: Dict[str, Any], interactions_budget: int) -> str:
+        """Formata o lead em poucas linhas, sem indentação e omitindo campos vazios ou "unknown"."""
+        lines = []
+        for field, label in COMPACT_FIELDS:
+            value = " ".join(str(lead.get(field) or "").split())
+            if value not in EMPTY_FIELD_VALUES:
+                lines.append(f"{label}: {value}")
+
+        lines.append(f"Tomador de decisão: {'Sim' if lead.get('decision_maker') else 'Não'}")
+
+        interactions = lead.get("interactions") or ()
+        if interactions:
+            lines.append(f"Interações: {self.format_interactions_compact(list(interactions), interactions_budget)}")
+
+        return "\n".join(lines)
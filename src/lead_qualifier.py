@@ -1,87 +1,436 @@
-from typing import Dict, Any, List, Tuple
-from langchain_openai import ChatOpenAI
+from typing import Dict, Any, List, Optional, Tuple, Union
 from langchain.prompts import ChatPromptTemplate
 from langchain.output_parsers import ResponseSchema, StructuredOutputParser
 import json
 
-from config import OPENAI_API_KEY, LLM_MODEL, QUALIFICATION_CRITERIA, LEAD_ANALYSIS_TEMPLATE, LEAD_TIERS
+from config import LLM_MODEL, QUALIFICATION_CRITERIA, LEAD_ANALYSIS_TEMPLATE, CASCADE_LLM_MODEL, CASCADE_TIER_MARGIN
+from config import LEAD_BATCH_ANALYSIS_TEMPLATE, LEAD_COMPACT_ANALYSIS_TEMPLATE, LEAD_COMPACT_ANALYSIS_TEMPLATE_VERSION
+from config import COMPACT_INTERACTIONS_CHAR_BUDGET, LEAD_BATCH_ANALYSIS_TEMPLATE_VERSION
+from config import ESTIMATED_COMPLETION_TOKENS, LEAD_ANALYSIS_TEMPLATE_VERSION
+from src.concurrency import AsyncRateLimiter, estimate_tokens
+from src.llm_cache import LLMCache
+from src.fault_tolerance import LeadFailure, ResponseParseError, RetryPolicy
+from src.lead_processor import LeadProcessor
+from src.instrumentation import METRICS, timed_acquire, timed_ainvoke, timed_invoke
+from src.llm_clients import get_chat_model
+from src.rule_qualifier import bant_overall_score, bant_tier, near_tier_boundary
+
+# Parser, instruções de formato e templates são compilados uma única vez, na importação,
+# e compartilhados por todas as instâncias de LeadQualifier.
+QUALIFICATION_OUTPUT_PARSER = StructuredOutputParser.from_response_schemas([
+    ResponseSchema(name="budget", description="Pontuação de orçamento de 0 a 1", type="number"),
+    ResponseSchema(name="authority", description="Pontuação de autoridade de 0 a 1", type="number"),
+    ResponseSchema(name="need", description="Pontuação de necessidade de 0 a 1", type="number"),
+    ResponseSchema(name="timeline", description="Pontuação de prazo de 0 a 1", type="number"),
+    ResponseSchema(name="reasoning", description="Raciocínio detalhado para cada pontuação", type="string"),
+])
+QUALIFICATION_FORMAT_INSTRUCTIONS = QUALIFICATION_OUTPUT_PARSER.get_format_instructions()
+QUALIFICATION_PROMPT = ChatPromptTemplate.from_template(LEAD_ANALYSIS_TEMPLATE + "\n{format_instructions}")
+BATCH_QUALIFICATION_PROMPT = ChatPromptTemplate.from_template(LEAD_BATCH_ANALYSIS_TEMPLATE)
+COMPACT_QUALIFICATION_PROMPT = ChatPromptTemplate.from_template(LEAD_COMPACT_ANALYSIS_TEMPLATE)
+
+# No modo compacto o formato da resposta é garantido pelo modo JSON da API, e não por instruções no prompt
+JSON_RESPONSE_FORMAT = {"type": "json_object"}
 
 
 class LeadQualifier:
-    """Classe para qualificar leads com base nos critérios BANT."""
+    """Classe para qualificar leads com base nos critérios BANT.
 
-    def __init__(self):
-        self.llm = ChatOpenAI(
-            api_key=OPENAI_API_KEY,
-            model=LLM_MODEL,
-            temperature=0.2
-        )
+    Com compact=True, usa o formato compacto do lead (LeadProcessor.format_lead_compact) e o modo
+    JSON do modelo no lugar das instruções de formato do StructuredOutputParser.
+
+    Com cascade=True, cada lead é avaliado primeiro pelo cascade_model (mais barato e rápido); só os
+    leads cuja pontuação geral fica a menos de cascade_margin de um limiar de LEAD_TIERS, ou cuja
+    resposta é inválida, são requalificados pelo LLM_MODEL. O resultado indica o modelo em "model".
+    """
+
+    def __init__(self, cache: Optional[LLMCache] = None, compact: bool = False,
+                 interactions_budget: int = COMPACT_INTERACTIONS_CHAR_BUDGET, cascade: bool = False,
+                 cascade_model: str = CASCADE_LLM_MODEL, cascade_margin: float = CASCADE_TIER_MARGIN):
+        self.temperature = 0.2
+        self.cache = cache
+        self.compact = compact
+        self.interactions_budget = interactions_budget
+        self.cascade = cascade
+        self.cascade_model = cascade_model
+        self.cascade_margin = cascade_margin
+        self.processor = LeadProcessor()
         self.setup_output_parser()
 
+    @property
+    def llm(self) -> Any:
+        """Cliente de chat compartilhado (pool de conexões reutilizado entre nós e execuções)."""
+        return get_chat_model(LLM_MODEL, self.temperature)
+
+    @property
+    def qualification_llm(self) -> Any:
+        """Cliente usado na qualificação individual (com modo JSON no modo compacto)."""
+        return self.qualification_llm_for(LLM_MODEL)
+
+    def qualification_llm_for(self, model: str) -> Any:
+        """Cliente de qualificação individual do modelo informado."""
+        llm = get_chat_model(model, self.temperature)
+        if self.compact:
+            return llm.bind(response_format=JSON_RESPONSE_FORMAT)
+        return llm
+
+    @property
+    def batch_model(self) -> str:
+        """Modelo das requisições em lote (o da primeira avaliação, na cascata)."""
+        return self.cascade_model if self.cascade else LLM_MODEL
+
+    def needs_escalation(self, result: Dict[str, Any]) -> bool:
+        """Indica se o resultado do modelo mais barato está perto demais de um limiar de categoria."""
+        return near_tier_boundary(result["overall_score"], self.cascade_margin)
+
+    def lead_info(self, lead: Dict[str, Any]) -> str:
+        """Texto do lead enviado ao LLM, no formato completo ou compacto."""
+        if self.compact:
+            return self.processor.format_lead_compact(lead, self.interactions_budget)
+        return lead["formatted_info"]
+
     def setup_output_parser(self):
-        """Configura o parser de saída estruturada para o LLM."""
-        response_schemas = [
-            ResponseSchema(name="budget", description="Pontuação de orçamento de 0 a 1", type="number"),
-            ResponseSchema(name="authority", description="Pontuação de autoridade de 0 a 1", type="number"),
-            ResponseSchema(name="need", description="Pontuação de necessidade de 0 a 1", type="number"),
-            ResponseSchema(name="timeline", description="Pontuação de prazo de 0 a 1", type="number"),
-            ResponseSchema(name="reasoning", description="Raciocínio detalhado para cada pontuação", type="string"),
-        ]
-        self.output_parser = StructuredOutputParser.from_response_schemas(response_schemas)
-        self.format_instructions = self.output_parser.get_format_instructions()
+        """Configura o parser de saída estruturada para o LLM (compilado uma única vez no módulo)."""
+        self.output_parser = QUALIFICATION_OUTPUT_PARSER
+        self.format_instructions = QUALIFICATION_FORMAT_INSTRUCTIONS
+
+    def build_prompt(self, lead_info: str) -> str:
+        """Monta o prompt de qualificação para as informações do lead."""
+        if self.compact:
+            return COMPACT_QUALIFICATION_PROMPT.format(lead_info=lead_info)
+        return QUALIFICATION_PROMPT.format(
+            lead_info=lead_info,
+            format_instructions=self.format_instructions
+        )
+
+    def cache_key(self, prompt: str, model: str = LLM_MODEL) -> str:
+        """Gera a chave de cache para o prompt de qualificação."""
+        version = LEAD_COMPACT_ANALYSIS_TEMPLATE_VERSION + "-json" if self.compact else LEAD_ANALYSIS_TEMPLATE_VERSION
+        return LLMCache.make_key(prompt, model, self.temperature, version)
+
+    def batch_cache_key(self, lead: Dict[str, Any], model: str) -> str:
+        """Chave de cache de um lead qualificado em lote: o template e a resposta diferem dos individuais."""
+        version = LEAD_BATCH_ANALYSIS_TEMPLATE_VERSION + "-batch"
+        return LLMCache.make_key(self.lead_info(lead), model, self.temperature, version)
+
+    def score_response(self, content: str) -> Dict[str, Any]:
+        """Converte a resposta do LLM no resultado de qualificação BANT (lança exceção se inválida)."""
+        if self.compact:
+            return self.build_qualification(json.loads(content))
+        return self.build_qualification(self.output_parser.parse(content))
+
+    def build_qualification(self, parsed_response: Dict[str, Any]) -> Dict[str, Any]:
+        """Calcula a pontuação geral e a categoria a partir das pontuações BANT."""
+        overall_score = bant_overall_score(parsed_response)
+        tier = bant_tier(overall_score)
+
+        result = {
+            "budget_score": parsed_response["budget"],
+            "authority_score": parsed_response["authority"],
+            "need_score": parsed_response["need"],
+            "timeline_score": parsed_response["timeline"],
+            "reasoning": parsed_response["reasoning"],
+            "overall_score": round(overall_score, 2),
+            "tier": tier
+        }
+
+        return result
+
+    def get_cached_response(self, prompt: str, model: str = LLM_MODEL) -> Optional[str]:
+        """Busca no cache a resposta para o prompt, se o cache estiver habilitado."""
+        if self.cache is None:
+            return None
+        return self.cache.get(self.cache_key(prompt, model))
+
+    def complete_qualification(self, prompt: str, content: str, from_cache: bool = False,
+                               model: str = LLM_MODEL, stage: str = "qualification") -> Dict[str, Any]:
+        """Analisa a resposta e a armazena no cache somente quando válida.
+
+        Uma resposta inválida lança ResponseParseError, para que o lead seja tentado novamente
+        (ou enviado à fila de mensagens mortas) em vez de virar um lead "cold" com pontuação zero.
+        """
+        try:
+            result = self.score_response(content)
+        except Exception as e:
+            METRICS.record_parse_failure(stage)
+            raise ResponseParseError(f"Resposta de qualificação inválida: {e}") from e
+
+        if self.cache is not None and not from_cache:
+            self.cache.set(self.cache_key(prompt, model), content)
+
+        if self.cascade:
+            result["model"] = model
+        return result
+
+    def screen_result(self, result: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """Registra a avaliação do modelo mais barato; retorna None se o lead deve ser escalado."""
+        escalated = result is None or self.needs_escalation(result)
+        METRICS.record_cascade("qualification_cascade", escalated, parse_failure=result is None)
+        return None if escalated else result
+
+    def qualify_prompt(self, prompt: str, model: str = LLM_MODEL, stage: str = "qualification") -> Dict[str, Any]:
+        """Qualifica um prompt já montado com o modelo informado (consultando o cache)."""
+        cached = self.get_cached_response(prompt, model)
+        if cached is not None:
+            return self.complete_qualification(prompt, cached, True, model, stage)
+
+        response = timed_invoke(self.qualification_llm_for(model), prompt, stage)
+        return self.complete_qualification(prompt, response.content, False, model, stage)
+
+    async def aqualify_prompt(self, prompt: str, rate_limiter: Optional[AsyncRateLimiter] = None,
+                              model: str = LLM_MODEL, stage: str = "qualification") -> Dict[str, Any]:
+        """Versão assíncrona de qualify_prompt, respeitando o limitador de taxa."""
+        cached = self.get_cached_response(prompt, model)
+        if cached is not None:
+            return self.complete_qualification(prompt, cached, True, model, stage)
+
+        queue_wait = await timed_acquire(rate_limiter, estimate_tokens(prompt) + ESTIMATED_COMPLETION_TOKENS)
+
+        response = await timed_ainvoke(self.qualification_llm_for(model), prompt, stage, queue_wait)
+        return self.complete_qualification(prompt, response.content, False, model, stage)
 
     def qualify_lead(self, lead_info: str) -> Dict[str, Any]:
         """Qualifica um lead com base nas informações fornecidas."""
-        prompt_template = ChatPromptTemplate.from_template(
-            LEAD_ANALYSIS_TEMPLATE + "\n{format_instructions}"
-        )
+        prompt = self.build_prompt(lead_info)
 
-        prompt = prompt_template.format(
-            lead_info=lead_info,
-            format_instructions=self.format_instructions
+        if self.cascade:
+            try:
+                result = self.qualify_prompt(prompt, self.cascade_model, "qualification_cascade")
+            except ResponseParseError:
+                result = None
+            result = self.screen_result(result)
+            if result is not None:
+                return result
+
+        return self.qualify_prompt(prompt)
+
+    async def aqualify_lead(self, lead_info: str, rate_limiter: Optional[AsyncRateLimiter] = None) -> Dict[str, Any]:
+        """Versão assíncrona de qualify_lead, respeitando o limitador de taxa."""
+        prompt = self.build_prompt(lead_info)
+
+        if self.cascade:
+            try:
+                result = await self.aqualify_prompt(prompt, rate_limiter, self.cascade_model, "qualification_cascade")
+            except ResponseParseError:
+                result = None
+            result = self.screen_result(result)
+            if result is not None:
+                return result
+
+        return await self.aqualify_prompt(prompt, rate_limiter)
+
+    def build_batch_prompt(self, leads: List[Dict[str, Any]]) -> str:
+        """Monta um único prompt de qualificação para vários leads, identificados pelo id."""
+        leads_info = "\n\n".join(
+            f"Lead id: {lead['id']}\n{self.lead_info(lead)}" for lead in leads
         )
 
-        response = self.llm.invoke(prompt)
+        return BATCH_QUALIFICATION_PROMPT.format(leads_info=leads_info)
+
+    def parse_batch_response(self, content: str, lead_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Analisa a resposta em lote item a item, descartando apenas os itens ausentes ou malformados."""
+        results = {}
 
         try:
-            parsed_response = self.output_parser.parse(response.content)
-
-            overall_score = (
-                    parsed_response["budget"] * QUALIFICATION_CRITERIA["budget"]["weight"] +
-                    parsed_response["authority"] * QUALIFICATION_CRITERIA["authority"]["weight"] +
-                    parsed_response["need"] * QUALIFICATION_CRITERIA["need"]["weight"] +
-                    parsed_response["timeline"] * QUALIFICATION_CRITERIA["timeline"]["weight"]
-            )
-
-            tier = "cold"
-            for tier_name, threshold in sorted(LEAD_TIERS.items(), key=lambda x: x[1], reverse=True):
-                if overall_score >= threshold:
-                    tier = tier_name
-                    break
-
-            result = {
-                "budget_score": parsed_response["budget"],
-                "authority_score": parsed_response["authority"],
-                "need_score": parsed_response["need"],
-                "timeline_score": parsed_response["timeline"],
-                "reasoning": parsed_response["reasoning"],
-                "overall_score": round(overall_score, 2),
-                "tier": tier
-            }
+            start = content.index("[")
+            end = content.rindex("]") + 1
+            items = json.loads(content[start:end])
+        except ValueError as e:
+            print(f"Erro ao analisar a resposta em lote: {e}")
+            return results
+
+        expected_ids = set(lead_ids)
+
+        for item in items if isinstance(items, list) else []:
+            try:
+                lead_id = str(item["id"])
+                if lead_id not in expected_ids or lead_id in results:
+                    continue
+
+                scores = {criterion: float(item[criterion]) for criterion in QUALIFICATION_CRITERIA}
+                if not all(0 <= score <= 1 for score in scores.values()):
+                    continue
+
+                results[lead_id] = self.build_qualification({**scores, "reasoning": str(item["reasoning"])})
+            except (KeyError, TypeError, ValueError):
+                continue
+
+        return results
 
+    def cached_batch_result(self, lead: Dict[str, Any], model: str) -> Optional[Dict[str, Any]]:
+        """Resultado do lead armazenado por uma qualificação em lote com o modelo, se houver."""
+        cached = self.cache.get(self.batch_cache_key(lead, model))
+        if cached is None:
+            return None
+        try:
+            result = self.build_qualification(json.loads(cached))
+        except (KeyError, TypeError, ValueError):
+            return None
+
+        if self.cascade:
+            result["model"] = model
+        return result
+
+    def cached_model_result(self, lead: Dict[str, Any], prompt: str, model: str,
+                            stage: str) -> Optional[Dict[str, Any]]:
+        """Resultado em cache do lead para o modelo: o da qualificação individual ou, na falta dele, o do lote."""
+        cached = self.get_cached_response(prompt, model)
+        if cached is not None:
+            return self.complete_qualification(prompt, cached, True, model, stage)
+        return self.cached_batch_result(lead, model)
+
+    def cached_qualification(self, lead: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Resultado em cache do lead, se houver; na cascata, vale também o do modelo mais barato fora das margens."""
+        prompt = self.build_prompt(self.lead_info(lead))
+        result = self.cached_model_result(lead, prompt, LLM_MODEL, "qualification")
+        if result is not None or not self.cascade:
             return result
 
-        except Exception as e:
-            print(f"Erro ao analisar a resposta: {e}")
-            return {
-                "budget_score": 0,
-                "authority_score": 0,
-                "need_score": 0,
-                "timeline_score": 0,
-                "reasoning": f"Erro na análise: {str(e)}",
-                "overall_score": 0,
-                "tier": "cold"
-            }
+        result = self.cached_model_result(lead, prompt, self.cascade_model, "qualification_cascade")
+        if result is not None and not self.needs_escalation(result):
+            return result
+        return None
+
+    def split_cached_leads(self, leads: List[Dict[str, Any]]) -> Tuple[Dict[str, Dict[str, Any]], List[Dict[str, Any]]]:
+        """Separa os leads já presentes no cache dos que precisam ser enviados ao LLM."""
+        if self.cache is None:
+            return {}, list(leads)
+
+        cached_results = {}
+        pending = []
+
+        for lead in leads:
+            result = self.cached_qualification(lead)
+            if result is not None:
+                cached_results[str(lead["id"])] = result
+            else:
+                pending.append(lead)
+
+        return cached_results, pending
+
+    def store_batch_results(self, leads: List[Dict[str, Any]], results: Dict[str, Dict[str, Any]]):
+        """Armazena no cache, por lead e sob a chave do lote, os resultados válidos obtidos em lote."""
+        if self.cache is None:
+            return
+
+        for lead in leads:
+            result = results.get(str(lead["id"]))
+            if result is not None:
+                content = json.dumps({
+                    "budget": result["budget_score"],
+                    "authority": result["authority_score"],
+                    "need": result["need_score"],
+                    "timeline": result["timeline_score"],
+                    "reasoning": result["reasoning"]
+                })
+                self.cache.set(self.batch_cache_key(lead, self.batch_model), content)
+
+    def complete_batch(self, pending: List[Dict[str, Any]], content: str) -> Tuple[Dict[str, Dict[str, Any]],
+                                                                                   List[Dict[str, Any]]]:
+        """Analisa a resposta em lote e retorna os resultados aceitos e os leads a requalificar individualmente.
+
+        Sem cascata, requalificam-se os leads ausentes ou malformados; na cascata, também os que ficaram
+        perto de um limiar de categoria, que seguem direto para o LLM_MODEL.
+        """
+        batch_results = self.parse_batch_response(content, [str(lead["id"]) for lead in pending])
+        if len(batch_results) < len(pending):
+            METRICS.record_parse_failure("qualification_batch", len(pending) - len(batch_results))
+        self.store_batch_results(pending, batch_results)
+
+        if not self.cascade:
+            return batch_results, [lead for lead in pending if str(lead["id"]) not in batch_results]
+
+        accepted, escalated = {}, []
+        for lead in pending:
+            result = batch_results.get(str(lead["id"]))
+            if result is not None:
+                result["model"] = self.cascade_model
+            result = self.screen_result(result)
+            if result is None:
+                escalated.append(lead)
+            else:
+                accepted[str(lead["id"])] = result
+        return accepted, escalated
+
+    def qualify_leads_batch(self, leads: List[Dict[str, Any]], retry_policy: Optional[RetryPolicy] = None
+                            ) -> List[Union[Dict[str, Any], LeadFailure]]:
+        """Qualifica vários leads em uma única requisição.
+
+        Só os leads ausentes ou malformados na resposta (ou todos os pendentes, se a requisição em lote
+        falhar) são requalificados individualmente, com novas tentativas (retry_policy). Um lead que
+        falha definitivamente fica com o LeadFailure na posição do resultado, sem afetar os demais.
+        """
+        retry_policy = retry_policy or RetryPolicy()
+        results, pending = self.split_cached_leads(leads)
+
+        if pending:
+            try:
+                llm = get_chat_model(self.batch_model, self.temperature)
+                response = timed_invoke(llm, self.build_batch_prompt(pending), "qualification_batch")
+            except Exception as e:
+                print(f"Erro na qualificação em lote, requalificando os leads individualmente: {e}")
+                retry = pending
+            else:
+                batch_results, retry = self.complete_batch(pending, response.content)
+                results.update(batch_results)
+
+            for lead in retry:
+                try:
+                    results[str(lead["id"])] = retry_policy.call(lambda: self.qualify_retried_lead(lead),
+                                                                 "qualification")
+                except LeadFailure as e:
+                    results[str(lead["id"])] = e
+
+        return [results[str(lead["id"])] for lead in leads]
+
+    async def aqualify_leads_batch(self, leads: List[Dict[str, Any]],
+                                   rate_limiter: Optional[AsyncRateLimiter] = None,
+                                   retry_policy: Optional[RetryPolicy] = None
+                                   ) -> List[Union[Dict[str, Any], LeadFailure]]:
+        """Versão assíncrona de qualify_leads_batch, respeitando o limitador de taxa."""
+        retry_policy = retry_policy or RetryPolicy()
+        results, pending = self.split_cached_leads(leads)
+
+        if pending:
+            try:
+                prompt = self.build_batch_prompt(pending)
+                queue_wait = await timed_acquire(
+                    rate_limiter, estimate_tokens(prompt) + ESTIMATED_COMPLETION_TOKENS * len(pending)
+                )
+
+                llm = get_chat_model(self.batch_model, self.temperature)
+                response = await timed_ainvoke(llm, prompt, "qualification_batch", queue_wait)
+            except Exception as e:
+                print(f"Erro na qualificação em lote, requalificando os leads individualmente: {e}")
+                retry = pending
+            else:
+                batch_results, retry = self.complete_batch(pending, response.content)
+                results.update(batch_results)
+
+            for lead in retry:
+                try:
+                    results[str(lead["id"])] = await retry_policy.acall(
+                        lambda: self.aqualify_retried_lead(lead, rate_limiter), "qualification"
+                    )
+                except LeadFailure as e:
+                    results[str(lead["id"])] = e
+
+        return [results[str(lead["id"])] for lead in leads]
+
+    def qualify_retried_lead(self, lead: Dict[str, Any]) -> Dict[str, Any]:
+        """Requalifica sozinho um lead que ficou sem resultado no lote (na cascata, direto no LLM_MODEL)."""
+        lead_info = self.lead_info(lead)
+        if self.cascade:
+            return self.qualify_prompt(self.build_prompt(lead_info))
+        return self.qualify_lead(lead_info)
+
+    async def aqualify_retried_lead(self, lead: Dict[str, Any],
+                                    rate_limiter: Optional[AsyncRateLimiter] = None) -> Dict[str, Any]:
+        """Versão assíncrona de qualify_retried_lead."""
+        lead_info = self.lead_info(lead)
+        if self.cascade:
+            return await self.aqualify_prompt(self.build_prompt(lead_info), rate_limiter)
+        return await self.aqualify_lead(lead_info, rate_limiter)
 
     def check_qualification_thresholds(self, scores: Dict[str, float]) -> List[str]:
         """Verifica quais critérios não atingiram o limiar mínimo."""
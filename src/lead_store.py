@@ -0,0 +1,100 @@
+import sys
+from dataclasses import dataclass, fields
+from typing import Dict, Any, Iterable, Optional, Tuple
+
+from src.lead_processor import LeadProcessor
+
+# Campos categóricos com poucos valores distintos; internar as strings faz todos os leads
+# compartilharem o mesmo objeto em vez de manter uma cópia por lead.
+INTERNED_FIELDS = ("source", "company_size", "industry", "position", "timeline")
+
+_formatter = LeadProcessor()
+
+
+@dataclass(slots=True)
+class LeadRecord:
+    """Lead normalizado em formato compacto (__slots__), guardado uma única vez por execução.
+
+    Mantém o acesso por chave (lead["name"], lead.get("needs")) usado pelo restante do sistema.
+    O texto formatado para o LLM (formatted_info) é gerado sob demanda em vez de armazenado.
+    """
+
+    id: Any
+    name: str
+    company: str
+    position: str
+    email: str
+    phone: str
+    source: str
+    last_interaction: str
+    interactions: Tuple[str, ...]
+    company_size: str
+    industry: str
+    budget_info: str
+    decision_maker: bool
+    needs: str
+    timeline: str
+    additional_notes: str
+    fingerprint: str = ""
+
+    @classmethod
+    def from_normalized(cls, normalized_lead: Dict[str, Any], fingerprint: str = "") -> "LeadRecord":
+        """Cria o registro a partir de um lead normalizado (LeadProcessor.normalize_lead_data)."""
+        values = {name: normalized_lead.get(name, "") for name in _FIELD_NAMES}
+        values["interactions"] = tuple(values["interactions"] or ())
+        for name in INTERNED_FIELDS:
+            if isinstance(values[name], str):
+                values[name] = sys.intern(values[name])
+        values["fingerprint"] = fingerprint or normalized_lead.get("fingerprint", "")
+        return cls(**values)
+
+    @property
+    def formatted_info(self) -> str:
+        """Informações do lead formatadas para análise pelo LLM."""
+        return _formatter.format_lead_for_analysis(self)
+
+    def __getitem__(self, key: str) -> Any:
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def __contains__(self, key: str) -> bool:
+        return key == "formatted_info" or key in _FIELD_NAMES
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Retorna o valor de um campo, ou default se ele não existir."""
+        return getattr(self, key, default)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Converte o registro em dicionário (com interactions como lista)."""
+        result = {name: getattr(self, name) for name in _FIELD_NAMES}
+        result["interactions"] = list(self.interactions)
+        return result
+
+
+_FIELD_NAMES = tuple(field.name for field in fields(LeadRecord))
+
+
+class LeadTable(list):
+    """Tabela dos leads normalizados de uma execução, em ordem de chegada e indexada por id.
+
+    É uma lista de LeadRecord com um índice auxiliar de id para posição; as etapas seguintes
+    guardam referências aos mesmos registros.
+    """
+
+    def __init__(self, records: Iterable[LeadRecord] = ()):
+        super().__init__()
+        self._index: Dict[str, int] = {}
+        for record in records:
+            self.append(record)
+
+    def append(self, record: LeadRecord):
+        """Adiciona um registro à tabela, indexando-o pelo id."""
+        self._index[str(record.id)] = len(self)
+        super().append(record)
+
+    def get_lead(self, lead_id: Any) -> Optional[LeadRecord]:
+        """Retorna o registro do lead com o id informado, se existir."""
+        position = self._index.get(str(lead_id))
+        return None if position is None else self[position]
@@ -0,0 +1,130 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Any, Optional
+
+from config import CACHE_PATH, CACHE_TTL_SECONDS, CACHE_MAX_ENTRIES
+
+
+class LLMCache:
+    """Cache persistente em SQLite para respostas do LLM, endereçado pelo conteúdo do prompt.
+
+    As entradas expiram após o TTL e, ao ultrapassar o limite de tamanho, as menos
+    acessadas recentemente são removidas (LRU).
+    """
+
+    def __init__(self, path: str = CACHE_PATH, ttl_seconds: Optional[float] = CACHE_TTL_SECONDS,
+                 max_entries: Optional[int] = CACHE_MAX_ENTRIES):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # timeout e WAL: shards em processos separados compartilham o mesmo arquivo de cache
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=60)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS llm_cache (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_last_access ON llm_cache (last_access)")
+        self._conn.commit()
+        self._count = self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+
+    @staticmethod
+    def make_key(prompt: str, model: str, temperature: float, template_version: str) -> str:
+        """Gera a chave do cache a partir do prompt renderizado e dos parâmetros do modelo."""
+        payload = "\x1f".join([model, repr(float(temperature)), template_version, prompt])
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """Retorna a resposta armazenada para a chave, ou None se ausente ou expirada."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created_at FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+
+            if row is None:
+                self.misses += 1
+                return None
+
+            value, created_at = row
+            if self.ttl_seconds is not None and now - created_at > self.ttl_seconds:
+                self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                self._conn.commit()
+                self._count -= 1
+                self.misses += 1
+                return None
+
+            self._conn.execute("UPDATE llm_cache SET last_access = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+            return value
+
+    def set(self, key: str, value: str):
+        """Armazena uma resposta no cache, aplicando o limite de tamanho."""
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT OR IGNORE INTO llm_cache (key, value, created_at, last_access) VALUES (?, ?, ?, ?)",
+                (key, value, now, now)
+            )
+            if cursor.rowcount:
+                self._count += 1
+            else:
+                self._conn.execute(
+                    "UPDATE llm_cache SET value = ?, created_at = ?, last_access = ? WHERE key = ?",
+                    (value, now, now, key)
+                )
+
+            if self.max_entries is not None and self._count > self.max_entries:
+                excess = self._count - self.max_entries
+                self._conn.execute(
+                    "DELETE FROM llm_cache WHERE key IN "
+                    "(SELECT key FROM llm_cache ORDER BY last_access ASC LIMIT ?)",
+                    (excess,)
+                )
+                self._count -= excess
+
+            self._conn.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        """Retorna os contadores de acertos e falhas do cache."""
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 2) if total else 0.0,
+            "entries": self._count
+        }
+
+    def close(self):
+        """Fecha a conexão com o banco de dados do cache."""
+        with self._lock:
+            self._conn.close()
+
+
+_caches: Dict[str, LLMCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_llm_cache(path: str = CACHE_PATH) -> LLMCache:
+    """Retorna a instância compartilhada do cache para o caminho informado."""
+    with _caches_lock:
+        if path not in _caches:
+            _caches[path] = LLMCache(path)
+        return _caches[path]
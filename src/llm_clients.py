@@ -0,0 +1,48 @@
+import asyncio
+import threading
+from typing import Dict, Any, Optional, Tuple
+
+from langchain_openai import ChatOpenAI
+
+import config
+
+# Clientes compartilhados por (modelo, temperatura, event loop). Cada ChatOpenAI mantém seus
+# próprios pools de conexões HTTP keep-alive; reutilizá-lo evita recriar o cliente e refazer o
+# handshake TLS a cada nó ou execução. O pool assíncrono fica preso ao event loop em que foi
+# usado, por isso o uso assíncrono tem uma instância por loop (a de uso síncrono usa loop None).
+_clients: Dict[Tuple[str, float, Optional[int]], Tuple[Any, Optional[asyncio.AbstractEventLoop]]] = {}
+_clients_lock = threading.Lock()
+
+
+def _running_loop() -> Optional[asyncio.AbstractEventLoop]:
+    """Retorna o event loop em execução na thread atual, se houver."""
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+
+def get_chat_model(model: str, temperature: float) -> Any:
+    """Retorna o cliente de chat compartilhado para o modelo e a temperatura informados."""
+    loop = _running_loop()
+    key = (model, temperature, id(loop) if loop is not None else None)
+
+    with _clients_lock:
+        entry = _clients.get(key)
+        if entry is None or entry[1] is not loop:
+            # Descarta clientes de event loops já encerrados antes de criar o novo
+            for stale_key in [k for k, (_, l) in _clients.items() if l is not None and l.is_closed()]:
+                del _clients[stale_key]
+
+            # As novas tentativas ficam a cargo da RetryPolicy (por lead, com métricas), e não do cliente
+            client = ChatOpenAI(api_key=config.OPENAI_API_KEY, model=model, temperature=temperature, max_retries=0)
+            entry = (client, loop)
+            _clients[key] = entry
+
+        return entry[0]
+
+
+def reset_chat_models():
+    """Descarta todos os clientes compartilhados (usado ao trocar a implementação do modelo)."""
+    with _clients_lock:
+        _clients.clear()
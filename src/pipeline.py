@@ -0,0 +1,120 @@
+import cProfile
+import queue
+import threading
+from typing import Any, Callable, Iterable, List, Optional, Tuple
+
+from src.instrumentation import save_profile
+
+_SENTINEL = object()
+
+
+class StagedPipeline:
+    """Pipeline em etapas com filas limitadas entre elas.
+
+    Cada item percorre as etapas de forma independente: assim que um item termina uma etapa,
+    ele segue para a próxima, sem esperar pelos demais. Cada etapa tem seu próprio número de
+    threads de trabalho, e o tamanho das filas limita a memória usada por itens em trânsito.
+    Com profile_dir, cada thread de trabalho é perfilada e o perfil de cada etapa (somando suas
+    threads) é gravado em <profile_dir>/pipeline_<etapa>.prof.
+    """
+
+    def __init__(self, stages: List[Tuple[str, Callable[[Any], Any], int]], queue_size: int = 100,
+                 profile_dir: Optional[str] = None):
+        self.stages = stages
+        self.queue_size = queue_size
+        self.profile_dir = profile_dir
+
+    def run(self, items: Iterable[Any], on_result: Optional[Callable[[Any], None]] = None) -> List[Any]:
+        """Processa os itens e retorna os resultados na ordem em que foram concluídos."""
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in range(len(self.stages) + 1)]
+        stop = threading.Event()
+        errors = []
+        threads = []
+
+        def feed():
+            try:
+                for item in items:
+                    if stop.is_set():
+                        break
+                    queues[0].put(item)
+            except Exception as e:
+                errors.append(e)
+                stop.set()
+            finally:
+                for _ in range(self.stages[0][2]):
+                    queues[0].put(_SENTINEL)
+
+        def make_worker(stage_index: int, function: Callable[[Any], Any], finished: List[int], lock: threading.Lock):
+            def work():
+                profiler = cProfile.Profile() if self.profile_dir else None
+                if profiler is not None:
+                    profiler.enable()
+                try:
+                    process_items()
+                finally:
+                    if profiler is not None:
+                        profiler.disable()
+                        save_profile(self.profile_dir, f"pipeline_{self.stages[stage_index][0]}", profiler)
+
+            def process_items():
+                input_queue = queues[stage_index]
+                output_queue = queues[stage_index + 1]
+                while True:
+                    item = input_queue.get()
+                    if item is _SENTINEL:
+                        break
+                    if stop.is_set():
+                        continue
+                    try:
+                        output_queue.put(function(item))
+                    except Exception as e:
+                        errors.append(e)
+                        stop.set()
+
+                with lock:
+                    finished[0] += 1
+                    last_worker = finished[0] == self.stages[stage_index][2]
+
+                if last_worker:
+                    next_workers = self.stages[stage_index + 1][2] if stage_index + 1 < len(self.stages) else 1
+                    for _ in range(next_workers):
+                        output_queue.put(_SENTINEL)
+
+            return work
+
+        threads.append(threading.Thread(target=feed, daemon=True))
+        for stage_index, (name, function, workers) in enumerate(self.stages):
+            finished = [0]
+            lock = threading.Lock()
+            for worker_index in range(workers):
+                threads.append(threading.Thread(
+                    target=make_worker(stage_index, function, finished, lock),
+                    name=f"{name}-{worker_index}",
+                    daemon=True
+                ))
+
+        for thread in threads:
+            thread.start()
+
+        results = []
+        while True:
+            result = queues[-1].get()
+            if result is _SENTINEL:
+                break
+            if stop.is_set():
+                continue
+            results.append(result)
+            if on_result is not None:
+                try:
+                    on_result(result)
+                except Exception as e:
+                    errors.append(e)
+                    stop.set()
+
+        for thread in threads:
+            thread.join()
+
+        if errors:
+            raise errors[0]
+
+        return results
@@ -0,0 +1,179 @@
+import dataclasses
+import datetime
+import heapq
+import itertools
+import threading
+from typing import Dict, Any, List, Optional, Tuple
+
+from src.lead_prioritizer import LeadPrioritizer
+
+# O heap é reconstruído quando as entradas obsoletas passam de RANKING_COMPACT_FACTOR vezes as válidas
+RANKING_COMPACT_FACTOR = 2
+RANKING_COMPACT_MIN_SIZE = 1024
+
+
+class RankingIndex:
+    """Fila de prioridade online dos leads qualificados, para exibir a fila de vendas ao vivo.
+
+    Inserir, atualizar ou remover um lead custa O(log n) e consultar os K primeiros, O(K log n),
+    sem repriorizar os demais. As pontuações usam uma data de referência fixa (reference_date),
+    de modo que o ranking não muda sozinho entre consultas; advance_to avança a data e reprioriza
+    apenas os leads cuja faixa de recência (LeadPrioritizer.recency_bucket) virou.
+
+    Remoções e atualizações são preguiçosas: a entrada anterior continua no heap e é descartada
+    quando chega ao topo (ou quando o heap é compactado).
+    """
+
+    def __init__(self, prioritizer: Optional[LeadPrioritizer] = None,
+                 reference_date: Optional[datetime.datetime] = None):
+        self.prioritizer = prioritizer or LeadPrioritizer()
+        self.reference_date = reference_date or datetime.datetime.now()
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._versions: Dict[str, int] = {}
+        # Ordem da primeira inserção: desempata como a ordenação estável de prioritize_leads
+        self._order: Dict[str, int] = {}
+        self._heap: List[Tuple[float, int, int, str]] = []
+        self._rollovers: List[Tuple[datetime.datetime, int, str]] = []
+        self._counter = itertools.count()
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, lead_id: Any) -> bool:
+        return str(lead_id) in self._entries
+
+    def get(self, lead_id: Any) -> Optional[Dict[str, Any]]:
+        """Lead priorizado ({"lead", "qualification", "prioritization"}) com o id informado."""
+        return self._entries.get(str(lead_id))
+
+    def upsert(self, lead_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Insere ou atualiza um lead qualificado ({"lead", "qualification"}), repriorizando só ele."""
+        lead, qualification = lead_data["lead"], lead_data["qualification"]
+        entry = {
+            "lead": lead,
+            "qualification": qualification,
+            "prioritization": self.prioritizer.prioritize_lead(lead, qualification, self.reference_date)
+        }
+        lead_id = str(lead["id"])
+
+        with self._lock:
+            version = self._versions.get(lead_id, 0) + 1
+            order = self._order.setdefault(lead_id, next(self._counter))
+            self._versions[lead_id] = version
+            self._entries[lead_id] = entry
+
+            heapq.heappush(self._heap, (-entry["prioritization"]["priority_score"], order, version, lead_id))
+            rollover = self.next_rollover(lead)
+            if rollover is not None:
+                heapq.heappush(self._rollovers, (rollover, version, lead_id))
+            self._maybe_compact()
+
+        return entry
+
+    def remove(self, lead_id: Any) -> bool:
+        """Remove um lead da fila; retorna False se ele não estava nela."""
+        lead_id = str(lead_id)
+        with self._lock:
+            if self._entries.pop(lead_id, None) is None:
+                return False
+            self._versions[lead_id] += 1
+            self._order.pop(lead_id, None)
+            self._maybe_compact()
+            return True
+
+    def record_interaction(self, lead_id: Any, interaction: str, date: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Acrescenta uma interação ao lead (com a data no formato AAAA-MM-DD) e o reprioriza.
+        Uma data fora desse formato gera ValueError, pois quebraria a comparação com last_interaction.
+        """
+        if date is not None:
+            try:
+                date = datetime.date.fromisoformat(date).isoformat()
+            except TypeError:
+                raise ValueError(f"Data da interação inválida: {date!r}")
+        with self._lock:
+            entry = self._entries.get(str(lead_id))
+            if entry is None:
+                return None
+
+            lead = entry["lead"]
+            last_interaction = max(lead.get("last_interaction") or "", date or "")
+            if isinstance(lead, dict):
+                lead = {**lead, "interactions": [*lead.get("interactions", []), interaction],
+                        "last_interaction": last_interaction}
+            else:
+                lead = dataclasses.replace(lead, interactions=(*lead.interactions, interaction),
+                                           last_interaction=last_interaction)
+            return self.upsert({"lead": lead, "qualification": entry["qualification"]})
+
+    def top_k(self, k: int) -> List[Dict[str, Any]]:
+        """Os K leads mais prioritários, em ordem; as entradas obsoletas encontradas são descartadas."""
+        with self._lock:
+            result, popped = [], []
+            while self._heap and len(result) < k:
+                item = heapq.heappop(self._heap)
+                if self._is_current(item[3], item[2]):
+                    popped.append(item)
+                    result.append(self._entries[item[3]])
+            for item in popped:
+                heapq.heappush(self._heap, item)
+            return result
+
+    def advance_to(self, reference_date: Optional[datetime.datetime] = None) -> int:
+        """Avança a data de referência, repriorizando só os leads cuja faixa de recência virou.
+
+        Retorna a quantidade de leads repriorizados.
+        """
+        with self._lock:
+            reference_date = reference_date or datetime.datetime.now()
+            if reference_date < self.reference_date:
+                raise ValueError("A data de referência do ranking não pode retroceder")
+            self.reference_date = reference_date
+
+            due = []
+            while self._rollovers and self._rollovers[0][0] <= reference_date:
+                _, version, lead_id = heapq.heappop(self._rollovers)
+                if self._is_current(lead_id, version):
+                    due.append(lead_id)
+
+            for lead_id in due:
+                entry = self._entries[lead_id]
+                self.upsert({"lead": entry["lead"], "qualification": entry["qualification"]})
+            return len(due)
+
+    def next_rollover(self, lead: Any) -> Optional[datetime.datetime]:
+        """Data a partir da qual a recência do lead muda de faixa (None se não muda mais)."""
+        try:
+            last_date = datetime.datetime.strptime(lead.get("last_interaction", ""), "%Y-%m-%d")
+        except (TypeError, ValueError):
+            return None
+
+        days = self.prioritizer.recency_rollover_days((self.reference_date - last_date).days)
+        return None if days is None else last_date + datetime.timedelta(days=days)
+
+    def _is_current(self, lead_id: str, version: int) -> bool:
+        return lead_id in self._entries and self._versions[lead_id] == version
+
+    def _maybe_compact(self):
+        """Reconstrói os heaps sem as entradas obsoletas quando elas predominam."""
+        live = len(self._entries)
+        if len(self._heap) <= max(RANKING_COMPACT_MIN_SIZE, RANKING_COMPACT_FACTOR * live):
+            return
+
+        self._heap = [item for item in self._heap if self._is_current(item[3], item[2])]
+        heapq.heapify(self._heap)
+        self._rollovers = [item for item in self._rollovers if self._is_current(item[2], item[1])]
+        heapq.heapify(self._rollovers)
+
+
+def ranking_record(entry: Dict[str, Any]) -> Dict[str, Any]:
+    """Registro serializável de um lead da fila (no formato de resultados_leads.json, sem a abordagem)."""
+    lead = entry["lead"]
+    return {
+        "id": lead["id"],
+        "name": lead["name"],
+        "company": lead["company"],
+        "qualification": entry["qualification"],
+        "prioritization": entry["prioritization"]
+    }
@@ -0,0 +1,58 @@
+import json
+from typing import Dict, Any
+
+
+class JsonlResultWriter:
+    """Escreve resultados de leads em JSONL, um registro por linha, assim que ficam prontos."""
+
+    def __init__(self, file_path: str, append: bool = False):
+        self.file_path = file_path
+        self.count = 0
+        self._file = open(file_path, 'a' if append else 'w')
+
+    def write(self, record: Dict[str, Any]):
+        """Acrescenta um registro ao arquivo e o descarrega imediatamente."""
+        self._file.write(json.dumps(record) + "\n")
+        self._file.flush()
+        self.count += 1
+
+    def close(self):
+        """Fecha o arquivo de saída."""
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class JsonResultWriter:
+    """Escreve resultados no formato de resultados_leads.json sem montar a lista inteira em memória.
+
+    A saída é idêntica à de json.dump(..., indent=2) sobre {"prioritized_leads": [...]}.
+    """
+
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+        self.count = 0
+        self._file = open(file_path, 'w')
+        self._file.write('{\n  "prioritized_leads": [')
+
+    def write(self, record: Dict[str, Any]):
+        """Acrescenta um registro ao array de leads priorizados."""
+        separator = "," if self.count else ""
+        body = json.dumps(record, indent=2).replace("\n", "\n    ")
+        self._file.write(f"{separator}\n    {body}")
+        self.count += 1
+
+    def close(self):
+        """Finaliza o documento JSON e fecha o arquivo."""
+        self._file.write("\n  ]\n}" if self.count else "]\n}")
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -0,0 +1,208 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+
+from config import RESULTS_STORE_BATCH_SIZE, RESULTS_QUERY_LIMIT
+from src.result_writer import JsonResultWriter
+
+# Colunas de filtro aceitas por query/count, com a coluna correspondente na tabela
+FILTER_COLUMNS = {
+    "tier": "tier",
+    "priority_level": "priority_level",
+    "industry": "industry",
+    "run_id": "run_id"
+}
+
+
+class ResultsStore:
+    """Armazena os resultados por lead em SQLite, indexados para consultas de dashboards.
+
+    Cada lead tem uma linha (upsert pelo id) com as colunas de filtro e ordenação indexadas e o
+    registro completo (formato de resultados_leads.json) em JSON. Consultas como "top 50 leads hot
+    de uma indústria" percorrem o índice e leem apenas as linhas retornadas.
+    """
+
+    def __init__(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.path = path
+        self._lock = threading.Lock()
+        # timeout: shards em processos separados podem gravar no mesmo arquivo
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=60, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS lead_results (
+                id TEXT PRIMARY KEY,
+                run_id TEXT NOT NULL,
+                name TEXT,
+                company TEXT,
+                industry TEXT,
+                tier TEXT,
+                overall_score REAL,
+                priority_score REAL NOT NULL,
+                priority_level TEXT,
+                record TEXT NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_lead_results_priority ON lead_results (priority_score DESC);
+            CREATE INDEX IF NOT EXISTS idx_lead_results_tier ON lead_results (tier, priority_score DESC);
+            CREATE INDEX IF NOT EXISTS idx_lead_results_level ON lead_results (priority_level, priority_score DESC);
+            CREATE INDEX IF NOT EXISTS idx_lead_results_industry
+                ON lead_results (industry, tier, priority_score DESC);
+            CREATE INDEX IF NOT EXISTS idx_lead_results_run ON lead_results (run_id, priority_score DESC);
+            """
+        )
+
+    def upsert(self, rows: List[Tuple[Dict[str, Any], str]], run_id: str):
+        """Grava (registro, indústria) em uma única transação, substituindo os leads já existentes."""
+        if not rows:
+            return
+        now = time.time()
+        params = [
+            (
+                str(record["id"]), run_id, record.get("name"), record.get("company"), industry,
+                record["qualification"].get("tier"), record["qualification"].get("overall_score"),
+                record["prioritization"]["priority_score"], record["prioritization"].get("priority_level"),
+                json.dumps(record), now
+            )
+            for record, industry in rows
+        ]
+
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.executemany(
+                    """
+                    INSERT INTO lead_results (id, run_id, name, company, industry, tier, overall_score,
+                                              priority_score, priority_level, record, updated_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT (id) DO UPDATE SET
+                        run_id = excluded.run_id, name = excluded.name, company = excluded.company,
+                        industry = excluded.industry, tier = excluded.tier, overall_score = excluded.overall_score,
+                        priority_score = excluded.priority_score, priority_level = excluded.priority_level,
+                        record = excluded.record, updated_at = excluded.updated_at
+                    """,
+                    params
+                )
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    @staticmethod
+    def _where(filters: Dict[str, Any], min_score: Optional[float]) -> Tuple[str, List[Any]]:
+        """Monta a cláusula WHERE para os filtros informados (valores None são ignorados)."""
+        clauses, params = [], []
+        for name, value in filters.items():
+            if name not in FILTER_COLUMNS:
+                raise ValueError(f"Filtro desconhecido: {name}")
+            if value is not None:
+                clauses.append(f"{FILTER_COLUMNS[name]} = ?")
+                params.append(value)
+        if min_score is not None:
+            clauses.append("priority_score >= ?")
+            params.append(min_score)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def query(self, limit: Optional[int] = RESULTS_QUERY_LIMIT, offset: int = 0, min_score: Optional[float] = None,
+              **filters: Any) -> List[Dict[str, Any]]:
+        """Retorna os registros que atendem aos filtros, do mais para o menos prioritário.
+
+        Filtros aceitos: tier, priority_level, industry e run_id (igualdade).
+        """
+        return list(self.iter_query(limit, offset, min_score, **filters))
+
+    def iter_query(self, limit: Optional[int] = None, offset: int = 0, min_score: Optional[float] = None,
+                   **filters: Any) -> Iterable[Dict[str, Any]]:
+        """Versão sob demanda de query, sem montar a lista de resultados em memória."""
+        where, params = self._where(filters, min_score)
+        sql = f"SELECT record FROM lead_results{where} ORDER BY priority_score DESC, id"
+        if limit is not None:
+            sql += " LIMIT ? OFFSET ?"
+            params += [limit, offset]
+
+        with self._lock:
+            rows = self._conn.execute(sql, params)
+            batch = rows.fetchmany(RESULTS_STORE_BATCH_SIZE)
+        while batch:
+            for (record,) in batch:
+                yield json.loads(record)
+            with self._lock:
+                batch = rows.fetchmany(RESULTS_STORE_BATCH_SIZE)
+
+    def count(self, min_score: Optional[float] = None, **filters: Any) -> int:
+        """Quantidade de leads que atendem aos filtros."""
+        where, params = self._where(filters, min_score)
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM lead_results{where}", params).fetchone()[0]
+
+    def get(self, lead_id: Any) -> Optional[Dict[str, Any]]:
+        """Retorna o registro de um lead pelo id, ou None se ele não existir."""
+        with self._lock:
+            row = self._conn.execute("SELECT record FROM lead_results WHERE id = ?", (str(lead_id),)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def export_json(self, output_file: str, min_score: Optional[float] = None, **filters: Any) -> int:
+        """Exporta os registros filtrados no formato de resultados_leads.json, em fluxo."""
+        with JsonResultWriter(output_file) as writer:
+            for record in self.iter_query(None, 0, min_score, **filters):
+                writer.write(record)
+        return writer.count
+
+    def close(self):
+        """Fecha a conexão com o banco."""
+        with self._lock:
+            self._conn.close()
+
+
+class ResultsStoreWriter:
+    """Grava registros no ResultsStore em lotes transacionais de batch_size, com a interface dos writers."""
+
+    def __init__(self, store: ResultsStore, run_id: str, batch_size: int = RESULTS_STORE_BATCH_SIZE):
+        self.store = store
+        self.run_id = run_id
+        self.batch_size = batch_size
+        self.count = 0
+        self._pending: List[Tuple[Dict[str, Any], str]] = []
+
+    def write(self, record: Dict[str, Any], industry: str = ""):
+        """Acrescenta um registro; o lote é gravado ao atingir batch_size."""
+        self._pending.append((record, industry))
+        self.count += 1
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """Grava o lote pendente em uma transação."""
+        self.store.upsert(self._pending, self.run_id)
+        self._pending = []
+
+    def close(self):
+        """Grava o último lote."""
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+
+
+_stores: Dict[str, ResultsStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_results_store(path: str) -> ResultsStore:
+    """Retorna o ResultsStore compartilhado para o caminho informado."""
+    with _stores_lock:
+        if path not in _stores:
+            _stores[path] = ResultsStore(path)
+        return _stores[path]
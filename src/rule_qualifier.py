@@ -0,0 +1,195 @@
+import re
+from typing import Dict, Any, List, Optional, Tuple
+
+from config import QUALIFICATION_CRITERIA, LEAD_TIERS, PREQUALIFIER_MIN_CONFIDENCE, PREQUALIFIER_TIER_MARGIN
+
+# Padrões compilados uma única vez; os textos são comparados em minúsculas
+MONEY_PATTERN = re.compile(r"(?:r\$|us\$|\$)\s*(\d{1,3}(?:[.\s]\d{3})+|\d+)(,\d+)?\s*(mil\b|milh[õo]es\b|milh[ãa]o\b|k\b)?")
+BUDGET_APPROVED_PATTERN = re.compile(r"aprovad|disponibiliz|reservad|alocad|liberad")
+BUDGET_NEGATIVE_PATTERN = re.compile(r"restri[çc]|sem or[çc]amento|n[ãa]o (?:h[áa]|tem|possui) or[çc]amento|cortes?\b|congelad")
+MONTHS_PATTERN = re.compile(r"(\d+)\s*(?:-|a|ou)?\s*(\d+)?\s*(mes(?:es)?|m[êe]s|semanas?|dias?)\b")
+QUARTER_PATTERN = re.compile(r"trimestre")
+URGENT_PATTERN = re.compile(r"imediat|urgente|o quanto antes|este m[êe]s")
+NO_TIMELINE_PATTERN = re.compile(r"sem prazo|indefinid|pr[óo]ximo ano|sem previs[ãa]o")
+EXECUTIVE_PATTERN = re.compile(r"\b(?:ceo|cto|cfo|coo|cio|presidente|fundador|s[óo]cio|diretor|diretora|vp|vice-presidente|head)\b")
+MANAGER_PATTERN = re.compile(r"\b(?:gerente|coordenador|coordenadora|supervisor|supervisora)\b")
+STAFF_PATTERN = re.compile(r"\b(?:analista|assistente|estagi[áa]ri[oa]|auxiliar|t[ée]cnic[oa])\b")
+QUANTIFIED_NEED_PATTERN = re.compile(r"\d+\s*%|\breduzir\b|\baumentar\b|\bautomatizar\b")
+
+Signal = Tuple[float, float, str]
+
+
+def bant_overall_score(scores: Dict[str, float]) -> float:
+    """Pontuação geral ponderada pelos pesos BANT de QUALIFICATION_CRITERIA."""
+    return sum(scores[criterion] * QUALIFICATION_CRITERIA[criterion]["weight"] for criterion in QUALIFICATION_CRITERIA)
+
+
+def bant_tier(overall_score: float) -> str:
+    """Categoria (LEAD_TIERS) correspondente à pontuação geral."""
+    for tier_name, threshold in sorted(LEAD_TIERS.items(), key=lambda x: x[1], reverse=True):
+        if overall_score >= threshold:
+            return tier_name
+    return "cold"
+
+
+def near_tier_boundary(overall_score: float, margin: float) -> bool:
+    """Indica se a pontuação está a menos de margin de algum limiar de LEAD_TIERS."""
+    return any(abs(overall_score - threshold) < margin for threshold in LEAD_TIERS.values())
+
+
+def parse_money(amount: str, decimals: Optional[str], multiplier: Optional[str]) -> float:
+    """Converte um valor monetário em texto (ex.: "250.000", "1,5 milhão") em número."""
+    value = float(re.sub(r"[.\s]", "", amount) + (decimals or "").replace(",", "."))
+    if multiplier:
+        if multiplier.startswith("milh"):
+            value *= 1_000_000
+        else:
+            value *= 1_000
+    return value
+
+
+class RuleBasedQualifier:
+    """Pré-qualificador local e determinístico baseado nos campos estruturados do lead.
+
+    Extrai sinais BANT com padrões compilados e estima uma confiança. Quando a confiança é alta e a
+    pontuação fica longe dos limiares de LEAD_TIERS, o lead pode dispensar a chamada ao LLM.
+    """
+
+    def __init__(self, min_confidence: float = PREQUALIFIER_MIN_CONFIDENCE,
+                 tier_margin: float = PREQUALIFIER_TIER_MARGIN):
+        self.min_confidence = min_confidence
+        self.tier_margin = tier_margin
+
+    def budget_signal(self, budget_info: str) -> Signal:
+        """Pontuação, confiança e justificativa do critério de orçamento."""
+        text = (budget_info or "").lower()
+        if not text.strip():
+            return 0.2, 0.5, "sem informação de orçamento"
+
+        if BUDGET_NEGATIVE_PATTERN.search(text):
+            return 0.2, 0.85, "restrição orçamentária declarada"
+
+        match = MONEY_PATTERN.search(text)
+        if match is None:
+            return 0.5, 0.3, "orçamento mencionado sem valor"
+
+        amount = parse_money(match.group(1), match.group(2), match.group(3))
+        approved = BUDGET_APPROVED_PATTERN.search(text) is not None
+        if amount >= 200_000:
+            score = 1.0
+        elif amount >= 50_000:
+            score = 0.8
+        elif amount >= 10_000:
+            score = 0.6
+        else:
+            score = 0.4
+        description = f"orçamento de {amount:,.0f}".replace(",", ".") + (" aprovado" if approved else "")
+        return score, 0.9 if approved else 0.7, description
+
+    def authority_signal(self, position: str, decision_maker: bool) -> Signal:
+        """Pontuação, confiança e justificativa do critério de autoridade."""
+        title = (position or "").lower()
+        executive = EXECUTIVE_PATTERN.search(title) is not None
+
+        if decision_maker:
+            return (1.0, 0.95, "tomador de decisão (cargo executivo)") if executive else \
+                (0.9, 0.85, "tomador de decisão")
+        if executive:
+            return 0.7, 0.6, "cargo executivo sem decisão declarada"
+        if MANAGER_PATTERN.search(title):
+            return 0.4, 0.8, "cargo de gestão sem poder de decisão"
+        if STAFF_PATTERN.search(title):
+            return 0.2, 0.85, "cargo operacional"
+        return 0.3, 0.5, "autoridade indefinida"
+
+    def need_signal(self, needs: str) -> Signal:
+        """Pontuação, confiança e justificativa do critério de necessidade."""
+        text = (needs or "").strip().lower()
+        if not text:
+            return 0.0, 0.9, "nenhuma necessidade informada"
+        if QUANTIFIED_NEED_PATTERN.search(text):
+            return 0.8, 0.7, "necessidade objetiva"
+        return 0.6, 0.5, "necessidade genérica"
+
+    def timeline_signal(self, timeline: str) -> Signal:
+        """Pontuação, confiança e justificativa do critério de prazo."""
+        text = (timeline or "").lower()
+        if not text.strip():
+            return 0.1, 0.6, "sem prazo informado"
+        if NO_TIMELINE_PATTERN.search(text):
+            return 0.2, 0.85, "sem prazo definido"
+        if URGENT_PATTERN.search(text):
+            return 1.0, 0.9, "prazo imediato"
+
+        months = None
+        match = MONTHS_PATTERN.search(text)
+        if match is not None:
+            amount = float(match.group(2) or match.group(1))
+            unit = match.group(3)
+            months = amount / 4.3 if unit.startswith("semana") else amount / 30 if unit.startswith("dia") else amount
+        elif QUARTER_PATTERN.search(text):
+            months = 3.0
+
+        if months is None:
+            return 0.5, 0.3, "prazo sem duração identificável"
+        if months <= 1:
+            score = 1.0
+        elif months <= 3:
+            score = 0.8
+        elif months <= 6:
+            score = 0.6
+        elif months <= 12:
+            score = 0.4
+        else:
+            score = 0.2
+        return score, 0.85, f"prazo de {months:g} meses"
+
+    def prequalify(self, lead: Dict[str, Any]) -> Dict[str, Any]:
+        """Calcula as pontuações BANT, a categoria e a confiança a partir dos campos do lead."""
+        signals = {
+            "budget": self.budget_signal(lead.get("budget_info", "")),
+            "authority": self.authority_signal(lead.get("position", ""), bool(lead.get("decision_maker"))),
+            "need": self.need_signal(lead.get("needs", "")),
+            "timeline": self.timeline_signal(lead.get("timeline", ""))
+        }
+        scores = {criterion: signal[0] for criterion, signal in signals.items()}
+        confidence = sum(
+            signals[criterion][1] * QUALIFICATION_CRITERIA[criterion]["weight"] for criterion in QUALIFICATION_CRITERIA
+        )
+        overall_score = bant_overall_score(scores)
+
+        return {
+            "budget_score": scores["budget"],
+            "authority_score": scores["authority"],
+            "need_score": scores["need"],
+            "timeline_score": scores["timeline"],
+            "reasoning": "Pré-qualificação por regras: " + "; ".join(
+                f"{criterion}: {signal[2]}" for criterion, signal in signals.items()
+            ),
+            "overall_score": round(overall_score, 2),
+            "tier": bant_tier(overall_score),
+            "method": "rules",
+            "confidence": round(confidence, 2)
+        }
+
+    def is_decisive(self, result: Dict[str, Any]) -> bool:
+        """Indica se o resultado é confiável o bastante para dispensar o LLM.
+
+        Exige confiança mínima e uma pontuação distante de todos os limiares de LEAD_TIERS, de modo
+        que um pequeno erro das regras não mudaria a categoria do lead.
+        """
+        if result["confidence"] < self.min_confidence:
+            return False
+        return not near_tier_boundary(result["overall_score"], self.tier_margin)
+
+    def split_decisive(self, leads: List[Dict[str, Any]]) -> Tuple[List[Tuple[Dict[str, Any], Dict[str, Any]]],
+                                                                     List[Dict[str, Any]]]:
+        """Separa os leads resolvidos pelas regras (com seus resultados) dos que ainda precisam do LLM."""
+        decided, pending = [], []
+        for lead in leads:
+            result = self.prequalify(lead)
+            if self.is_decisive(result):
+                decided.append((lead, result))
+            else:
+                pending.append(lead)
+        return decided, pending
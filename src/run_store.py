@@ -0,0 +1,124 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Dict, Any, Optional
+
+from config import CHECKPOINT_PATH
+
+
+class RunProgressStore:
+    """Armazena em SQLite o progresso por lead de cada execução, para retomada após falhas.
+
+    Cada resultado (qualificação ou abordagem) é gravado assim que fica pronto; uma execução
+    retomada consulta o que já foi feito e processa apenas os leads restantes.
+    """
+
+    def __init__(self, path: str = CHECKPOINT_PATH):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS runs (
+                run_id TEXT PRIMARY KEY,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                status TEXT NOT NULL,
+                input_file TEXT,
+                options TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS lead_progress (
+                run_id TEXT NOT NULL,
+                stage TEXT NOT NULL,
+                lead_id TEXT NOT NULL,
+                result TEXT NOT NULL,
+                PRIMARY KEY (run_id, stage, lead_id)
+            );
+            """
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def new_run_id() -> str:
+        """Gera um identificador para uma nova execução."""
+        return time.strftime("%Y%m%d-%H%M%S-") + uuid.uuid4().hex[:8]
+
+    def start_run(self, run_id: str, input_file: Optional[str], options: Dict[str, Any]) -> int:
+        """Registra o início (ou a retomada) de uma execução e retorna o número da tentativa."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO runs (run_id, created_at, updated_at, attempts, status, input_file, options) "
+                "VALUES (?, ?, ?, 0, 'running', ?, ?)",
+                (run_id, now, now, input_file, json.dumps(options, default=str))
+            )
+            self._conn.execute(
+                "UPDATE runs SET attempts = attempts + 1, status = 'running', updated_at = ? WHERE run_id = ?",
+                (now, run_id)
+            )
+            self._conn.commit()
+            return self._conn.execute("SELECT attempts FROM runs WHERE run_id = ?", (run_id,)).fetchone()[0]
+
+    def finish_run(self, run_id: str, status: str):
+        """Marca o status final de uma execução (completed ou failed)."""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE runs SET status = ?, updated_at = ? WHERE run_id = ?", (status, time.time(), run_id)
+            )
+            self._conn.commit()
+
+    def get_run(self, run_id: str) -> Optional[Dict[str, Any]]:
+        """Retorna os metadados de uma execução, ou None se ela não existir."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT run_id, attempts, status, input_file, options FROM runs WHERE run_id = ?", (run_id,)
+            ).fetchone()
+
+        if row is None:
+            return None
+
+        return {
+            "run_id": row[0],
+            "attempts": row[1],
+            "status": row[2],
+            "input_file": row[3],
+            "options": json.loads(row[4])
+        }
+
+    def save_result(self, run_id: str, stage: str, lead_id: str, result: Any):
+        """Grava de forma durável o resultado de um lead em uma etapa."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO lead_progress (run_id, stage, lead_id, result) VALUES (?, ?, ?, ?)",
+                (run_id, stage, str(lead_id), json.dumps(result))
+            )
+            self._conn.commit()
+
+    def load_results(self, run_id: str, stage: str) -> Dict[str, Any]:
+        """Carrega os resultados já concluídos de uma etapa, por id do lead."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT lead_id, result FROM lead_progress WHERE run_id = ? AND stage = ?", (run_id, stage)
+            ).fetchall()
+        return {lead_id: json.loads(result) for lead_id, result in rows}
+
+
+_stores: Dict[str, RunProgressStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_run_store(path: str = CHECKPOINT_PATH) -> RunProgressStore:
+    """Retorna a instância compartilhada do armazenamento de progresso para o caminho informado."""
+    with _stores_lock:
+        if path not in _stores:
+            _stores[path] = RunProgressStore(path)
+        return _stores[path]
+
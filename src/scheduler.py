@@ -0,0 +1,169 @@
+import datetime
+import os
+from typing import Dict, Any, List, Optional, Set
+
+from config import LLM_MODEL, LLM_PRICES_PER_MILLION_TOKENS, ESTIMATED_COMPLETION_TOKENS
+from src.concurrency import estimate_tokens
+from src.fault_tolerance import DeadLetterQueue
+from src.lead_prioritizer import LeadPrioritizer
+from src.rule_qualifier import RuleBasedQualifier, near_tier_boundary
+
+DEFERRED_SUFFIX = ".deferred.jsonl"
+
+
+def deferred_path_for(output_file: str) -> str:
+    """Caminho padrão do arquivo de leads adiados associado a um arquivo de saída."""
+    base, _ = os.path.splitext(output_file)
+    return base + DEFERRED_SUFFIX
+
+
+def scheduling_enabled(options: Optional[Dict[str, Any]]) -> bool:
+    """Indica se as opções definem orçamento de tokens/custo ou prazo para as qualificações."""
+    return any((options or {}).get(name) is not None for name in ("token_budget", "cost_budget", "deadline"))
+
+
+class DeferredLeadsQueue(DeadLetterQueue):
+    """Leads adiados pelo agendador, gravados em JSONL no formato de entrada (como a DeadLetterQueue).
+
+    Cada linha traz a chave "_deferred" com o motivo (budget ou deadline); o arquivo pode ser usado
+    como --input da próxima execução.
+    """
+
+    def add(self, lead: Dict[str, Any], failure: Dict[str, Any]):
+        entry = {key: value for key, value in lead.items() if key not in ("_deferred", "_dead_letter")}
+        entry["_deferred"] = {**failure, "deferred_at": datetime.datetime.now().isoformat(timespec="seconds")}
+        with self._lock:
+            self.entries.append(entry)
+
+
+def parse_deadline(value: Optional[str], now: Optional[datetime.datetime] = None) -> Optional[datetime.datetime]:
+    """Converte o prazo em data e hora: "HH:MM" (a próxima ocorrência desse horário) ou ISO 8601."""
+    if not value:
+        return None
+    now = now or datetime.datetime.now()
+    try:
+        clock = datetime.datetime.strptime(value, "%H:%M").time()
+    except ValueError:
+        return datetime.datetime.fromisoformat(value)
+
+    deadline = datetime.datetime.combine(now.date(), clock)
+    return deadline if deadline > now else deadline + datetime.timedelta(days=1)
+
+
+class QualificationScheduler:
+    """Define a ordem e o limite das qualificações pelo LLM em uma execução com orçamento ou prazo.
+
+    Os leads são ordenados pela prioridade estimada sem o LLM: a fórmula do LeadPrioritizer com a
+    pontuação geral das regras (RuleBasedQualifier, que considera o tomador de decisão, o cargo, o
+    orçamento e o prazo) no lugar da do LLM, mais a recência e o engajamento. Em seguida, são
+    despachados nessa ordem enquanto couberem no orçamento de tokens e de custo estimados; ao passar
+    do prazo, nenhum lead novo é despachado. Os leads que ficaram de fora são adiados (deferred).
+
+    O custo de cada lead usa o preço do modelo que o qualifica: na cascata, o cascade_model e, se a
+    estimativa das regras ficar perto de um limiar de categoria (provável escalonamento), também o
+    LLM_MODEL.
+    """
+
+    def __init__(self, token_budget: Optional[int] = None, cost_budget: Optional[float] = None,
+                 deadline: Optional[datetime.datetime] = None, cascade_model: Optional[str] = None,
+                 cascade_margin: float = 0.0, prioritizer: Optional[LeadPrioritizer] = None,
+                 reference_date: Optional[datetime.datetime] = None):
+        for model in (LLM_MODEL, cascade_model):
+            if cost_budget is not None and model is not None and model not in LLM_PRICES_PER_MILLION_TOKENS:
+                raise ValueError(f"Sem preço configurado para o modelo {model} (LLM_PRICES_PER_MILLION_TOKENS)")
+
+        self.token_budget = token_budget
+        self.cost_budget = cost_budget
+        self.deadline = deadline
+        self.cascade_model = cascade_model
+        self.cascade_margin = cascade_margin
+        self.prioritizer = prioritizer or LeadPrioritizer()
+        self.rule_qualifier = RuleBasedQualifier()
+        self.reference_date = reference_date or datetime.datetime.now()
+        self.planned_tokens = 0
+        self.planned_cost = 0.0
+        self.dispatched = 0
+        self.deferred: List[Dict[str, Any]] = []
+        self.estimated_priorities: Dict[str, float] = {}
+        self.estimated_scores: Dict[str, float] = {}
+
+    def estimated_priority(self, lead: Dict[str, Any]) -> float:
+        """Prioridade estimada do lead sem o LLM (guarda também a pontuação geral estimada)."""
+        estimate = self.rule_qualifier.prequalify(lead)
+        self.estimated_scores[str(lead["id"])] = estimate["overall_score"]
+        return self.prioritizer.prioritize_lead(lead, estimate, self.reference_date)["priority_score"]
+
+    def qualification_models(self, lead: Dict[str, Any]) -> List[str]:
+        """Modelos que devem ser chamados para qualificar o lead, pela estimativa das regras."""
+        if self.cascade_model is None:
+            return [LLM_MODEL]
+        if near_tier_boundary(self.estimated_scores[str(lead["id"])], self.cascade_margin):
+            return [self.cascade_model, LLM_MODEL]
+        return [self.cascade_model]
+
+    def estimated_cost(self, prompt_tokens: int, model: str = LLM_MODEL) -> float:
+        """Custo estimado (US$) de uma qualificação com prompt_tokens tokens de entrada no modelo informado."""
+        input_price, output_price = LLM_PRICES_PER_MILLION_TOKENS.get(model, (0.0, 0.0))
+        return (prompt_tokens * input_price + ESTIMATED_COMPLETION_TOKENS * output_price) / 1_000_000
+
+    def defer(self, lead: Dict[str, Any], reason: str):
+        """Registra um lead adiado para a próxima execução."""
+        self.deferred.append({"id": lead["id"], "reason": reason,
+                              "estimated_priority": self.estimated_priorities.get(str(lead["id"]))})
+
+    def plan(self, leads: List[Dict[str, Any]], qualifier: Any) -> List[Dict[str, Any]]:
+        """Ordena os leads pela prioridade estimada e retorna os que cabem no orçamento, nessa ordem.
+
+        O orçamento é consumido estritamente em ordem: o primeiro lead que não cabe adia todos os
+        seguintes, para que um lead menos valioso nunca passe à frente de um mais valioso.
+        """
+        for lead in leads:
+            self.estimated_priorities[str(lead["id"])] = self.estimated_priority(lead)
+        ranked = sorted(leads, key=lambda lead: self.estimated_priorities[str(lead["id"])], reverse=True)
+
+        planned = []
+        for position, lead in enumerate(ranked):
+            prompt_tokens = estimate_tokens(qualifier.build_prompt(qualifier.lead_info(lead)))
+            models = self.qualification_models(lead)
+            tokens = (prompt_tokens + ESTIMATED_COMPLETION_TOKENS) * len(models)
+            cost = sum(self.estimated_cost(prompt_tokens, model) for model in models)
+            over_tokens = self.token_budget is not None and self.planned_tokens + tokens > self.token_budget
+            over_cost = self.cost_budget is not None and self.planned_cost + cost > self.cost_budget
+            if over_tokens or over_cost:
+                for deferred_lead in ranked[position:]:
+                    self.defer(deferred_lead, "budget")
+                break
+
+            self.planned_tokens += tokens
+            self.planned_cost += cost
+            planned.append(lead)
+        return planned
+
+    def admit(self, leads: List[Dict[str, Any]]) -> bool:
+        """Chamado ao despachar cada requisição (um lead ou um lote): após o prazo, os leads são adiados."""
+        if self.deadline is not None and datetime.datetime.now() >= self.deadline:
+            for lead in leads:
+                self.defer(lead, "deadline")
+            return False
+        self.dispatched += len(leads)
+        return True
+
+    def deferred_ids(self) -> Set[str]:
+        """Ids dos leads adiados."""
+        return {str(record["id"]) for record in self.deferred}
+
+    def stats(self) -> Dict[str, Any]:
+        """Resumo do agendamento: leads despachados e adiados (por motivo) e o orçamento usado."""
+        by_reason: Dict[str, int] = {}
+        for record in self.deferred:
+            by_reason[record["reason"]] = by_reason.get(record["reason"], 0) + 1
+        return {
+            "dispatched": self.dispatched,
+            "deferred": len(self.deferred),
+            "deferred_by_reason": by_reason,
+            "estimated_tokens": self.planned_tokens,
+            "token_budget": self.token_budget,
+            "estimated_cost": round(self.planned_cost, 4),
+            "cost_budget": self.cost_budget,
+            "deadline": self.deadline.isoformat(timespec="seconds") if self.deadline else None
+        }
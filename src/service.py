@@ -0,0 +1,215 @@
+import datetime
+import json
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+from typing import Dict, Any, Callable, List, Optional, Tuple
+
+from config import SERVICE_BATCH_WINDOW_MS, SERVICE_MAX_BATCH_SIZE, SERVICE_REQUEST_TIMEOUT_SECONDS, RESULTS_QUERY_LIMIT
+from src.instrumentation import METRICS
+from src.ranking_index import RankingIndex, ranking_record
+
+BatchRunner = Callable[[List[Dict[str, Any]]], List[Dict[str, Any]]]
+
+_STOP = object()
+
+
+class MicroBatcher:
+    """Agrupa os leads que chegam dentro de uma janela curta em uma única execução do lote.
+
+    Uma thread de trabalho espera o primeiro lead, coleta os que chegarem nos próximos
+    window_seconds (até max_batch_size) e chama run_batch com todos eles; cada chamador recebe
+    o próprio resultado por um Future. Lotes são processados um de cada vez, e os leads que
+    chegam durante um lote formam o próximo.
+    """
+
+    def __init__(self, run_batch: BatchRunner, window_seconds: float = SERVICE_BATCH_WINDOW_MS / 1000,
+                 max_batch_size: int = SERVICE_MAX_BATCH_SIZE):
+        self.run_batch = run_batch
+        self.window_seconds = window_seconds
+        self.max_batch_size = max_batch_size
+        self.batches = 0
+        self.leads = 0
+        self._queue: "queue.Queue[Any]" = queue.Queue()
+        self._thread = threading.Thread(target=self._work, name="micro-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, lead: Dict[str, Any]) -> Future:
+        """Enfileira um lead e retorna o Future com o seu resultado."""
+        future = Future()
+        self._queue.put((lead, future))
+        return future
+
+    def submit_many(self, leads: List[Dict[str, Any]]) -> List[Future]:
+        """Enfileira vários leads de uma vez (eles tendem a cair no mesmo lote)."""
+        return [self.submit(lead) for lead in leads]
+
+    def close(self):
+        """Encerra a thread de trabalho depois de processar os leads já enfileirados."""
+        self._queue.put(_STOP)
+        self._thread.join()
+
+    def _collect(self, first: Tuple[Dict[str, Any], Future]) -> Tuple[List[Tuple[Dict[str, Any], Future]], bool]:
+        """Coleta os leads que chegam até o fim da janela, a partir do primeiro."""
+        batch = [first]
+        deadline = time.monotonic() + self.window_seconds
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _work(self):
+        stop = False
+        while not stop:
+            item = self._queue.get()
+            if item is _STOP:
+                break
+            batch, stop = self._collect(item)
+
+            leads = [lead for lead, _ in batch]
+            try:
+                results = self.run_batch(leads)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            self.batches += 1
+            self.leads += len(batch)
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
+
+
+class QualificationRequestHandler(BaseHTTPRequestHandler):
+    """Rotas HTTP do serviço de qualificação.
+
+    POST /qualify recebe um lead (objeto), uma lista de leads ou {"leads": [...]} e responde com
+    a qualificação e a priorização de cada um, na ordem recebida. GET /health informa o estado do
+    serviço e GET /metrics expõe as métricas no formato do Prometheus.
+
+    Com a fila de prioridade (RankingIndex) habilitada, GET /queue?limit=N retorna os N leads mais
+    prioritários já qualificados e POST /interaction ({"id", "interaction", "date"}) registra uma nova
+    interação, repriorizando só aquele lead.
+    """
+
+    server_version = "LeadQualificationService/1.0"
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path == "/health":
+            batcher = self.server.batcher
+            self.send_json(200, {"status": "ok", "batches": batcher.batches, "leads": batcher.leads})
+        elif url.path == "/metrics":
+            self.send_text(200, METRICS.prometheus_text(), "text/plain; version=0.0.4")
+        elif url.path == "/queue" and self.server.ranking is not None:
+            try:
+                limit = int(parse_qs(url.query).get("limit", [RESULTS_QUERY_LIMIT])[0])
+            except ValueError:
+                self.send_json(400, {"error": "limit deve ser um número inteiro"})
+                return
+            ranking = self.server.ranking
+            ranking.advance_to()
+            self.send_json(200, {"total": len(ranking), "leads": [ranking_record(entry) for entry in ranking.top_k(limit)]})
+        else:
+            self.send_json(404, {"error": f"Rota não encontrada: {self.path}"})
+
+    def read_json(self) -> Tuple[bool, Any]:
+        """Lê o corpo JSON da requisição; em caso de erro, responde 400 e retorna (False, None)."""
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+            return True, json.loads(self.rfile.read(length) or b"null")
+        except ValueError as e:
+            self.send_json(400, {"error": f"JSON inválido: {e}"})
+            return False, None
+
+    def do_POST(self):
+        if self.path == "/interaction" and self.server.ranking is not None:
+            self.record_interaction()
+            return
+        if self.path != "/qualify":
+            self.send_json(404, {"error": f"Rota não encontrada: {self.path}"})
+            return
+
+        ok, payload = self.read_json()
+        if not ok:
+            return
+
+        single = isinstance(payload, dict) and "leads" not in payload
+        leads = [payload] if single else payload.get("leads") if isinstance(payload, dict) else payload
+        if not isinstance(leads, list) or not leads or not all(isinstance(lead, dict) for lead in leads):
+            self.send_json(400, {"error": "Envie um lead, uma lista de leads ou {\"leads\": [...]}"})
+            return
+
+        futures = self.server.batcher.submit_many(leads)
+        try:
+            results = [future.result(timeout=self.server.request_timeout) for future in futures]
+        except FutureTimeoutError:
+            self.send_json(504, {"error": "Tempo limite excedido aguardando a qualificação"})
+            return
+        except Exception as e:
+            self.send_json(500, {"error": f"Erro ao qualificar leads: {e}"})
+            return
+
+        self.send_json(200, results[0] if single else {"results": results})
+
+    def record_interaction(self):
+        """Registra uma interação de um lead da fila de prioridade."""
+        ok, payload = self.read_json()
+        if not ok:
+            return
+        if not isinstance(payload, dict) or "id" not in payload or not isinstance(payload.get("interaction"), str):
+            self.send_json(400, {"error": "Envie {\"id\", \"interaction\", \"date\": \"AAAA-MM-DD\"}"})
+            return
+        date = payload.get("date")
+        if date is not None:
+            try:
+                datetime.date.fromisoformat(date)
+            except (TypeError, ValueError):
+                self.send_json(400, {"error": f"date deve estar no formato AAAA-MM-DD: {date!r}"})
+                return
+
+        entry = self.server.ranking.record_interaction(payload["id"], payload["interaction"], date)
+        if entry is None:
+            self.send_json(404, {"error": f"Lead não encontrado na fila: {payload['id']}"})
+            return
+        self.send_json(200, ranking_record(entry))
+
+    def send_json(self, status: int, body: Any):
+        """Responde com um corpo JSON."""
+        self.send_text(status, json.dumps(body), "application/json")
+
+    def send_text(self, status: int, body: str, content_type: str):
+        """Responde com um corpo de texto."""
+        data = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", f"{content_type}; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format: str, *args):
+        # Sem log por requisição; as métricas ficam em /metrics
+        pass
+
+
+class QualificationServer(ThreadingHTTPServer):
+    """Servidor HTTP residente que encaminha os leads recebidos ao MicroBatcher."""
+
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int], batcher: MicroBatcher,
+                 request_timeout: Optional[float] = SERVICE_REQUEST_TIMEOUT_SECONDS,
+                 ranking: Optional[RankingIndex] = None):
+        super().__init__(address, QualificationRequestHandler)
+        self.batcher = batcher
+        self.request_timeout = request_timeout
+        self.ranking = ranking
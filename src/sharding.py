@@ -0,0 +1,82 @@
+import heapq
+import itertools
+import json
+import os
+import zlib
+from typing import Dict, Any, Iterable, Iterator, List, Optional
+
+from src.result_writer import JsonlResultWriter, JsonResultWriter
+
+
+def shard_for(lead_id: Any, shard_count: int) -> int:
+    """Retorna o shard de um lead, estável entre execuções e máquinas (CRC32 do id)."""
+    return zlib.crc32(str(lead_id).encode("utf-8")) % shard_count
+
+
+def in_shard(leads: Iterable[Dict[str, Any]], shard_index: int, shard_count: int) -> Iterator[Dict[str, Any]]:
+    """Filtra os leads que pertencem ao shard informado."""
+    for lead in leads:
+        if shard_for(lead.get("id", ""), shard_count) == shard_index:
+            yield lead
+
+
+def shard_file_name(shard_index: int, shard_count: int, suffix: str = "") -> str:
+    """Nome padronizado do arquivo de um shard."""
+    return f"shard-{shard_index:04d}-of-{shard_count:04d}{suffix}.jsonl"
+
+
+def shard_checkpoint_path(checkpoint_path: str, shard_index: int, shard_count: int) -> str:
+    """Banco de checkpoints de um shard: cada processo grava seu progresso em um arquivo próprio."""
+    base, extension = os.path.splitext(checkpoint_path)
+    return f"{base}.shard-{shard_index:04d}-of-{shard_count:04d}{extension}"
+
+
+def split_leads(leads: Iterable[Dict[str, Any]], shard_dir: str, shard_count: int) -> List[str]:
+    """Distribui os leads em arquivos JSONL de entrada, um por shard, em uma única passada."""
+    os.makedirs(shard_dir, exist_ok=True)
+    paths = [os.path.join(shard_dir, shard_file_name(index, shard_count, "-input")) for index in range(shard_count)]
+    files = [open(path, 'w') for path in paths]
+
+    try:
+        for lead in leads:
+            files[shard_for(lead.get("id", ""), shard_count)].write(json.dumps(lead) + "\n")
+    finally:
+        for file in files:
+            file.close()
+
+    return paths
+
+
+def iter_jsonl_records(file_path: str) -> Iterator[Dict[str, Any]]:
+    """Lê os registros de um arquivo JSONL sob demanda."""
+    with open(file_path, 'r') as file:
+        for line in file:
+            if line.strip():
+                yield json.loads(line)
+
+
+def merge_ranked_shards(shard_files: List[str], output_file: str, limit: Optional[int] = None) -> int:
+    """Intercala (k-way merge) os arquivos de shard já ordenados por priority_score.
+
+    Mantém em memória apenas o registro corrente de cada shard; em empates, preserva a ordem dos
+    shards informados. Com limit, grava apenas os limit primeiros. A saída tem o formato de
+    resultados_leads.json.
+    """
+    streams = [iter_jsonl_records(path) for path in shard_files]
+    merged = heapq.merge(*streams, key=lambda record: -record["prioritization"]["priority_score"])
+    if limit is not None:
+        merged = itertools.islice(merged, limit)
+
+    with JsonResultWriter(output_file) as writer:
+        for record in merged:
+            writer.write(record)
+
+    return writer.count
+
+
+def write_ranked_shard(records: Iterable[Dict[str, Any]], output_file: str) -> int:
+    """Grava os registros (já ordenados por prioridade) de um shard em JSONL."""
+    with JsonlResultWriter(output_file) as writer:
+        for record in records:
+            writer.write(record)
+    return writer.count
@@ -0,0 +1,47 @@
+import datetime
+
+import pytest
+
+import config
+from benchmarks.fake_llm import use_fake_llm
+from benchmarks.synthetic_leads import generate_leads
+from src.instrumentation import METRICS
+
+REFERENCE_DATE = datetime.datetime(2025, 5, 1)
+
+
+@pytest.fixture(autouse=True)
+def run_options(tmp_path, monkeypatch):
+    """Opções padrão isoladas por teste: arquivos em tmp_path e sem limites de taxa nem esperas."""
+    overrides = {
+        "use_cache": False,
+        "cache_path": str(tmp_path / "llm_cache.sqlite3"),
+        "checkpoint_path": str(tmp_path / "runs.sqlite3"),
+        "shard_dir": str(tmp_path / "shards"),
+        "retry_base_delay": 0.0,
+        "retry_max_delay": 0.0,
+        "requests_per_minute": None,
+        "tokens_per_minute": None
+    }
+    for name, value in overrides.items():
+        monkeypatch.setitem(config.DEFAULT_RUN_OPTIONS, name, value)
+    METRICS.reset()
+    return config.DEFAULT_RUN_OPTIONS
+
+
+@pytest.fixture
+def fake_llm():
+    """ChatOpenAI substituído pelo modelo simulado; .calls registra as chamadas por etapa."""
+    with use_fake_llm() as model:
+        yield model
+
+
+@pytest.fixture
+def leads():
+    """Leads sintéticos no formato de data/sample_leads.json."""
+    return list(generate_leads(30, reference_date=REFERENCE_DATE.date()))
+
+
+def llm_calls(model, stage: str = "qualification") -> int:
+    """Quantidade de chamadas ao modelo simulado em uma etapa."""
+    return len(model.calls.get(stage, []))
@@ -0,0 +1,62 @@
+import copy
+import json
+
+import pytest
+
+from app import run_lead_qualification_system
+from benchmarks.fake_llm import FakeLLMError
+from conftest import llm_calls
+
+
+def test_batch_results_are_not_reused_by_single_lead_runs(fake_llm, leads):
+    run_lead_qualification_system(copy.deepcopy(leads), {"use_cache": True, "batch_size": 10})
+    assert llm_calls(fake_llm, "qualification_batch") == 3
+
+    fake_llm.calls.clear()
+    run_lead_qualification_system(copy.deepcopy(leads), {"use_cache": True})
+
+    assert llm_calls(fake_llm) == len(leads)
+
+
+@pytest.fixture
+def batch_missing_first_lead(fake_llm, monkeypatch):
+    """Resposta em lote sem o primeiro lead; as qualificações individuais sempre falham."""
+    answer = fake_llm._answer
+
+    def partial_answer(self, prompt, stage):
+        if stage == "qualification":
+            raise FakeLLMError("Erro simulado do modelo")
+        response = answer(self, prompt, stage)
+        if stage == "qualification_batch":
+            response.content = json.dumps(json.loads(response.content)[1:])
+        return response
+
+    monkeypatch.setattr(fake_llm, "_answer", partial_answer)
+    return fake_llm
+
+
+@pytest.mark.parametrize("async_mode", [False, True])
+def test_only_leads_missing_from_the_batch_are_retried(batch_missing_first_lead, leads, async_mode):
+    result = run_lead_qualification_system(copy.deepcopy(leads[:10]),
+                                           {"batch_size": 10, "max_retries": 1, "async_mode": async_mode})
+
+    assert llm_calls(batch_missing_first_lead, "qualification_batch") == 1
+    assert llm_calls(batch_missing_first_lead) == 2
+    assert [failure["id"] for failure in result["failed_leads"]] == [leads[0]["id"]]
+    assert len(result["qualified_leads"]) == 9
+
+
+def test_failed_batch_requests_fall_back_to_single_lead_calls(fake_llm, leads, monkeypatch):
+    answer = fake_llm._answer
+
+    def failing_batch(self, prompt, stage):
+        if stage == "qualification_batch":
+            raise FakeLLMError("Erro simulado do modelo")
+        return answer(self, prompt, stage)
+
+    monkeypatch.setattr(fake_llm, "_answer", failing_batch)
+    result = run_lead_qualification_system(copy.deepcopy(leads[:10]), {"batch_size": 10})
+
+    assert llm_calls(fake_llm) == 10
+    assert not result["failed_leads"]
+    assert len(result["qualified_leads"]) == 10
@@ -0,0 +1,24 @@
+import json
+
+import pytest
+
+from benchmarks import bench_prompt_tokens
+from src.concurrency import estimate_tokens
+
+
+def test_prompt_token_report_falls_back_to_the_estimate_offline(tmp_path, monkeypatch):
+    tiktoken = pytest.importorskip("tiktoken")
+
+    def offline(*args, **kwargs):
+        raise ConnectionError("sem rede")
+
+    monkeypatch.setattr(tiktoken, "encoding_for_model", offline)
+    monkeypatch.setattr(tiktoken, "get_encoding", offline)
+    report_path = tmp_path / "tokens.json"
+
+    assert bench_prompt_tokens.main(["--synthetic", "20", "--json", str(report_path)]) == 0
+
+    report = json.loads(report_path.read_text())
+    assert report["token_counter"] == bench_prompt_tokens.ESTIMATE_METHOD
+    assert report["compact"]["total"] < report["full"]["total"]
+    assert bench_prompt_tokens.token_counter()[0] is estimate_tokens
@@ -0,0 +1,37 @@
+import random
+
+import pytest
+
+from conftest import REFERENCE_DATE
+from src.columnar_prioritizer import ColumnarPrioritizer
+from src.lead_prioritizer import LeadPrioritizer
+
+
+@pytest.fixture
+def qualified_leads(leads):
+    rng = random.Random(7)
+    qualified = [
+        # Pontuações com duas casas decimais, para que haja empates na prioridade
+        {"lead": lead, "qualification": {"overall_score": round(rng.random(), 2), "tier": "warm"}}
+        for lead in leads
+    ]
+    # Datas ausentes ou inválidas caem na menor faixa de recência
+    qualified[0]["lead"] = {**qualified[0]["lead"], "last_interaction": ""}
+    qualified[1]["lead"] = {**qualified[1]["lead"], "last_interaction": "01/05/2025"}
+    qualified[2]["lead"] = {**qualified[2]["lead"], "interactions": []}
+    return qualified
+
+
+def test_columnar_matches_scalar_prioritization(qualified_leads):
+    expected = LeadPrioritizer().prioritize_leads(qualified_leads, REFERENCE_DATE)
+    result = ColumnarPrioritizer().prioritize_leads(qualified_leads, reference_date=REFERENCE_DATE)
+
+    assert result == expected
+
+
+@pytest.mark.parametrize("top_k", [0, 1, 5, 30, 100])
+def test_columnar_top_k_is_prefix_of_full_ranking(qualified_leads, top_k):
+    expected = LeadPrioritizer().prioritize_leads(qualified_leads, REFERENCE_DATE)
+    result = ColumnarPrioritizer().prioritize_leads(qualified_leads, top_k, REFERENCE_DATE)
+
+    assert result == expected[:top_k]
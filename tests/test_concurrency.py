@@ -0,0 +1,35 @@
+import asyncio
+import copy
+
+from app import build_run_options, parse_args, run_lead_qualification_system
+from conftest import llm_calls
+from src.concurrency import get_rate_limiter
+
+
+def test_rate_limiter_is_shared_across_runs(fake_llm, leads):
+    options = {"async_mode": True, "requests_per_minute": 1000, "approach_top_k": 0}
+    limiter = get_rate_limiter(1000, None)
+    start = len(limiter._events)
+
+    run_lead_qualification_system(copy.deepcopy(leads[:5]), options)
+    run_lead_qualification_system(copy.deepcopy(leads[5:10]), options)
+
+    # As duas execuções (e seus event loops) consomem da mesma janela
+    assert len(limiter._events) - start == llm_calls(fake_llm) == 10
+
+
+def test_async_run_inside_a_running_event_loop(fake_llm, leads):
+    async def qualify():
+        return run_lead_qualification_system(copy.deepcopy(leads[:5]), {"async_mode": True, "batch_size": 2})
+
+    result = asyncio.run(qualify())
+
+    assert len(result["qualified_leads"]) == 5
+    assert llm_calls(fake_llm, "qualification_batch") == 3
+
+
+def test_cli_enables_async_mode_and_batches():
+    options = build_run_options(parse_args(["--async", "--max-concurrency", "4", "--requests-per-minute", "60",
+                                            "--batch-size", "10"]))
+
+    assert options == {"async_mode": True, "max_concurrency": 4, "requests_per_minute": 60, "batch_size": 10}
@@ -0,0 +1,40 @@
+import copy
+
+from app import run_lead_qualification_system
+from conftest import llm_calls
+from src.dedup import NearDuplicateDetector
+
+
+def duplicates_of(leads, count):
+    """Cópias dos primeiros leads com outro id e outra fonte (a mesma pessoa vinda de outro canal)."""
+    return [{**copy.deepcopy(lead), "id": f"dup-{lead['id']}", "source": "Webinar"} for lead in leads[:count]]
+
+
+def test_detector_groups_near_duplicates_only(leads):
+    # Outra pessoa da mesma empresa, com as mesmas necessidades: textos parecidos, mas outro contato
+    colleague = {**copy.deepcopy(leads[1]), "id": "colega", "name": "Outra Pessoa",
+                 "email": "outra.pessoa@example.com"}
+    duplicate_of = NearDuplicateDetector().cluster(leads + duplicates_of(leads, 1) + [colleague])
+
+    assert duplicate_of == {f"dup-{leads[0]['id']}": leads[0]["id"]}
+
+
+def test_duplicates_reuse_the_representative_qualification(fake_llm, leads):
+    result = run_lead_qualification_system(copy.deepcopy(leads + duplicates_of(leads, 5)), {"dedup": True})
+
+    assert llm_calls(fake_llm) == len(leads)
+    stats = result["run_stats"]["dedup"]
+    assert (stats["duplicates"], stats["llm_calls_avoided"]) == (5, 5)
+
+    qualifications = {record["lead"]["id"]: record["qualification"] for record in result["qualified_leads"]}
+    for lead in leads[:5]:
+        duplicate = qualifications[f"dup-{lead['id']}"]
+        assert duplicate.pop("duplicate_of") == lead["id"]
+        assert duplicate == qualifications[lead["id"]]
+    assert len(result["prioritized_leads"]) == len(leads) + 5
+
+
+def test_without_dedup_every_lead_is_qualified(fake_llm, leads):
+    run_lead_qualification_system(copy.deepcopy(leads + duplicates_of(leads, 5)))
+
+    assert llm_calls(fake_llm) == len(leads) + 5
@@ -0,0 +1,43 @@
+import copy
+import json
+
+from app import run_lead_qualification_system
+from src.fault_tolerance import DeadLetterQueue
+from src.instrumentation import METRICS
+
+
+def test_failed_leads_go_to_the_dead_letter_queue(tmp_path, fake_llm, leads):
+    fake_llm.configure(error_rate=1.0)
+    result = run_lead_qualification_system(copy.deepcopy(leads[:3]), {"max_retries": 1})
+
+    assert [failure["id"] for failure in result["failed_leads"]] == [lead["id"] for lead in leads[:3]]
+    assert result["prioritized_leads"] == []
+    qualification = METRICS.to_report()["llm"]["qualification"]
+    assert (qualification["calls"], qualification["errors"]) == (6, 6)
+
+    queue = DeadLetterQueue(str(tmp_path / "falhas.jsonl"))
+    queue.add_failures(leads, result["failed_leads"])
+    assert queue.flush() == 3
+    entries = [json.loads(line) for line in (tmp_path / "falhas.jsonl").read_text().splitlines()]
+    assert [entry["id"] for entry in entries] == [lead["id"] for lead in leads[:3]]
+    assert entries[0]["_dead_letter"]["stage"] == "qualification"
+
+
+def test_flush_without_failures_keeps_a_pending_file(tmp_path):
+    path = tmp_path / "falhas.jsonl"
+    path.write_text('{"id": "1"}\n')
+
+    assert DeadLetterQueue(str(path)).flush() == 0
+    assert path.read_text() == '{"id": "1"}\n'
+
+
+def test_flush_merges_with_pending_failures(tmp_path):
+    path = tmp_path / "falhas.jsonl"
+    path.write_text('{"id": "1", "_dead_letter": {"attempts": 1}}\n{"id": "2", "_dead_letter": {"attempts": 1}}\n')
+    queue = DeadLetterQueue(str(path))
+    queue.add_failures([{"id": "2"}, {"id": "3"}], [{"id": "2", "attempts": 3}, {"id": "3", "attempts": 3}])
+
+    assert queue.flush() == 2
+    entries = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [entry["id"] for entry in entries] == ["1", "2", "3"]
+    assert [entry["_dead_letter"]["attempts"] for entry in entries] == [1, 3, 3]
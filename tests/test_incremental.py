@@ -0,0 +1,64 @@
+import copy
+import json
+
+from app import run_lead_qualification_system, run_prioritize_only, save_results_to_file
+from conftest import llm_calls
+from src.incremental import lead_fingerprint
+from src.lead_processor import LeadProcessor
+
+
+def normalized(lead):
+    return LeadProcessor().normalize_lead_data(copy.deepcopy(lead))
+
+
+def test_fingerprint_tracks_bant_fields_only(leads):
+    lead = leads[0]
+    with_interaction = {**lead, "interactions": [*lead["interactions"], "Nova reunião agendada"],
+                        "last_interaction": "2025-04-30"}
+    new_need = {**lead, "needs": "Outra necessidade"}
+
+    assert lead_fingerprint(normalized(lead)) == lead_fingerprint(normalized(copy.deepcopy(lead)))
+    # Novas interações afetam só a priorização
+    assert lead_fingerprint(normalized(with_interaction)) == lead_fingerprint(normalized(lead))
+    assert lead_fingerprint(normalized(new_need)) != lead_fingerprint(normalized(lead))
+
+
+def test_incremental_run_requalifies_only_changed_leads(tmp_path, fake_llm, leads):
+    previous_path = str(tmp_path / "previous.json")
+    first = run_lead_qualification_system(copy.deepcopy(leads))
+    save_results_to_file(first, previous_path)
+    assert llm_calls(fake_llm) == len(leads)
+
+    leads[3]["interactions"].append("Pediu uma nova proposta")
+    leads[3]["last_interaction"] = "2025-04-30"
+    leads[5]["needs"] = "Integração com o ERP"
+    fake_llm.calls.clear()
+    second = run_lead_qualification_system(copy.deepcopy(leads), {"previous_results": previous_path})
+
+    assert llm_calls(fake_llm) == 1
+    assert second["run_stats"]["incremental"] == {"reused": len(leads) - 1, "qualified": 1}
+    reused_ids = {lead["id"] for i, lead in enumerate(leads) if i != 5}
+    previous = {record["lead"]["id"]: record["qualification"] for record in first["qualified_leads"]}
+    for record in second["qualified_leads"]:
+        if record["lead"]["id"] in reused_ids:
+            assert record["qualification"] == previous[record["lead"]["id"]]
+    # O lead com novas interações reaproveita a qualificação, mas é repriorizado com a nova recência
+    repriorized = next(record for record in second["prioritized_leads"] if record["lead"]["id"] == leads[3]["id"])
+    assert repriorized["lead"]["last_interaction"] == "2025-04-30"
+
+
+def test_prioritize_only_reuses_results_with_new_interactions(tmp_path, fake_llm, leads):
+    previous_path = str(tmp_path / "previous.json")
+    input_path = tmp_path / "leads.json"
+    save_results_to_file(run_lead_qualification_system(copy.deepcopy(leads)), previous_path)
+
+    leads[0]["interactions"].append("Respondeu ao email")
+    leads[0]["last_interaction"] = "2025-04-30"
+    input_path.write_text(json.dumps(leads))
+    fake_llm.calls.clear()
+    result = run_prioritize_only(str(input_path), previous_path)
+
+    assert not fake_llm.calls
+    assert result["run_stats"]["prioritize_only"] == {"reused": len(leads), "missing": 0}
+    updated = next(record for record in result["prioritized_leads"] if record["lead"]["id"] == leads[0]["id"])
+    assert list(updated["lead"]["interactions"]) == leads[0]["interactions"]
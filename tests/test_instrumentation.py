@@ -0,0 +1,21 @@
+import json
+
+from src.instrumentation import RunMetrics
+
+
+def test_metrics_snapshots_merge_counters_and_latencies():
+    first, second, merged = RunMetrics(), RunMetrics(), RunMetrics()
+    first.record_node("qualify_leads", 1.0)
+    first.record_llm_call("qualification", 0.1, 100, 10)
+    second.record_node("qualify_leads", 2.0)
+    second.record_llm_call("qualification", 0.3, 200, 20)
+    second.record_llm_error("qualification", 0.5)
+
+    merged.merge(first.snapshot())
+    merged.merge(json.loads(json.dumps(second.snapshot())))
+
+    report = merged.to_report()
+    assert report["nodes"]["qualify_leads"] == {"runs": 2, "wall_seconds": 3.0}
+    qualification = report["llm"]["qualification"]
+    assert (qualification["calls"], qualification["errors"], qualification["prompt_tokens"]) == (3, 1, 300)
+    assert qualification["p99_seconds"] == 0.5
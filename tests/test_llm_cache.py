@@ -0,0 +1,69 @@
+import copy
+import json
+
+import pytest
+
+from app import get_run_store, main, run_lead_qualification_system
+from src.llm_cache import LLMCache, get_llm_cache
+
+
+def test_cache_get_set_and_expiration(tmp_path):
+    cache = LLMCache(str(tmp_path / "cache.sqlite3"), ttl_seconds=60)
+    key = LLMCache.make_key("prompt", "gpt-4o", 0.0, "1")
+
+    assert cache.get(key) is None
+    cache.set(key, "resposta")
+    assert cache.get(key) == "resposta"
+    assert cache.stats()["hits"] == 1
+
+    expired = LLMCache(str(tmp_path / "cache.sqlite3"), ttl_seconds=0)
+    assert expired.get(key) is None
+
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    cache = LLMCache(str(tmp_path / "cache.sqlite3"), max_entries=2)
+    cache.set("a", "1")
+    cache.set("b", "2")
+    cache.get("a")
+    cache.set("c", "3")
+
+    assert cache.get("b") is None
+    assert cache.get("a") == "1"
+    assert cache.get("c") == "3"
+
+
+def test_cache_key_depends_on_model_and_template_version():
+    key = LLMCache.make_key("prompt", "gpt-4o", 0.0, "1")
+
+    assert key != LLMCache.make_key("prompt", "gpt-4o-mini", 0.0, "1")
+    assert key != LLMCache.make_key("prompt", "gpt-4o", 0.0, "2")
+    assert key != LLMCache.make_key("outro prompt", "gpt-4o", 0.0, "1")
+
+
+@pytest.mark.parametrize("options", [{}, {"batch_size": 10}, {"compact_prompts": True}])
+def test_second_run_is_served_from_cache(fake_llm, leads, options):
+    options = {"use_cache": True, **options}
+    first = run_lead_qualification_system(copy.deepcopy(leads), options)
+    assert fake_llm.calls
+
+    fake_llm.calls.clear()
+    second = run_lead_qualification_system(copy.deepcopy(leads), options)
+
+    assert not fake_llm.calls
+    assert second["qualified_leads"] == first["qualified_leads"]
+    assert second["lead_approaches"] == first["lead_approaches"]
+
+
+def test_main_reports_the_cache_used_by_the_run(tmp_path, run_options, fake_llm, leads, capsys):
+    input_path = tmp_path / "leads.json"
+    input_path.write_text(json.dumps(leads[:5]))
+    cache_path = str(tmp_path / "outro_cache.sqlite3")
+    store = get_run_store(run_options["checkpoint_path"])
+    store.start_run("execucao-1", str(input_path), {"use_cache": True, "cache_path": cache_path})
+    store.finish_run("execucao-1", "failed")
+
+    main(["--resume", "execucao-1", "--output", str(tmp_path / "saida.json")])
+
+    stats = get_llm_cache(cache_path).stats()
+    assert stats["misses"] > 0
+    assert f"Cache do LLM: {stats['hits']} acertos, {stats['misses']} falhas" in capsys.readouterr().out
@@ -0,0 +1,93 @@
+import datetime
+import random
+
+import pytest
+
+from conftest import REFERENCE_DATE
+from src.lead_prioritizer import LeadPrioritizer
+from src.ranking_index import RankingIndex
+
+
+@pytest.fixture
+def qualified_leads(leads):
+    rng = random.Random(11)
+    return [{"lead": lead, "qualification": {"overall_score": round(rng.random(), 2), "tier": "warm"}}
+            for lead in leads]
+
+
+def ranking_of(entries):
+    return [(entry["lead"]["id"], entry["prioritization"]) for entry in entries]
+
+
+def build_index(qualified_leads):
+    index = RankingIndex(reference_date=REFERENCE_DATE)
+    for lead_data in qualified_leads:
+        index.upsert(lead_data)
+    return index
+
+
+def test_top_k_matches_batch_prioritization(qualified_leads):
+    index = build_index(qualified_leads)
+    expected = LeadPrioritizer().prioritize_leads(qualified_leads, REFERENCE_DATE)
+
+    assert ranking_of(index.top_k(len(qualified_leads))) == ranking_of(expected)
+    assert ranking_of(index.top_k(5)) == ranking_of(expected[:5])
+
+
+@pytest.mark.parametrize("days", [1, 2, 8, 15, 31, 400])
+def test_advance_to_rolls_over_recency_buckets(qualified_leads, days):
+    index = build_index(qualified_leads)
+    reference_date = REFERENCE_DATE + datetime.timedelta(days=days)
+
+    index.advance_to(reference_date)
+
+    expected = LeadPrioritizer().prioritize_leads(qualified_leads, reference_date)
+    assert ranking_of(index.top_k(len(qualified_leads))) == ranking_of(expected)
+
+
+def test_advance_to_only_repriorizes_leads_whose_bucket_changed(leads):
+    recent = {**leads[0], "id": "recente", "last_interaction": "2025-04-30"}
+    old = {**leads[1], "id": "antigo", "last_interaction": "2025-04-11"}
+    index = build_index([{"lead": lead, "qualification": {"overall_score": 0.5}} for lead in (recent, old)])
+
+    assert index.advance_to(REFERENCE_DATE + datetime.timedelta(days=1)) == 1
+    assert index.get("recente")["prioritization"]["factors"]["recency_score"] == 0.8
+    assert index.get("antigo")["prioritization"]["factors"]["recency_score"] == 0.4
+    assert index.advance_to(REFERENCE_DATE + datetime.timedelta(days=1)) == 0
+
+
+def test_advance_to_cannot_go_back(qualified_leads):
+    index = build_index(qualified_leads)
+
+    with pytest.raises(ValueError):
+        index.advance_to(REFERENCE_DATE - datetime.timedelta(days=1))
+
+
+def test_record_interaction_repriorizes_the_lead(qualified_leads):
+    index = build_index(qualified_leads)
+    lead_id = qualified_leads[0]["lead"]["id"]
+
+    entry = index.record_interaction(lead_id, "Ligação de acompanhamento", "2025-05-01")
+
+    assert entry["lead"]["last_interaction"] == "2025-05-01"
+    assert entry["lead"]["interactions"][-1] == "Ligação de acompanhamento"
+    assert entry["prioritization"]["factors"]["recency_score"] == 1.0
+    assert index.record_interaction("inexistente", "Ligação") is None
+
+
+@pytest.mark.parametrize("date", [20250501, "01/05/2025", "2025-13-01"])
+def test_record_interaction_rejects_invalid_dates(qualified_leads, date):
+    index = build_index(qualified_leads)
+
+    with pytest.raises(ValueError):
+        index.record_interaction(qualified_leads[0]["lead"]["id"], "Ligação", date)
+
+
+def test_removed_leads_leave_the_ranking(qualified_leads):
+    index = build_index(qualified_leads)
+    removed = index.top_k(1)[0]["lead"]["id"]
+
+    assert index.remove(removed)
+    assert not index.remove(removed)
+    assert removed not in index
+    assert removed not in [entry["lead"]["id"] for entry in index.top_k(len(qualified_leads))]
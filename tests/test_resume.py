@@ -0,0 +1,53 @@
+import copy
+
+import pytest
+
+from app import get_run_store, run_lead_qualification_system
+from conftest import llm_calls
+
+
+class Interrupted(BaseException):
+    """Interrupção simulada (como um KeyboardInterrupt), que não é tratada pelos nós do grafo."""
+
+
+def interrupting_answer(fake_llm, calls: int):
+    """Resposta do modelo simulado que interrompe a execução após calls qualificações."""
+    answer = fake_llm._answer
+
+    def interrupt(self, prompt, stage):
+        if stage == "qualification" and llm_calls(fake_llm) >= calls:
+            raise Interrupted()
+        return answer(self, prompt, stage)
+
+    return interrupt
+
+
+def test_resume_processes_only_remaining_leads(run_options, fake_llm, leads, monkeypatch):
+    options = {"run_id": "execucao-1"}
+    with monkeypatch.context() as patch, pytest.raises(Interrupted):
+        patch.setattr(fake_llm, "_answer", interrupting_answer(fake_llm, 12))
+        run_lead_qualification_system(copy.deepcopy(leads), options)
+
+    store = get_run_store(run_options["checkpoint_path"])
+    assert store.get_run("execucao-1")["status"] == "failed"
+    assert len(store.load_results("execucao-1", "qualification")) == 12
+
+    fake_llm.calls.clear()
+    result = run_lead_qualification_system(copy.deepcopy(leads), options)
+
+    assert llm_calls(fake_llm) == len(leads) - 12
+    assert result["run_stats"]["resumed"]["qualification"] == 12
+    assert len(result["prioritized_leads"]) == len(leads)
+    run = store.get_run("execucao-1")
+    assert (run["status"], run["attempts"]) == ("completed", 2)
+
+
+def test_completed_run_is_not_repeated(run_options, fake_llm, leads):
+    options = {"run_id": "execucao-2"}
+    first = run_lead_qualification_system(copy.deepcopy(leads), options)
+
+    fake_llm.calls.clear()
+    second = run_lead_qualification_system(copy.deepcopy(leads), options)
+
+    assert not fake_llm.calls
+    assert second["lead_approaches"] == first["lead_approaches"]
@@ -0,0 +1,81 @@
+import copy
+import datetime
+
+import pytest
+
+from app import run_lead_qualification_system
+from config import ESTIMATED_COMPLETION_TOKENS
+from conftest import REFERENCE_DATE, llm_calls
+from src.concurrency import estimate_tokens
+from src.lead_processor import LeadProcessor
+from src.scheduler import QualificationScheduler
+
+PROMPT = "x" * 400
+
+
+class FixedPromptQualifier:
+    """Qualificador com o mesmo prompt para todos os leads: cada lead custa o mesmo no orçamento."""
+
+    def lead_info(self, lead):
+        return lead["id"]
+
+    def build_prompt(self, lead_info):
+        return PROMPT
+
+
+@pytest.fixture
+def processed_leads(leads):
+    processor = LeadProcessor()
+    return [processor.normalize_lead_data(copy.deepcopy(lead)) for lead in leads]
+
+
+def test_plan_stops_at_the_token_budget_in_estimated_priority_order(processed_leads):
+    tokens_per_lead = estimate_tokens(PROMPT) + ESTIMATED_COMPLETION_TOKENS
+    scheduler = QualificationScheduler(token_budget=10 * tokens_per_lead + tokens_per_lead // 2,
+                                       reference_date=REFERENCE_DATE)
+
+    planned = scheduler.plan(processed_leads, FixedPromptQualifier())
+
+    assert len(planned) == 10
+    priorities = [scheduler.estimated_priorities[str(lead["id"])] for lead in planned]
+    assert priorities == sorted(priorities, reverse=True)
+    deferred = scheduler.deferred
+    assert len(deferred) == len(processed_leads) - 10
+    assert {record["reason"] for record in deferred} == {"budget"}
+    assert min(priorities) >= max(record["estimated_priority"] for record in deferred)
+    assert scheduler.stats()["estimated_tokens"] == 10 * tokens_per_lead
+
+
+def test_plan_counts_both_models_near_a_tier_boundary(processed_leads):
+    scheduler = QualificationScheduler(cascade_model="gpt-4o-mini", cascade_margin=1.0,
+                                       reference_date=REFERENCE_DATE)
+
+    scheduler.plan(processed_leads[:1], FixedPromptQualifier())
+
+    assert scheduler.planned_tokens == 2 * (estimate_tokens(PROMPT) + ESTIMATED_COMPLETION_TOKENS)
+
+
+def test_cost_budget_requires_model_prices():
+    with pytest.raises(ValueError):
+        QualificationScheduler(cost_budget=1.0, cascade_model="modelo-sem-preco")
+
+
+def test_admit_defers_everything_after_the_deadline(processed_leads):
+    scheduler = QualificationScheduler(deadline=datetime.datetime.now() - datetime.timedelta(seconds=1))
+
+    assert not scheduler.admit(processed_leads[:3])
+    assert scheduler.stats()["deferred_by_reason"] == {"deadline": 3}
+    assert scheduler.stats()["dispatched"] == 0
+
+
+def test_run_with_token_budget_defers_the_remaining_leads(fake_llm, leads):
+    result = run_lead_qualification_system(copy.deepcopy(leads), {"token_budget": 8000})
+
+    stats = result["run_stats"]["scheduler"]
+    assert 0 < stats["dispatched"] < len(leads)
+    assert llm_calls(fake_llm) == stats["dispatched"]
+    assert stats["estimated_tokens"] <= 8000
+    prioritized_ids = {record["lead"]["id"] for record in result["prioritized_leads"]}
+    deferred_ids = {record["id"] for record in result["deferred_leads"]}
+    assert not prioritized_ids & deferred_ids
+    assert len(prioritized_ids) + len(deferred_ids) == len(leads)
@@ -0,0 +1,135 @@
+import http.client
+import json
+import threading
+import time
+
+import pytest
+
+from conftest import REFERENCE_DATE
+from src.ranking_index import RankingIndex
+from src.service import MicroBatcher, QualificationServer
+
+
+def echo_batch(leads):
+    return [{"id": lead.get("id"), "tier": "warm"} for lead in leads]
+
+
+def failing_batch(leads):
+    raise RuntimeError("falha no lote")
+
+
+def slow_batch(leads):
+    time.sleep(0.5)
+    return echo_batch(leads)
+
+
+@pytest.fixture
+def start_server():
+    servers = []
+
+    def start(run_batch=echo_batch, ranking=None, request_timeout=5):
+        batcher = MicroBatcher(run_batch, window_seconds=0.001)
+        server = QualificationServer(("127.0.0.1", 0), batcher, request_timeout, ranking)
+        threading.Thread(target=server.serve_forever, args=(0.01,), daemon=True).start()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+        server.batcher.close()
+
+
+def request(server, method, path, body=None):
+    connection = http.client.HTTPConnection(*server.server_address, timeout=10)
+    data = body if body is None or isinstance(body, bytes) else json.dumps(body).encode("utf-8")
+    connection.request(method, path, data)
+    response = connection.getresponse()
+    payload = json.loads(response.read() or b"null") if "json" in response.getheader("Content-Type", "") else None
+    connection.close()
+    return response.status, payload
+
+
+@pytest.fixture
+def ranking(leads):
+    index = RankingIndex(reference_date=REFERENCE_DATE)
+    for lead in leads[:3]:
+        index.upsert({"lead": lead, "qualification": {"overall_score": 0.5, "tier": "cold"}})
+    return index
+
+
+def test_qualify_returns_results_in_order(start_server, leads):
+    server = start_server()
+
+    assert request(server, "POST", "/qualify", leads[0]) == (200, {"id": leads[0]["id"], "tier": "warm"})
+    status, body = request(server, "POST", "/qualify", {"leads": leads[:3]})
+    assert status == 200
+    assert [result["id"] for result in body["results"]] == [lead["id"] for lead in leads[:3]]
+    assert request(server, "GET", "/health")[1]["leads"] == 4
+
+
+@pytest.mark.parametrize("body", [b"{invalido", 42, [], [1, 2], {"leads": "x"}])
+def test_qualify_rejects_invalid_payloads(start_server, body):
+    status, payload = request(start_server(), "POST", "/qualify", body)
+
+    assert status == 400
+    assert "error" in payload
+
+
+def test_unknown_routes_return_404(start_server):
+    server = start_server()
+
+    assert request(server, "GET", "/desconhecida")[0] == 404
+    assert request(server, "POST", "/desconhecida", {})[0] == 404
+    # Sem a fila de prioridade, /queue e /interaction não existem
+    assert request(server, "GET", "/queue")[0] == 404
+    assert request(server, "POST", "/interaction", {"id": "1", "interaction": "x"})[0] == 404
+
+
+def test_batch_errors_return_500(start_server, leads):
+    status, payload = request(start_server(failing_batch), "POST", "/qualify", leads[0])
+
+    assert status == 500
+    assert "falha no lote" in payload["error"]
+
+
+def test_slow_batches_return_504(start_server, leads):
+    status, _ = request(start_server(slow_batch, request_timeout=0.05), "POST", "/qualify", leads[0])
+
+    assert status == 504
+
+
+def test_queue_rejects_invalid_limit(start_server, ranking):
+    server = start_server(ranking=ranking)
+
+    assert request(server, "GET", "/queue?limit=abc")[0] == 400
+    status, body = request(server, "GET", "/queue?limit=2")
+    assert status == 200
+    assert (body["total"], len(body["leads"])) == (3, 2)
+
+
+@pytest.mark.parametrize("body", [
+    b"{invalido",
+    {"interaction": "Ligação"},
+    {"id": "x", "interaction": 5},
+    {"id": "x", "interaction": "Ligação", "date": 20250501},
+    {"id": "x", "interaction": "Ligação", "date": "01/05/2025"},
+    {"id": "x", "interaction": "Ligação", "date": ["2025-05-01"]}
+])
+def test_interaction_rejects_invalid_payloads(start_server, ranking, body):
+    status, payload = request(start_server(ranking=ranking), "POST", "/interaction", body)
+
+    assert status == 400
+    assert "error" in payload
+
+
+def test_interaction_updates_the_queue(start_server, ranking, leads):
+    server = start_server(ranking=ranking)
+
+    assert request(server, "POST", "/interaction", {"id": "inexistente", "interaction": "Ligação"})[0] == 404
+    status, body = request(server, "POST", "/interaction",
+                           {"id": leads[1]["id"], "interaction": "Ligação", "date": "2025-05-01"})
+    assert status == 200
+    assert body["id"] == leads[1]["id"]
+    assert ranking.get(leads[1]["id"])["lead"]["last_interaction"] == "2025-05-01"
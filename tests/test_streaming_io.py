@@ -0,0 +1,90 @@
+import json
+
+import pytest
+
+from app import get_run_store, run_streaming_qualification
+from src.lead_processor import LeadFileError, LeadProcessor
+from src.result_writer import JsonResultWriter, JsonlResultWriter
+
+
+@pytest.mark.parametrize("chunk_size", [7, 1 << 16])
+def test_iter_leads_reads_json_array_in_chunks(tmp_path, leads, chunk_size):
+    path = tmp_path / "leads.json"
+    path.write_text(json.dumps(leads, indent=2, ensure_ascii=False))
+
+    assert list(LeadProcessor().iter_leads_from_file(str(path), chunk_size)) == leads
+
+
+def test_iter_leads_reads_jsonl(tmp_path, leads):
+    path = tmp_path / "leads.jsonl"
+    path.write_text("\n".join(json.dumps(lead) for lead in leads) + "\n\n")
+
+    assert list(LeadProcessor().iter_leads_from_file(str(path))) == leads
+
+
+def test_iter_leads_empty_file(tmp_path):
+    path = tmp_path / "empty.json"
+    path.write_text("  \n")
+
+    assert list(LeadProcessor().iter_leads_from_file(str(path))) == []
+
+
+def test_iter_leads_reports_the_invalid_jsonl_line(tmp_path, leads):
+    path = tmp_path / "leads.jsonl"
+    path.write_text("\n".join([json.dumps(leads[0]), json.dumps(leads[1]), '{"id": ', json.dumps(leads[2])]))
+    read = []
+
+    with pytest.raises(LeadFileError, match="linha 3"):
+        for lead in LeadProcessor().iter_leads_from_file(str(path)):
+            read.append(lead)
+    assert read == leads[:2]
+
+
+@pytest.mark.parametrize("chunk_size", [7, 1 << 16])
+def test_iter_leads_reports_the_invalid_array_element(tmp_path, leads, chunk_size):
+    path = tmp_path / "leads.json"
+    path.write_text("[" + json.dumps(leads[0]) + ", {invalido}, " + json.dumps(leads[1]) + "]")
+    read = []
+
+    with pytest.raises(LeadFileError, match="lead 2 do array"):
+        for lead in LeadProcessor().iter_leads_from_file(str(path), chunk_size):
+            read.append(lead)
+    assert read == leads[:1]
+
+
+def test_iter_leads_missing_file(tmp_path):
+    with pytest.raises(LeadFileError):
+        list(LeadProcessor().iter_leads_from_file(str(tmp_path / "inexistente.json")))
+
+
+def test_streaming_run_with_invalid_input_is_not_completed(tmp_path, fake_llm, leads):
+    path = tmp_path / "leads.jsonl"
+    path.write_text("\n".join([json.dumps(lead) for lead in leads[:4]] + ["{invalido"]))
+
+    with pytest.raises(LeadFileError):
+        run_streaming_qualification(str(path), str(tmp_path / "saida.jsonl"), 2, {"run_id": "execucao-1"})
+
+    assert get_run_store(str(tmp_path / "runs.sqlite3")).get_run("execucao-1")["status"] == "failed"
+
+
+@pytest.mark.parametrize("count", [0, 1, 30])
+def test_json_writer_matches_json_dump(tmp_path, leads, count):
+    path = tmp_path / "results.json"
+    with JsonResultWriter(str(path)) as writer:
+        for lead in leads[:count]:
+            writer.write(lead)
+
+    assert writer.count == count
+    assert path.read_text() == json.dumps({"prioritized_leads": leads[:count]}, indent=2)
+
+
+def test_jsonl_writer_round_trip(tmp_path, leads):
+    path = tmp_path / "results.jsonl"
+    with JsonlResultWriter(str(path)) as writer:
+        for lead in leads[:10]:
+            writer.write(lead)
+    with JsonlResultWriter(str(path), append=True) as writer:
+        for lead in leads[10:]:
+            writer.write(lead)
+
+    assert list(LeadProcessor().iter_leads_from_file(str(path))) == leads